@@ -5,9 +5,17 @@ API Package - REST endpoints for the vehicle management system
 from .vehicles import router as vehicles_router
 from .endpoints.photos import router as photos_router
 from .health import router as health_router
+from .dashboard import router as dashboard_router
+from .events import router as events_router
+from .history import router as history_router
+from .analytics import router as analytics_router
 
 __all__ = [
     "vehicles_router",
     "photos_router", 
-    "health_router"
+    "health_router",
+    "dashboard_router",
+    "events_router",
+    "history_router",
+    "analytics_router"
 ]
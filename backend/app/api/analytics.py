@@ -0,0 +1,56 @@
+"""
+Analytics API - Inventory aging and time-to-sale metrics
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Dict, Any
+import logging
+
+from ..database import get_db
+from ..services.analytics_service import inventory_analytics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/aging")
+async def get_inventory_aging(
+    limit: int = Query(50, ge=1, le=500, description="Number of marca/modelo groups to return"),
+    refresh: bool = Query(False, description="Recompute instead of using today's cached result"),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Days on lot of unsold vehicles: buckets, per marca/modelo and the oldest units
+    """
+    try:
+        return inventory_analytics.get_aging(db, limit=limit, refresh=refresh)
+        
+    except Exception as e:
+        logger.error(f"Error calculating inventory aging: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while calculating inventory aging"
+        )
+
+@router.get("/time-to-sale")
+async def get_time_to_sale(
+    limit: int = Query(50, ge=1, le=500, description="Number of marca/modelo groups to return"),
+    refresh: bool = Query(False, description="Recompute instead of using today's cached result"),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Days from listing to first sale per marca/modelo, by price position, and
+    average time spent in each status
+    """
+    try:
+        return inventory_analytics.get_time_to_sale(db, limit=limit, refresh=refresh)
+        
+    except Exception as e:
+        logger.error(f"Error calculating time to sale: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while calculating time to sale"
+        )
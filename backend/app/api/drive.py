@@ -11,7 +11,9 @@ import logging
 from ..database import get_db
 from ..models.vehicle import Vehicle
 from ..models.photo import Photo
-from ..services.drive_service import drive_service
+from ..services.drive_service import DriveListingError, drive_service
+from ..services.photo_sync_service import reconcile_vehicle_photos
+from ..services.photo_service import photo_service
 from ..schemas.vehicle import VehicleResponse
 
 logger = logging.getLogger(__name__)
@@ -74,6 +76,8 @@ async def list_folder_files(folder_id: str):
             "count": len(files)
         }
         
+    except DriveListingError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing Drive folder files: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -81,6 +85,7 @@ async def list_folder_files(folder_id: str):
 @router.post("/sync-photos/{vehicle_id}")
 async def sync_vehicle_photos(
     vehicle_id: int,
+    prune: bool = False,
     db: Session = Depends(get_db)
 ):
     """Sync photos from Drive folder to the system"""
@@ -93,43 +98,36 @@ async def sync_vehicle_photos(
         if not vehicle.drive_folder_id:
             raise HTTPException(status_code=400, detail="Vehicle has no Drive folder")
         
-        # Sync photos from Drive
-        synced_photos = drive_service.sync_vehicle_photos(
-            vehicle_id=vehicle_id,
-            folder_id=vehicle.drive_folder_id
-        )
+        # Sync photos from Drive; raises unless the whole folder was listed,
+        # so a failed or partial listing never flags photos as missing
+        try:
+            synced_photos = drive_service.sync_vehicle_photos(
+                vehicle_id=vehicle_id,
+                folder_id=vehicle.drive_folder_id
+            )
+        except DriveListingError as e:
+            raise HTTPException(status_code=502, detail=f"Drive listing failed, sync skipped: {e}")
         
-        # Save photos to database
-        saved_photos = []
-        for photo_data in synced_photos:
-            # Check if photo already exists
-            existing_photo = db.query(Photo).filter(
-                Photo.vehicle_id == vehicle_id,
-                Photo.drive_file_id == photo_data['drive_file_id']
-            ).first()
-            
-            if not existing_photo:
-                # Create new photo record
-                photo = Photo(
-                    vehicle_id=vehicle_id,
-                    filename=photo_data['file_name'],
-                    file_path=f"drive/{photo_data['drive_file_id']}",  # Store Drive file ID as path
-                    file_size=photo_data['file_size'],
-                    mime_type=photo_data['mime_type'],
-                    drive_file_id=photo_data['drive_file_id'],
-                    drive_url=photo_data['drive_url'],
-                    is_primary=False
-                )
-                
-                db.add(photo)
-                saved_photos.append(photo)
+        # Reconcile with the database using bulk insert/update/delete
+        result = reconcile_vehicle_photos(db, vehicle_id, synced_photos, prune=prune)
+        saved_photos = result['new_photos']
         
         db.commit()
         
+        # Retry Drive deletes that failed when these photos were deleted
+        pending_deletes = {}
+        if result['pending_delete_ids']:
+            pending_deletes = await photo_service.delete_photos(result['pending_delete_ids'])
+        
         return {
             "success": True,
             "vehicle_id": vehicle_id,
             "synced_photos": len(saved_photos),
+            "updated_photos": result['updated_count'],
+            "missing_photos": result['missing_count'],
+            "deleted_photos": result['deleted_count'],
+            "missing_file_ids": result['missing_file_ids'],
+            "pending_deletes_retried": pending_deletes.get('deleted', []),
             "photos": [
                 {
                     "id": photo.id,
@@ -145,6 +143,7 @@ async def sync_vehicle_photos(
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         logger.error(f"Error syncing vehicle photos: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -181,6 +180,8 @@ async def get_vehicle_folder_info(
             "file_count": len(files)
         }
         
+    except DriveListingError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -3,7 +3,7 @@ Facebook Reposting API Endpoints
 Daily automation for vehicle listings on Facebook and Marketplace
 """
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -24,12 +24,22 @@ from ...schemas.facebook import (
 )
 from ...services.facebook_service import FacebookService
 from ...services.automation_service import AutomationService
+from ...services.rate_limiter import rate_limiter
+from ...services.outbox_service import outbox_pool
+from ...services.post_templates import TemplateError, validate_automation_config
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _validated_automation_config(config: Optional[dict]) -> Optional[dict]:
+    """Compile the account's post template up front so bad templates are rejected on save"""
+    try:
+        return validate_automation_config(config)
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid post template: {e}")
+
 @router.get("/status", response_model=RepostingStatus)
 async def get_reposting_status(db: Session = Depends(get_db)):
     """Get current Facebook reposting status and statistics"""
@@ -55,12 +65,48 @@ async def get_reposting_status(db: Session = Depends(get_db)):
             posts_last_week=recent_posts,
             active_vehicles=active_vehicles,
             next_scheduled=automation_status.get("next_scheduled"),
-            total_posts=automation_status.get("total_posts", 0)
+            total_posts=automation_status.get("total_posts", 0),
+            scheduler_leader=automation_status.get("leader")
         )
     except Exception as e:
         logger.error(f"Error getting reposting status: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving reposting status")
 
+@router.get("/rate-limits")
+async def get_rate_limits():
+    """Get Graph API rate limiter metrics (queue depth, wait times, bucket state)"""
+    return rate_limiter.get_metrics()
+
+@router.get("/insights")
+async def get_page_insights(refresh: bool = False):
+    """Get Facebook page insights (cached unless refresh is set)"""
+    try:
+        facebook_service = FacebookService()
+        return await facebook_service.get_page_insights(use_cache=not refresh)
+    except Exception as e:
+        logger.error(f"Error getting page insights: {e}")
+        raise HTTPException(status_code=500, detail="Error retrieving page insights")
+
+@router.post("/insights/refresh")
+async def refresh_post_insights(days: int = 30, db: Session = Depends(get_db)):
+    """Pull insights for recent posts in batches into their engagement metrics"""
+    try:
+        automation_service = AutomationService(db)
+        return await automation_service.refresh_post_insights(days=days)
+    except Exception as e:
+        logger.error(f"Error refreshing post insights: {e}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Error refreshing post insights")
+
+@router.get("/outbox")
+async def get_outbox_status(db: Session = Depends(get_db)):
+    """Get post outbox counts by status and worker state"""
+    try:
+        return outbox_pool.get_stats(db)
+    except Exception as e:
+        logger.error(f"Error getting outbox status: {e}")
+        raise HTTPException(status_code=500, detail="Error retrieving outbox status")
+
 @router.get("/accounts/status", response_model=MultiAccountStatus)
 async def get_accounts_status(db: Session = Depends(get_db)):
     """Get status of all Facebook accounts"""
@@ -119,6 +165,8 @@ async def create_account(
     db: Session = Depends(get_db)
 ):
     """Create a new Facebook account"""
+    automation_config = _validated_automation_config(account_data.automation_config)
+    
     try:
         account = FacebookAccount(
             name=account_data.name,
@@ -128,7 +176,7 @@ async def create_account(
             user_id=account_data.user_id,
             app_id=account_data.app_id,
             app_secret=account_data.app_secret,
-            automation_config=account_data.automation_config
+            automation_config=automation_config
         )
         
         db.add(account)
@@ -155,6 +203,8 @@ async def update_account(
     db: Session = Depends(get_db)
 ):
     """Update Facebook account"""
+    automation_config = _validated_automation_config(account_data.automation_config)
+    
     try:
         account = db.query(FacebookAccount).filter(FacebookAccount.id == account_id).first()
         
@@ -169,7 +219,7 @@ async def update_account(
         account.user_id = account_data.user_id
         account.app_id = account_data.app_id
         account.app_secret = account_data.app_secret
-        account.automation_config = account_data.automation_config
+        account.automation_config = automation_config
         
         db.commit()
         db.refresh(account)
@@ -210,7 +260,7 @@ async def create_manual_post(
         
         # Create post using Facebook service with account credentials
         facebook_service = FacebookService(account_id=account_id, db_session=db)
-        result = facebook_service.post_to_facebook(vehicle, post_data.message)
+        result = await facebook_service.post_to_facebook(vehicle, post_data.message)
         
         if result.get("error"):
             raise HTTPException(status_code=500, detail=f"Facebook API error: {result['error']}")
@@ -308,16 +358,20 @@ async def test_facebook_post(
         raise HTTPException(status_code=500, detail="Error creating test post")
 
 @router.post("/start-automation")
-async def start_facebook_automation(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+async def start_facebook_automation(db: Session = Depends(get_db)):
     """Start Facebook automation service"""
     try:
         automation_service = AutomationService(db)
-        background_tasks.add_task(automation_service.start_facebook_automation)
-        
-        return {"message": "Facebook automation started successfully"}
+        result = automation_service.start_facebook_automation()
+        if not result.get("success"):
+            raise HTTPException(status_code=400, detail=result.get("message") or result.get("error"))
+        
+        return {
+            "message": "Facebook automation started successfully",
+            "next_scheduled": result.get("next_scheduled")
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error starting automation: {e}")
         raise HTTPException(status_code=500, detail="Error starting automation")
@@ -384,7 +438,7 @@ async def delete_facebook_post(
         # Delete from Facebook if external ID exists
         if post.external_post_id:
             facebook_service = FacebookService()
-            facebook_service.delete_post(post.external_post_id)
+            await facebook_service.delete_post(post.external_post_id)
         
         # Mark as deleted in database
         post.status = "deleted"
@@ -12,11 +12,23 @@ from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 import tempfile
 import shutil
+from collections import defaultdict
+from itertools import combinations
 
 from ...database import get_db
-from ...models.photo import Photo, PhotoCreate, PhotoUpdate, PhotoResponse, PhotoListResponse, PhotoStats, GoogleDriveSyncResponse
+from ...models.photo import (
+    Photo, PhotoCreate, PhotoUpdate, PhotoResponse, PhotoListResponse, PhotoStats, GoogleDriveSyncResponse,
+    PhotoDuplicateMatch, PhotoDuplicatesResponse
+)
 from ...models.vehicle import Vehicle
 from ...services.photo_service import photo_service
+from ...services.photo_sync_service import reconcile_vehicle_photos
+from ...services.photo_hashing import (
+    DEFAULT_MAX_DISTANCE,
+    HammingIndex,
+    compute_content_hash,
+    compute_perceptual_hash
+)
 # from ...core.config import settings  # Not used yet
 
 logger = logging.getLogger(__name__)
@@ -42,7 +54,8 @@ async def get_photos(
         if is_primary is not None:
             query = query.filter(Photo.is_primary == is_primary)
         
-        # Note: is_active field doesn't exist in Photo model, so we skip this filter
+        if is_active is not None:
+            query = query.filter(Photo.is_active == is_active)
         
         photos = query.offset(skip).limit(limit).all()
         return photos
@@ -77,6 +90,70 @@ async def get_vehicle_photos(
         logger.error(f"Failed to get vehicle photos: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve vehicle photos")
 
+@router.get("/vehicle/{vehicle_id}/duplicates", response_model=PhotoDuplicatesResponse)
+async def get_vehicle_duplicate_photos(
+    vehicle_id: int,
+    max_distance: int = Query(DEFAULT_MAX_DISTANCE, ge=0, le=16, description="Maximum perceptual hash distance for near-duplicates"),
+    db: Session = Depends(get_db)
+):
+    """Report exact and near-duplicate photos for a vehicle"""
+    try:
+        # Verify vehicle exists
+        vehicle = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
+        if not vehicle:
+            raise HTTPException(status_code=404, detail="Vehicle not found")
+        
+        rows = db.query(Photo.id, Photo.content_hash, Photo.perceptual_hash).filter(
+            Photo.vehicle_id == vehicle_id,
+            Photo.is_active == True
+        ).all()
+        
+        # Identical bytes are duplicates whether or not a perceptual hash exists
+        by_content_hash = defaultdict(list)
+        index = HammingIndex(max_distance=max_distance)
+        for row in rows:
+            if row.content_hash:
+                by_content_hash[row.content_hash].append(row.id)
+            if row.perceptual_hash:
+                index.add(row.id, int(row.perceptual_hash, 16))
+        
+        duplicates = []
+        exact_pairs = set()
+        for photo_ids in by_content_hash.values():
+            for first, second in combinations(sorted(photo_ids), 2):
+                exact_pairs.add((first, second))
+                duplicates.append(PhotoDuplicateMatch(
+                    photo_id=first,
+                    duplicate_photo_id=second,
+                    distance=0,
+                    exact=True
+                ))
+        
+        for photo_id, other_id, distance in index.pairs():
+            first, second = sorted((photo_id, other_id))
+            if (first, second) in exact_pairs:
+                continue
+            duplicates.append(PhotoDuplicateMatch(
+                photo_id=first,
+                duplicate_photo_id=second,
+                distance=distance,
+                exact=False
+            ))
+        
+        return PhotoDuplicatesResponse(
+            vehicle_id=vehicle_id,
+            max_distance=max_distance,
+            total_photos=len(rows),
+            unhashed_photos=len(rows) - len(index),
+            duplicates=duplicates
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to find duplicate photos: {e}")
+        raise HTTPException(status_code=500, detail="Failed to find duplicate photos")
+
 @router.get("/{photo_id}", response_model=PhotoResponse)
 async def get_photo(
     photo_id: int,
@@ -120,6 +197,23 @@ async def upload_photo(
             temp_file_path = temp_file.name
         
         try:
+            with open(temp_file_path, 'rb') as f:
+                file_content = f.read()
+            
+            # Skip the Drive upload when this exact file is already stored for the vehicle
+            content_hash = compute_content_hash(file_content)
+            existing_photo = db.query(Photo).filter(
+                Photo.vehicle_id == vehicle_id,
+                Photo.content_hash == content_hash,
+                Photo.is_active == True
+            ).first()
+            
+            if existing_photo:
+                logger.info(f"Duplicate upload for vehicle {vehicle_id}, reusing photo {existing_photo.id}")
+                return existing_photo
+            
+            perceptual_hash = compute_perceptual_hash(file_content)
+            
             # Import Drive service
             from ...services.drive_service import drive_service
             
@@ -143,9 +237,6 @@ async def upload_photo(
                     raise HTTPException(status_code=500, detail="Failed to create Drive folder")
             
             # Upload photo to Google Drive
-            with open(temp_file_path, 'rb') as f:
-                file_content = f.read()
-            
             drive_result = drive_service.upload_photo_to_vehicle_folder(
                 vehicle_id=vehicle_id,
                 folder_id=vehicle.drive_folder_id,
@@ -166,6 +257,8 @@ async def upload_photo(
                 drive_url=drive_result['drive_url'],
                 file_size=drive_result['file_size'],
                 mime_type=file.content_type,
+                content_hash=content_hash,
+                perceptual_hash=perceptual_hash,
                 is_primary=False,
                 order_index=0
             )
@@ -248,6 +341,29 @@ async def delete_photo(
         logger.error(f"Failed to delete photo: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete photo")
 
+@router.post("/bulk-delete")
+async def delete_photos(photo_ids: List[int]):
+    """Delete many photos, removing their Drive files with batched requests"""
+    try:
+        if not photo_ids:
+            raise HTTPException(status_code=400, detail="No photo IDs provided")
+        
+        result = await photo_service.delete_photos(photo_ids)
+        
+        if not result:
+            raise HTTPException(status_code=500, detail="Failed to delete photos")
+        
+        return {
+            "message": f"Deleted {len(result['deleted'])} photos",
+            **result
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to delete photos: {e}")
+        raise HTTPException(status_code=500, detail="Failed to delete photos")
+
 @router.get("/stats/overview", response_model=PhotoStats)
 async def get_photo_stats():
     """Get photo statistics overview"""
@@ -376,6 +492,7 @@ async def search_photos(
 @router.post("/vehicle/{vehicle_id}/sync-drive")
 async def sync_vehicle_drive_photos(
     vehicle_id: int,
+    prune: bool = Query(False, description="Delete photos whose Drive file was removed instead of flagging them inactive"),
     db: Session = Depends(get_db)
 ):
     """Sync photos from Google Drive folder to database"""
@@ -389,50 +506,40 @@ async def sync_vehicle_drive_photos(
             raise HTTPException(status_code=400, detail="Vehicle has no Drive folder")
         
         # Import Drive service
-        from ...services.drive_service import drive_service
-        
-        # Sync photos from Drive
-        drive_photos = drive_service.sync_vehicle_photos(vehicle_id, vehicle.drive_folder_id)
+        from ...services.drive_service import DriveListingError, drive_service
         
-        synced_count = 0
-        new_count = 0
-        
-        for drive_photo in drive_photos:
-            # Check if photo already exists
-            existing_photo = db.query(Photo).filter(
-                Photo.drive_file_id == drive_photo['drive_file_id']
-            ).first()
-            
-            if not existing_photo:
-                # Create new photo record
-                photo = Photo(
-                    vehicle_id=vehicle_id,
-                    filename=drive_photo['filename'],
-                    drive_file_id=drive_photo['drive_file_id'],
-                    drive_url=drive_photo['drive_url'],
-                    file_size=drive_photo['file_size'],
-                    mime_type=drive_photo['mime_type'],
-                    is_primary=False,
-                    order_index=0
-                )
-                
-                db.add(photo)
-                new_count += 1
-            
-            synced_count += 1
+        # Sync photos from Drive; raises unless the whole folder was listed,
+        # so a failed or partial listing never flags photos as missing
+        try:
+            drive_photos = drive_service.sync_vehicle_photos(vehicle_id, vehicle.drive_folder_id)
+        except DriveListingError as e:
+            raise HTTPException(status_code=502, detail=f"Drive listing failed, sync skipped: {e}")
         
+        # Reconcile the folder listing against the database in bulk
+        result = reconcile_vehicle_photos(db, vehicle_id, drive_photos, prune=prune)
         db.commit()
         
+        # Retry Drive deletes that failed when these photos were deleted
+        pending_deletes = {}
+        if result['pending_delete_ids']:
+            pending_deletes = await photo_service.delete_photos(result['pending_delete_ids'])
+        
         return {
             "message": "Drive photos synced successfully",
-            "total_files": len(drive_photos),
-            "synced_count": synced_count,
-            "new_count": new_count
+            "total_files": result['total_files'],
+            "synced_count": result['synced_count'],
+            "new_count": result['new_count'],
+            "updated_count": result['updated_count'],
+            "missing_count": result['missing_count'],
+            "deleted_count": result['deleted_count'],
+            "missing_file_ids": result['missing_file_ids'],
+            "pending_deletes_retried": pending_deletes.get('deleted', [])
         }
         
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         logger.error(f"Failed to sync Drive photos: {e}")
         raise HTTPException(status_code=500, detail="Failed to sync Drive photos")
 
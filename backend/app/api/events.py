@@ -0,0 +1,45 @@
+"""
+Events API - Server-Sent Events stream of inventory and dashboard updates
+"""
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any
+import logging
+
+from ..services.event_stream import event_broadcaster
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/events", tags=["events"])
+
+@router.get("")
+async def stream_events(request: Request):
+    """
+    Stream vehicle and photo changes plus debounced dashboard stats.
+
+    Event types: vehicle.created, vehicle.updated, vehicle.deleted,
+    vehicle.status_changed, photo.created, photo.updated, photo.deleted,
+    dashboard.stats and resync (the client missed events and should refetch).
+    """
+    event_broadcaster.start()
+    client = event_broadcaster.connect()
+    
+    return StreamingResponse(
+        event_broadcaster.stream(client, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.get("/stats")
+async def get_event_stream_stats() -> Dict[str, Any]:
+    """
+    Connected clients and messages dropped for slow clients
+    """
+    return event_broadcaster.get_stats()
@@ -0,0 +1,45 @@
+"""
+History API - Vehicle status changes across the inventory
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+import logging
+
+from ..database import get_db
+from ..schemas.status_history import StatusHistoryPage
+from ..services.status_history_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_history_since
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/history", tags=["history"])
+
+@router.get("", response_model=StatusHistoryPage)
+async def get_status_history(
+    since: Optional[datetime] = Query(None, description="Only changes at or after this time"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get status changes of all vehicles, oldest first, with keyset pagination
+    """
+    try:
+        page = get_history_since(db, since=since, limit=limit, cursor=cursor)
+        return StatusHistoryPage.model_validate(page)
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error retrieving status history: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while retrieving status history"
+        )
@@ -3,20 +3,27 @@ Vehicle API endpoints - CRUD operations for vehicles
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, or_, func, select
 from typing import List, Optional
 import logging
 
 from ..database import get_db
 from ..models.vehicle import Vehicle, VehicleStatus
+from ..models.photo import Photo
+from ..schemas.status_history import StatusHistoryPage
+from ..services.status_history_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_vehicle_history
 from ..schemas.vehicle import (
     VehicleCreate, 
     VehicleUpdate, 
     VehicleResponse, 
     VehicleListResponse,
-    VehicleStatusUpdate
+    VehicleStatusUpdate,
+    VehicleGalleryItem,
+    VehicleGalleryResponse,
+    PriceStatsResponse
 )
+from ..services.price_stats_service import DEFAULT_HISTOGRAM_BUCKETS, MAX_HISTOGRAM_BUCKETS, price_statistics
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -97,6 +104,131 @@ async def get_vehicles(
             detail="Internal server error while retrieving vehicles"
         )
 
+@router.get("/gallery", response_model=VehicleGalleryResponse)
+async def get_vehicle_gallery(
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(12, ge=1, le=200, description="Number of records to return"),
+    marca: Optional[str] = Query(None, description="Filter by brand"),
+    estatus: Optional[VehicleStatus] = Query(None, description="Filter by status"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a page of vehicles with photo count, primary photo and rendition URLs.
+    Photos are aggregated with a single windowed query instead of per-vehicle loads.
+    """
+    try:
+        filters = []
+        if marca:
+            filters.append(Vehicle.marca.ilike(f"%{marca}%"))
+        if estatus:
+            filters.append(Vehicle.estatus == estatus)
+        
+        total = db.query(func.count(Vehicle.id)).filter(*filters).scalar()
+        
+        # Page of vehicles
+        page = (
+            select(Vehicle)
+            .where(*filters)
+            .order_by(Vehicle.created_at.desc(), Vehicle.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .subquery()
+        )
+        page_vehicle = aliased(Vehicle, page)
+        
+        # Count photos per vehicle and rank them: primary first, then display order
+        ranked_photos = (
+            select(
+                Photo.vehicle_id,
+                Photo.id.label("photo_id"),
+                Photo.drive_file_id,
+                func.count(Photo.id).over(partition_by=Photo.vehicle_id).label("photo_count"),
+                func.row_number().over(
+                    partition_by=Photo.vehicle_id,
+                    order_by=(Photo.is_primary.desc(), Photo.order_index, Photo.id)
+                ).label("photo_rank")
+            )
+            .where(Photo.vehicle_id.in_(select(page.c.id)), Photo.is_active == True)
+            .subquery()
+        )
+        
+        rows = (
+            db.query(
+                page_vehicle,
+                ranked_photos.c.photo_count,
+                ranked_photos.c.photo_id,
+                ranked_photos.c.drive_file_id
+            )
+            .outerjoin(
+                ranked_photos,
+                and_(ranked_photos.c.vehicle_id == page_vehicle.id, ranked_photos.c.photo_rank == 1)
+            )
+            .order_by(page_vehicle.created_at.desc(), page_vehicle.id.desc())
+            .all()
+        )
+        
+        # Import Drive service
+        from ..services.drive_service import drive_service
+        
+        gallery = [
+            VehicleGalleryItem(
+                id=vehicle.id,
+                external_id=vehicle.external_id,
+                marca=vehicle.marca,
+                modelo=vehicle.modelo,
+                año=vehicle.año,
+                color=vehicle.color,
+                precio=float(vehicle.precio) if vehicle.precio is not None else None,
+                kilometraje=vehicle.kilometraje,
+                estatus=vehicle.estatus,
+                ubicacion=vehicle.ubicacion,
+                photo_count=photo_count or 0,
+                primary_photo_id=photo_id,
+                renditions=drive_service.get_photo_rendition_urls(drive_file_id) if drive_file_id else {}
+            )
+            for vehicle, photo_count, photo_id, drive_file_id in rows
+        ]
+        
+        logger.info(f"Retrieved gallery page with {len(gallery)} vehicles (total: {total})")
+        
+        return VehicleGalleryResponse(
+            vehicles=gallery,
+            total=total,
+            skip=skip,
+            limit=limit
+        )
+        
+    except Exception as e:
+        logger.error(f"Error retrieving vehicle gallery: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while retrieving vehicle gallery"
+        )
+
+@router.get("/price-stats", response_model=PriceStatsResponse)
+async def get_price_stats(
+    marca: Optional[str] = Query(None, description="Filter by brand"),
+    modelo: Optional[str] = Query(None, description="Filter by model"),
+    año: Optional[int] = Query(None, description="Filter by year"),
+    estatus: Optional[VehicleStatus] = Query(None, description="Filter by status"),
+    buckets: int = Query(DEFAULT_HISTOGRAM_BUCKETS, ge=1, le=MAX_HISTOGRAM_BUCKETS, description="Histogram buckets per segment"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get price percentiles, histogram and counts per marca/modelo/año segment.
+    Served from cache until a vehicle's price or segment changes.
+    """
+    try:
+        stats = price_statistics.get_stats(db, marca=marca, modelo=modelo, año=año, estatus=estatus, buckets=buckets)
+        return PriceStatsResponse.model_validate(stats)
+
+    except Exception as e:
+        logger.error(f"Error retrieving price statistics: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while retrieving price statistics"
+        )
+
 @router.get("/{vehicle_id}", response_model=VehicleResponse)
 async def get_vehicle(
     vehicle_id: int,
@@ -289,16 +421,13 @@ async def update_vehicle_status(
                 detail=f"Vehicle with ID {vehicle_id} not found"
             )
         
-        # Update status and create history record
-        status_record = vehicle.update_status(
+        # Update status; the history record is written with the commit
+        vehicle.update_status(
             new_status=status_update.estatus,
             changed_by=status_update.changed_by or "api_user",
             reason=status_update.reason,
             notes=status_update.notes
         )
-        
-        # Add status history record
-        db.add(status_record)
         db.commit()
         db.refresh(vehicle)
         
@@ -315,6 +444,40 @@ async def update_vehicle_status(
             detail="Internal server error while updating vehicle status"
         )
 
+@router.get("/{vehicle_id}/history", response_model=StatusHistoryPage)
+async def get_vehicle_status_history(
+    vehicle_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a vehicle's status changes, newest first, with keyset pagination
+    """
+    try:
+        if not db.query(Vehicle.id).filter(Vehicle.id == vehicle_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Vehicle with ID {vehicle_id} not found"
+            )
+        
+        page = get_vehicle_history(db, vehicle_id, limit=limit, cursor=cursor)
+        return StatusHistoryPage.model_validate(page)
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving status history for vehicle {vehicle_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while retrieving status history"
+        )
+
 @router.get("/status/{estatus}", response_model=VehicleListResponse)
 async def get_vehicles_by_status(
     estatus: VehicleStatus,
@@ -571,6 +734,8 @@ async def remove_vehicle_from_facebook(
         # Mark for Facebook deletion
         vehicle.estatus = VehicleStatus.VENDIDO
         
+        # Committing publishes the status change; the removal service
+        # deletes the vehicle's posts and listings within seconds
         db.commit()
         
         logger.info(f"Vehicle {vehicle_identifier} marked for Facebook deletion")
@@ -59,7 +59,8 @@ def init_db():
         # Import all models to ensure they are registered
         from .models import Vehicle, Photo, StatusHistory, SocialPost, MarketplaceListing
         from .models import User, ApiKey, AutomationWorkflow, WorkflowExecution
-        from .models import AnalyticsData, MarketIntelligence, FacebookAccount
+        from .models import AnalyticsData, MarketIntelligence, FacebookAccount, PostOutbox
+        from .models import DashboardSnapshot
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
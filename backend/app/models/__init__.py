@@ -14,6 +14,8 @@ from .workflow_execution import WorkflowExecution
 from .analytics_data import AnalyticsData
 from .market_intelligence import MarketIntelligence
 from .facebook_account import FacebookAccount
+from .post_outbox import PostOutbox
+from .dashboard_snapshot import DashboardSnapshot
 
 # TODO: Set up relationships after all models are imported
 # This will be done when we have a working database setup
@@ -30,5 +32,7 @@ __all__ = [
     "WorkflowExecution",
     "AnalyticsData",
     "MarketIntelligence",
-    "FacebookAccount"
+    "FacebookAccount",
+    "PostOutbox",
+    "DashboardSnapshot"
 ]
@@ -19,6 +19,7 @@ class AutomationWorkflow(Base):
     is_active = Column(Boolean, default=True)
     config = Column(JSON)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     def __repr__(self):
         return f"<AutomationWorkflow(id={self.id}, name='{self.name}')>"
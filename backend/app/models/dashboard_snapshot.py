@@ -0,0 +1,44 @@
+"""
+Dashboard Snapshot Model - Daily rollups of inventory statistics
+"""
+
+from sqlalchemy import Column, Integer, Date, DateTime, Numeric, JSON
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+class DashboardSnapshot(Base):
+    """End-of-day inventory counts, value and photos used for period-over-period changes"""
+
+    __tablename__ = "dashboard_snapshots"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # One row per day, rewritten if the rollup runs again that day
+    snapshot_date = Column(Date, nullable=False, unique=True)
+
+    # Inventory
+    total_vehicles = Column(Integer, nullable=False, default=0)
+    available_vehicles = Column(Integer, nullable=False, default=0)
+    sold_vehicles = Column(Integer, nullable=False, default=0)
+    reserved_vehicles = Column(Integer, nullable=False, default=0)
+    unavailable_vehicles = Column(Integer, nullable=False, default=0)
+    total_value = Column(Numeric(14, 2), nullable=False, default=0)
+    average_price = Column(Numeric(12, 2), nullable=False, default=0)
+
+    # Photos
+    total_photos = Column(Integer, nullable=False, default=0)
+    vehicles_with_photos = Column(Integer, nullable=False, default=0)
+    primary_photos = Column(Integer, nullable=False, default=0)
+
+    # Inventory analytics precomputed by the rollup (see analytics_service)
+    aging = Column(JSON)
+    time_to_sale = Column(JSON)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<DashboardSnapshot(date={self.snapshot_date}, total_vehicles={self.total_vehicles})>"
@@ -64,7 +64,10 @@ class FacebookAccount(Base):
                 "time": config.get("schedule", {}).get("time", "09:00"),
                 "days": config.get("schedule", {}).get("days", [1, 2, 3, 4, 5]),
                 "max_posts_per_day": config.get("schedule", {}).get("max_posts_per_day", 3)
-            }
+            },
+            "rate_limit": config.get("rate_limit", {}),
+            "post_template": config.get("post_template"),
+            "post_template_version": config.get("post_template_version")
         }
     
     def to_dict(self) -> dict:
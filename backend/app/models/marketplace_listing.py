@@ -3,13 +3,12 @@ Marketplace Listing Model - Manages Facebook Marketplace listings
 """
 
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
 from typing import Optional
 
-Base = declarative_base()
+from ..database import Base
 
 class MarketplaceListing(Base):
     """Marketplace listing model"""
@@ -18,6 +17,7 @@ class MarketplaceListing(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("facebook_accounts.id"), nullable=True, index=True)
     platform = Column(String(50), default="marketplace")
     listing_id = Column(String(255))
     external_listing_id = Column(String(255))
@@ -4,7 +4,7 @@ Photo Model
 Defines the Photo database model and Pydantic schemas
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from pydantic import BaseModel, Field
@@ -16,6 +16,10 @@ from ..database import Base
 class Photo(Base):
     """Photo database model"""
     __tablename__ = "photos"
+    __table_args__ = (
+        Index("idx_photos_vehicle_drive_file", "vehicle_id", "drive_file_id"),
+        Index("idx_photos_vehicle_content_hash", "vehicle_id", "content_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
@@ -25,10 +29,15 @@ class Photo(Base):
     drive_file_id = Column(String(255), nullable=True, index=True)
     order_index = Column(Integer, default=0)
     is_primary = Column(Boolean, default=False)
+    is_active = Column(Boolean, default=True, index=True)
     file_size = Column(Integer, nullable=True)
     mime_type = Column(String(100), nullable=True)
     width = Column(Integer, nullable=True)
     height = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    perceptual_hash = Column(String(16), nullable=True)
+    # Deleted by a user but the Drive file couldn't be removed; retried on the next delete or sync
+    drive_delete_pending = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -48,10 +57,13 @@ class PhotoBase(BaseModel):
     drive_file_id: Optional[str] = Field(None, description="Google Drive file ID")
     order_index: int = Field(0, description="Order index for photo display")
     is_primary: bool = Field(False, description="Whether this is the primary photo for the vehicle")
+    is_active: bool = Field(True, description="Whether the photo still exists in Google Drive")
     file_size: Optional[int] = Field(None, description="Size of the file in bytes")
     mime_type: Optional[str] = Field(None, description="MIME type of the file")
     width: Optional[int] = Field(None, description="Photo width in pixels")
     height: Optional[int] = Field(None, description="Photo height in pixels")
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the file content")
+    perceptual_hash: Optional[str] = Field(None, description="64-bit difference hash (hex) of the image")
 
 class PhotoCreate(PhotoBase):
     """Schema for creating a new photo"""
@@ -65,6 +77,7 @@ class PhotoUpdate(BaseModel):
     drive_file_id: Optional[str] = Field(None, description="Google Drive file ID")
     order_index: Optional[int] = Field(None, description="Order index for photo display")
     is_primary: Optional[bool] = Field(None, description="Whether this is the primary photo")
+    is_active: Optional[bool] = Field(None, description="Whether the photo still exists in Google Drive")
     file_size: Optional[int] = Field(None, description="Size of the file in bytes")
     mime_type: Optional[str] = Field(None, description="MIME type of the file")
     width: Optional[int] = Field(None, description="Photo width in pixels")
@@ -99,3 +112,18 @@ class GoogleDriveSyncResponse(BaseModel):
     total_files: int
     synced_count: int
     new_count: int
+
+class PhotoDuplicateMatch(BaseModel):
+    """Schema for a pair of duplicate or near-duplicate photos"""
+    photo_id: int
+    duplicate_photo_id: int
+    distance: int = Field(..., description="Hamming distance between perceptual hashes (0 for exact duplicates)")
+    exact: bool = Field(..., description="Whether both files have the same content hash")
+
+class PhotoDuplicatesResponse(BaseModel):
+    """Schema for vehicle duplicate photo reports"""
+    vehicle_id: int
+    max_distance: int
+    total_photos: int
+    unhashed_photos: int
+    duplicates: list[PhotoDuplicateMatch]
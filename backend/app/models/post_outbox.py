@@ -0,0 +1,58 @@
+"""
+Post Outbox Model - Durable queue of social post intents
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+class PostOutbox(Base):
+    """Social post intent, recorded before the API call and executed by outbox workers"""
+
+    __tablename__ = "post_outbox"
+    __table_args__ = (
+        Index("idx_post_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    # Statuses
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Deduplicates intents: the same key is only ever enqueued (and posted) once
+    idempotency_key = Column(String(255), nullable=False, unique=True)
+
+    # Foreign keys
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("facebook_accounts.id"), nullable=True)
+    social_post_id = Column(Integer, ForeignKey("social_posts.id"), nullable=True)
+
+    # Post intent
+    platform = Column(String(50), nullable=False, default="facebook")
+    message = Column(Text)
+    include_marketplace = Column(Boolean, default=False)
+
+    # Delivery state
+    status = Column(String(50), nullable=False, default=PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    locked_at = Column(DateTime(timezone=True))
+    locked_by = Column(String(255))
+    last_error = Column(Text)
+    external_post_id = Column(String(255))
+    # Set once the Marketplace step succeeds; retries only redo the missing step
+    external_listing_id = Column(String(255))
+
+    # Metadata
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<PostOutbox(id={self.id}, vehicle_id={self.vehicle_id}, status={self.status})>"
@@ -2,8 +2,7 @@
 Social Post Model - Manages social media posts for vehicles
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -15,6 +14,9 @@ class SocialPost(Base):
     """Social media post model"""
     
     __tablename__ = "social_posts"
+    __table_args__ = (
+        Index("idx_social_posts_vehicle_platform_status_created", "vehicle_id", "platform", "status", "created_at"),
+    )
     
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
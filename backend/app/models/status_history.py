@@ -2,25 +2,29 @@
 Status History Model - Tracks vehicle status changes
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
 from typing import Optional
 
-Base = declarative_base()
+from ..database import Base
 
 class StatusHistory(Base):
     """Status history model for tracking vehicle status changes"""
     
     __tablename__ = "status_history"
+    __table_args__ = (
+        # Keyset pagination: per vehicle and across all vehicles, by time then id
+        Index("idx_status_history_vehicle_changed_at_id", "vehicle_id", "changed_at", "id"),
+        Index("idx_status_history_changed_at_id", "changed_at", "id"),
+    )
     
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
     
     # Foreign key to vehicle
-    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False, index=True)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # Status information
     old_status = Column(String(50))
@@ -43,8 +47,8 @@ class StatusHistory(Base):
         return {
             "id": self.id,
             "vehicle_id": self.vehicle_id,
-            "old_status": self.old_status.value if self.old_status else None,
-            "new_status": self.new_status.value if self.new_status else None,
+            "old_status": getattr(self.old_status, "value", self.old_status),
+            "new_status": getattr(self.new_status, "value", self.new_status),
             "changed_at": self.changed_at.isoformat() if self.changed_at else None,
             "changed_by": self.changed_by,
             "reason": self.reason,
@@ -59,6 +59,9 @@ class Vehicle(Base):
     # Relationships
     photos = relationship("Photo", back_populates="vehicle", cascade="all, delete-orphan")
     social_posts = relationship("SocialPost", back_populates="vehicle", cascade="all, delete-orphan")
+    marketplace_listings = relationship("MarketplaceListing", back_populates="vehicle", cascade="all, delete-orphan")
+    # History rows are removed by the database's ON DELETE CASCADE, never loaded for deletes
+    status_history = relationship("StatusHistory", back_populates="vehicle", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Vehicle(id={self.id}, marca='{self.marca}', modelo='{self.modelo}', año={self.año})>"
@@ -89,13 +92,13 @@ class Vehicle(Base):
         return self.estatus == VehicleStatus.AUSENTE
     
     def update_status(self, new_status: VehicleStatus, changed_by: str, reason: str = None, notes: str = None):
-        """Update vehicle status and record in history"""
-        old_status = self.estatus
+        """
+        Update vehicle status. The history row is written when the session
+        commits; changed_by, reason and notes are carried over to it.
+        """
         self.estatus = new_status
         self.updated_by = changed_by
-        
-        # TODO: Create status history record when relationships are working
-        return None
+        self.status_change_context = {"changed_by": changed_by, "reason": reason, "notes": notes}
     
     def get_primary_photo(self):
         """Get the primary photo for this vehicle"""
@@ -118,8 +121,7 @@ class Vehicle(Base):
     
     def get_active_marketplace_listings(self):
         """Get active marketplace listings"""
-        # TODO: Implement when relationships are working
-        return []
+        return [listing for listing in self.marketplace_listings if listing.status == "active"]
     
     def to_dict(self) -> dict:
         """Convert vehicle to dictionary for API responses"""
@@ -10,6 +10,7 @@ from .vehicle import (
     VehicleListResponse,
     VehicleStatusUpdate
 )
+from .status_history import StatusHistoryResponse, StatusHistoryPage
 
 __all__ = [
     "VehicleBase",
@@ -17,5 +18,7 @@ __all__ = [
     "VehicleUpdate",
     "VehicleResponse",
     "VehicleListResponse",
-    "VehicleStatusUpdate"
+    "VehicleStatusUpdate",
+    "StatusHistoryResponse",
+    "StatusHistoryPage"
 ]
@@ -85,6 +85,7 @@ class RepostingStatus(BaseModel):
     active_vehicles: int = 0
     next_scheduled: Optional[datetime] = None
     total_posts: int = 0
+    scheduler_leader: Optional[str] = Field(None, description="Process currently running the scheduler")
     
     class Config:
         from_attributes = True
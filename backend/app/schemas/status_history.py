@@ -0,0 +1,29 @@
+"""
+Status History Schemas - Vehicle status change records
+"""
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class StatusHistoryResponse(BaseModel):
+    """Schema for one recorded status change"""
+    
+    id: int
+    vehicle_id: int
+    old_status: Optional[str] = None
+    new_status: str
+    changed_at: datetime
+    changed_by: Optional[str] = None
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class StatusHistoryPage(BaseModel):
+    """Schema for a keyset-paginated page of status changes"""
+    
+    items: List[StatusHistoryResponse] = Field(..., description="Status changes in this page")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page; null on the last page")
+    limit: int = Field(..., description="Maximum number of records per page")
@@ -215,6 +215,57 @@ class VehicleSummary(BaseModel):
     class Config:
         from_attributes = True
 
+class VehicleGalleryItem(BaseModel):
+    """Schema for a vehicle card in the gallery, with its primary photo"""
+    
+    id: int
+    external_id: Optional[str] = None
+    marca: str
+    modelo: str
+    año: int
+    color: Optional[str] = None
+    precio: Optional[float] = None
+    kilometraje: Optional[str] = None
+    estatus: VehicleStatus
+    ubicacion: Optional[str] = None
+    photo_count: int = Field(0, description="Number of active photos for this vehicle")
+    primary_photo_id: Optional[int] = Field(None, description="Primary photo ID (first photo when none is marked primary)")
+    renditions: Dict[str, str] = Field(default_factory=dict, description="Primary photo URLs by rendition size")
+
+class VehicleGalleryResponse(BaseModel):
+    """Schema for the vehicle gallery API response"""
+    
+    vehicles: List[VehicleGalleryItem] = Field(..., description="Page of vehicles with primary photo data")
+    total: int = Field(..., description="Total number of vehicles matching the filters")
+    skip: int = Field(..., description="Number of records skipped")
+    limit: int = Field(..., description="Number of records returned")
+
+class PriceHistogramBucket(BaseModel):
+    """Schema for one equal-width price bucket"""
+
+    min: float
+    max: float
+    count: int
+
+class PriceSegmentStats(BaseModel):
+    """Schema for the price distribution of one marca/modelo/año segment"""
+
+    marca: str
+    modelo: str
+    año: int
+    count: int = Field(..., description="Number of priced vehicles in the segment")
+    min: float
+    max: float
+    mean: float
+    percentiles: Dict[str, float] = Field(..., description="Interpolated price percentiles (p10, p25, p50, p75, p90)")
+    histogram: List[PriceHistogramBucket] = Field(..., description="Equal-width buckets from min to max price")
+
+class PriceStatsResponse(BaseModel):
+    """Schema for the price statistics API response"""
+
+    total: int = Field(..., description="Number of priced vehicles matching the filters")
+    segments: List[PriceSegmentStats]
+
 class VehicleStats(BaseModel):
     """Schema for vehicle statistics"""
     
@@ -0,0 +1,331 @@
+"""
+Analytics Service
+Inventory aging and time-to-sale metrics computed from status history
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import bindparam, case, func, literal, select
+from sqlalchemy.orm import Session
+
+from ..models.vehicle import Vehicle
+from ..models.status_history import StatusHistory
+from ..models.dashboard_snapshot import DashboardSnapshot
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Stored results are served from memory for the rest of the day
+RESULTS_TTL_SECONDS = 24 * 3600
+
+# A stored result older than this is stale (the rollup stopped); compute live instead
+MAX_SNAPSHOT_AGE_DAYS = 1
+
+# Results keep every marca/modelo group (the API's largest limit); requests slice them
+MAX_GROUPS = 500
+
+METRICS = ("aging", "time_to_sale")
+
+# Days-on-lot buckets: (label, lower bound inclusive); the last one is open-ended
+AGING_BUCKETS = (("0-15", 0), ("16-30", 16), ("31-60", 31), ("61-90", 61), ("90+", 91))
+
+SOLD_STATUS = "VENDIDO"
+
+
+def _days_between(end, start, dialect: str):
+    """Fractional days from start to end as a SQL expression"""
+    if dialect == "postgresql":
+        return func.extract("epoch", end - start) / 86400.0
+    return func.julianday(end) - func.julianday(start)
+
+
+def _least(first, second, dialect: str):
+    if dialect == "postgresql":
+        return func.least(first, second)
+    # SQLite's two-argument min() is the scalar minimum
+    return func.min(first, second)
+
+
+def _history_summary():
+    """Per vehicle: its creation history row, first transition and first sale"""
+    return select(
+        StatusHistory.vehicle_id,
+        func.min(case((StatusHistory.old_status.is_(None), StatusHistory.changed_at))).label("created_at"),
+        func.min(StatusHistory.changed_at).label("first_change_at"),
+        func.min(case((StatusHistory.new_status == SOLD_STATUS, StatusHistory.changed_at))).label("sold_at")
+    ).group_by(StatusHistory.vehicle_id).subquery()
+
+
+def _listed_at(history, dialect: str):
+    """
+    When a vehicle was listed: its creation history row (old_status IS NULL).
+    Vehicles created before history capture have no such row, so their first
+    recorded transition is not their listing; use created_at, or that first
+    transition if it is earlier.
+    """
+    return func.coalesce(
+        history.c.created_at,
+        _least(Vehicle.created_at, history.c.first_change_at, dialect),
+        Vehicle.created_at,
+        history.c.first_change_at
+    )
+
+
+def _round(value, digits: int = 1):
+    return round(float(value), digits) if value is not None else None
+
+
+class InventoryAnalytics:
+    """
+    Aging and time-to-sale metrics over status_history joined to vehicles.
+
+    Each metric is one grouped query (plus the oldest units for aging): time
+    in a status runs to the next transition (lead() over the vehicle's
+    history), and sale prices are compared with their model's average through
+    avg() over a window. Only grouped rows come back; the totals are derived
+    from them.
+
+    Both metrics are computed by the daily dashboard rollup and stored on its
+    snapshot. Requests serve the latest stored result (kept in memory for the
+    day) and only compute live on refresh or before the first rollup.
+    """
+
+    def __init__(self, ttl_seconds: float = RESULTS_TTL_SECONDS):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=len(METRICS))
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def compute(self, db: Session) -> Dict[str, Dict[str, Any]]:
+        """Both metrics with every group, as stored by the daily rollup"""
+        return {metric: self._compute(db, metric) for metric in METRICS}
+
+    def get_aging(self, db: Session, limit: int = 50, refresh: bool = False) -> Dict[str, Any]:
+        return self._get(db, "aging", limit, refresh)
+
+    def get_time_to_sale(self, db: Session, limit: int = 50, refresh: bool = False) -> Dict[str, Any]:
+        return self._get(db, "time_to_sale", limit, refresh)
+
+    def _get(self, db: Session, metric: str, limit: int, refresh: bool) -> Dict[str, Any]:
+        key = (metric, date.today())
+        if refresh:
+            result = self._compute(db, metric)
+            self._cache.set(key, result)
+        else:
+            result = self._cache.get_or_set(key, lambda: self._load_stored(db, metric) or self._compute(db, metric))
+        return {**result, "by_model": result["by_model"][:limit]}
+
+    def _load_stored(self, db: Session, metric: str) -> Optional[Dict[str, Any]]:
+        """The metric from today's or yesterday's rollup snapshot, if there is one"""
+        oldest = date.today() - timedelta(days=MAX_SNAPSHOT_AGE_DAYS)
+        return db.query(getattr(DashboardSnapshot, metric)).filter(
+            DashboardSnapshot.snapshot_date >= oldest
+        ).order_by(
+            DashboardSnapshot.snapshot_date.desc()
+        ).limit(1).scalar()
+
+    def _compute(self, db: Session, metric: str) -> Dict[str, Any]:
+        if metric == "aging":
+            return self._compute_aging(db, MAX_GROUPS)
+        return self._compute_time_to_sale(db, MAX_GROUPS)
+
+    def _compute_aging(self, db: Session, limit: int) -> Dict[str, Any]:
+        dialect = db.get_bind().dialect.name
+        now = bindparam("now", datetime.now())
+
+        history = _history_summary()
+        listed_at = _listed_at(history, dialect)
+        on_lot = select(
+            Vehicle.id,
+            Vehicle.marca,
+            Vehicle.modelo,
+            Vehicle.año,
+            Vehicle.precio,
+            Vehicle.estatus,
+            _days_between(now, listed_at, dialect).label("days_on_lot")
+        ).select_from(Vehicle).outerjoin(
+            history, history.c.vehicle_id == Vehicle.id
+        ).where(Vehicle.estatus != SOLD_STATUS).cte("on_lot")
+
+        bucket = case(
+            *[(on_lot.c.days_on_lot < bound, label) for (label, _), (_, bound) in zip(AGING_BUCKETS, AGING_BUCKETS[1:])],
+            else_=AGING_BUCKETS[-1][0]
+        ).label("bucket")
+
+        # One pass grouped by model and bucket; every total below is derived from it
+        rows = db.execute(
+            select(
+                on_lot.c.marca,
+                on_lot.c.modelo,
+                bucket,
+                func.count().label("vehicles"),
+                func.sum(on_lot.c.days_on_lot).label("days"),
+                func.max(on_lot.c.days_on_lot).label("max_days"),
+                func.sum(on_lot.c.precio).label("value")
+            ).group_by(on_lot.c.marca, on_lot.c.modelo, bucket)
+        ).all()
+
+        oldest_rows = db.execute(
+            select(on_lot).order_by(on_lot.c.days_on_lot.desc()).limit(10)
+        ).all()
+
+        buckets = {label: {"count": 0, "value": 0.0} for label, _ in AGING_BUCKETS}
+        models: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            buckets[row.bucket]["count"] += row.vehicles
+            buckets[row.bucket]["value"] += float(row.value or 0)
+            model = models.setdefault((row.marca, row.modelo), {"vehicles": 0, "days": 0.0, "max_days": 0.0})
+            model["vehicles"] += row.vehicles
+            model["days"] += float(row.days or 0)
+            model["max_days"] = max(model["max_days"], float(row.max_days or 0))
+
+        total = sum(model["vehicles"] for model in models.values())
+        by_model = sorted(
+            (
+                {
+                    "marca": marca,
+                    "modelo": modelo,
+                    "vehicles": model["vehicles"],
+                    "avg_days_on_lot": _round(model["days"] / model["vehicles"]),
+                    "max_days_on_lot": _round(model["max_days"])
+                }
+                for (marca, modelo), model in models.items()
+            ),
+            key=lambda item: item["avg_days_on_lot"],
+            reverse=True
+        )
+
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "vehicles_on_lot": total,
+            "avg_days_on_lot": _round(sum(model["days"] for model in models.values()) / total) if total else None,
+            "max_days_on_lot": _round(max(model["max_days"] for model in models.values())) if total else None,
+            "buckets": buckets,
+            "by_model": by_model[:limit],
+            "oldest": [
+                {
+                    "vehicle_id": row.id,
+                    "marca": row.marca,
+                    "modelo": row.modelo,
+                    "año": row.año,
+                    "precio": float(row.precio) if row.precio is not None else None,
+                    "estatus": getattr(row.estatus, "value", row.estatus),
+                    "days_on_lot": _round(row.days_on_lot)
+                }
+                for row in oldest_rows
+            ]
+        }
+
+    def _compute_time_to_sale(self, db: Session, limit: int) -> Dict[str, Any]:
+        dialect = db.get_bind().dialect.name
+        now = bindparam("now", datetime.now())
+
+        # Listing time and first sale of every vehicle that has sold
+        history = _history_summary()
+        listed_at = _listed_at(history, dialect)
+
+        # Price effect: each sale against the average price of its model's sales
+        sales = select(
+            Vehicle.marca,
+            Vehicle.modelo,
+            Vehicle.precio,
+            _days_between(history.c.sold_at, listed_at, dialect).label("days_to_sale"),
+            func.avg(Vehicle.precio).over(partition_by=(Vehicle.marca, Vehicle.modelo)).label("model_avg_price")
+        ).select_from(history).join(
+            Vehicle, Vehicle.id == history.c.vehicle_id
+        ).where(history.c.sold_at.isnot(None)).cte("sales")
+
+        position = case(
+            (sales.c.precio.is_(None), literal("unpriced")),
+            (sales.c.precio < sales.c.model_avg_price, literal("below_model_average")),
+            else_=literal("at_or_above_model_average")
+        ).label("position")
+
+        rows = db.execute(
+            select(
+                sales.c.marca,
+                sales.c.modelo,
+                position,
+                func.count().label("sold"),
+                func.sum(sales.c.days_to_sale).label("days"),
+                func.min(sales.c.days_to_sale).label("min_days"),
+                func.max(sales.c.days_to_sale).label("max_days"),
+                func.sum(sales.c.precio).label("price"),
+                func.count(sales.c.precio).label("priced")
+            ).group_by(sales.c.marca, sales.c.modelo, position)
+        ).all()
+
+        # Time spent in each status: until the vehicle's next transition, or now
+        left_at = func.lead(StatusHistory.changed_at).over(
+            partition_by=StatusHistory.vehicle_id,
+            order_by=(StatusHistory.changed_at, StatusHistory.id)
+        )
+        transitions = select(
+            StatusHistory.new_status,
+            _days_between(func.coalesce(left_at, now), StatusHistory.changed_at, dialect).label("days")
+        ).cte("transitions")
+        status_rows = db.execute(
+            select(
+                transitions.c.new_status,
+                func.count(),
+                func.avg(transitions.c.days)
+            ).where(transitions.c.new_status != SOLD_STATUS).group_by(transitions.c.new_status)
+        ).all()
+
+        models: Dict[tuple, Dict[str, Any]] = {}
+        positions: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            model = models.setdefault((row.marca, row.modelo), {
+                "sold": 0, "days": 0.0, "min_days": None, "max_days": None, "price": 0.0, "priced": 0
+            })
+            days, min_days, max_days = float(row.days or 0), float(row.min_days or 0), float(row.max_days or 0)
+            model["sold"] += row.sold
+            model["days"] += days
+            model["min_days"] = min_days if model["min_days"] is None else min(model["min_days"], min_days)
+            model["max_days"] = max_days if model["max_days"] is None else max(model["max_days"], max_days)
+            model["price"] += float(row.price or 0)
+            model["priced"] += row.priced
+
+            bucket = positions.setdefault(row.position, {"sold": 0, "days": 0.0})
+            bucket["sold"] += row.sold
+            bucket["days"] += days
+
+        total = sum(model["sold"] for model in models.values())
+        by_model = sorted(
+            (
+                {
+                    "marca": marca,
+                    "modelo": modelo,
+                    "sold": model["sold"],
+                    "avg_days_to_sale": _round(model["days"] / model["sold"]),
+                    "min_days_to_sale": _round(model["min_days"]),
+                    "max_days_to_sale": _round(model["max_days"]),
+                    "avg_price": _round(model["price"] / model["priced"], 2) if model["priced"] else None
+                }
+                for (marca, modelo), model in models.items()
+            ),
+            key=lambda item: (-item["sold"], item["marca"] or "", item["modelo"] or "")
+        )
+
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "vehicles_sold": total,
+            "avg_days_to_sale": _round(sum(model["days"] for model in models.values()) / total) if total else None,
+            "min_days_to_sale": _round(min(model["min_days"] for model in models.values())) if total else None,
+            "max_days_to_sale": _round(max(model["max_days"] for model in models.values())) if total else None,
+            "by_model": by_model[:limit],
+            "price_position": {
+                label: {"sold": bucket["sold"], "avg_days_to_sale": _round(bucket["days"] / bucket["sold"])}
+                for label, bucket in positions.items()
+            },
+            "status_durations": {
+                getattr(status, "value", status): {"transitions": count, "avg_days": _round(avg_days)}
+                for status, count, avg_days in status_rows
+            }
+        }
+
+
+# Global analytics instance
+inventory_analytics = InventoryAnalytics()
@@ -5,25 +5,255 @@ Automation Service - Manages daily Facebook reposting automation
 import os
 import logging
 import asyncio
+import heapq
+import itertools
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
 import json
 
+from sqlalchemy import func, select
+
+from ..database import SessionLocal
 from ..models.automation_workflow import AutomationWorkflow
 from ..models.vehicle import Vehicle
 from ..models.social_post import SocialPost
+from ..models.marketplace_listing import MarketplaceListing
+from ..models.facebook_account import FacebookAccount
 from .facebook_service import FacebookService
+from .outbox_service import enqueue_post, outbox_pool
+from .leader_election import LeaderElection
+from .post_templates import post_renderer
+from .rollup_service import schedule_dashboard_rollup
 
 logger = logging.getLogger(__name__)
 
+FACEBOOK_REPOSTING_JOB = "facebook_reposting"
+
+# Upper bound on a single sleep so wall-clock changes (DST, suspend) are picked up
+MAX_SLEEP_SECONDS = 3600
+
+
+class RepostScheduler:
+    """
+    Event-driven scheduler for automation jobs.
+
+    Keeps a min-heap of (fire_time, job) entries and sleeps until the earliest
+    one is due instead of polling. Rescheduling a job pushes a new entry and
+    wakes the loop; superseded entries are skipped lazily when popped. An
+    optional wakeup hook runs each time the loop wakes, before due jobs fire;
+    with a hook interval the loop wakes at least that often, otherwise at least
+    every MAX_SLEEP_SECONDS.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._queue: List[Tuple[datetime, int, str]] = []
+        self._next_runs: Dict[str, datetime] = {}
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._on_wakeup: Optional[Callable[[], Awaitable[None]]] = None
+        self._wakeup_interval: Optional[float] = None
+        # Last seen change marker per job, for wakeup hooks that resync from the database
+        self.watermarks: Dict[str, Any] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def set_wakeup_hook(self, hook: Optional[Callable[[], Awaitable[None]]], interval: Optional[float] = None):
+        """Run hook on every wakeup; interval caps the sleep so the hook runs at least that often"""
+        self._on_wakeup = hook
+        self._wakeup_interval = interval
+        self._notify()
+
+    def next_run(self, job: str) -> Optional[datetime]:
+        """Next fire time for a job, if scheduled"""
+        return self._next_runs.get(job)
+
+    def get_config(self, job: str) -> Optional[Dict[str, Any]]:
+        """Config the job is currently scheduled with"""
+        return self._configs.get(job)
+
+    def schedule(
+        self,
+        job: str,
+        config: Dict[str, Any],
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        fire_at: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """
+        Schedule (or reschedule) a job and make sure the loop is running.
+        fire_at overrides the computed time, e.g. to catch up on a missed window.
+        """
+        self._configs[job] = config
+        self._handlers[job] = handler
+
+        if fire_at is None:
+            fire_at = calculate_next_run(config)
+
+        if fire_at is None:
+            self.cancel(job)
+            return None
+
+        self._next_runs[job] = fire_at
+        heapq.heappush(self._queue, (fire_at, next(self._counter), job))
+        logger.info(f"Scheduled {job} for {fire_at.isoformat()}")
+
+        self._ensure_running()
+        return fire_at
+
+    def cancel(self, job: str):
+        """Drop a job; its queued entries become stale"""
+        self._next_runs.pop(job, None)
+        self._configs.pop(job, None)
+        self._handlers.pop(job, None)
+        self._notify()
+
+    def stop(self):
+        """Stop the scheduler loop and forget all jobs"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._queue.clear()
+        self._next_runs.clear()
+        self._configs.clear()
+        self._handlers.clear()
+        self.watermarks.clear()
+
+    def _ensure_running(self):
+        if self.is_running:
+            self._notify()
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        """Pop due jobs, run them, then sleep until the next one or a wakeup"""
+        try:
+            while self._next_runs:
+                self._wakeup.clear()
+                if self._on_wakeup is not None:
+                    try:
+                        await self._on_wakeup()
+                    except Exception as e:
+                        logger.error(f"Error in scheduler wakeup hook: {e}")
+                now = datetime.now()
+
+                while self._queue and self._queue[0][0] <= now:
+                    fire_at, _, job = heapq.heappop(self._queue)
+                    if self._next_runs.get(job) != fire_at:
+                        continue
+
+                    del self._next_runs[job]
+                    config = self._configs[job]
+                    try:
+                        await self._handlers[job](config)
+                    except Exception as e:
+                        logger.error(f"Error running scheduled job {job}: {e}")
+
+                    # The handler may have rescheduled or cancelled the job
+                    if job not in self._next_runs and job in self._configs:
+                        next_fire = calculate_next_run(config, after=max(fire_at, datetime.now()))
+                        if next_fire:
+                            self._next_runs[job] = next_fire
+                            heapq.heappush(self._queue, (next_fire, next(self._counter), job))
+                            logger.info(f"Scheduled {job} for {next_fire.isoformat()}")
+
+                    now = datetime.now()
+
+                timeout = min(MAX_SLEEP_SECONDS, self._wakeup_interval or MAX_SLEEP_SECONDS)
+                if self._queue:
+                    timeout = min(timeout, max((self._queue[0][0] - now).total_seconds(), 0))
+
+                # asyncio.wait, unlike wait_for on Python < 3.12, never swallows a
+                # cancel that arrives just as the wakeup event is set
+                waiter = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait({waiter}, timeout=timeout)
+                finally:
+                    waiter.cancel()
+
+        except asyncio.CancelledError:
+            logger.info("Automation scheduler cancelled")
+            raise
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+
+def calculate_next_run(config: Dict[str, Any], after: Optional[datetime] = None) -> Optional[datetime]:
+    """Next configured posting time strictly after `after` (default: now)"""
+    if not config.get("is_active", False):
+        return None
+
+    days = config.get("days_of_week", [1,2,3,4,5])  # Monday to Friday by default
+    if not days:
+        return None
+
+    after = after or datetime.now()
+    hour, minute = map(int, config.get("time_of_day", "09:00").split(":"))
+    base = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    for days_ahead in range(8):
+        candidate = base + timedelta(days=days_ahead)
+        if candidate > after and candidate.weekday() in days:
+            return candidate
+
+    return None
+
+
+def calculate_previous_run(config: Dict[str, Any], before: Optional[datetime] = None) -> Optional[datetime]:
+    """Most recent configured posting time at or before `before` (default: now)"""
+    if not config.get("is_active", False):
+        return None
+
+    days = config.get("days_of_week", [1,2,3,4,5])
+    if not days:
+        return None
+
+    before = before or datetime.now()
+    hour, minute = map(int, config.get("time_of_day", "09:00").split(":"))
+    base = before.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    for days_back in range(8):
+        candidate = base - timedelta(days=days_back)
+        if candidate <= before and candidate.weekday() in days:
+            return candidate
+
+    return None
+
+
+async def run_facebook_reposting(config: Dict[str, Any]):
+    """Scheduler handler: run the daily reposting on a fresh session"""
+    db = repost_scheduler.session_factory()
+    try:
+        service = AutomationService(db)
+        if service._should_post_now(config):
+            await service._execute_daily_reposting()
+    finally:
+        db.close()
+
+
 class AutomationService:
     """Service for managing automation workflows"""
     
     def __init__(self, db_session):
         self.db = db_session
         self.facebook_service = FacebookService()
-        self.is_running = False
-        self.scheduler_task = None
+
+    @property
+    def is_running(self) -> bool:
+        if scheduler_leader.is_leader:
+            return repost_scheduler.is_running and repost_scheduler.next_run(FACEBOOK_REPOSTING_JOB) is not None
+        # Another process leads; it runs whatever the workflow row says
+        return scheduler_leader.get_leader_info()["leader"] is not None
         
     def get_facebook_automation_status(self) -> Dict[str, Any]:
         """Get current Facebook automation status"""
@@ -53,9 +283,14 @@ class AutomationService:
                 SocialPost.platform == "facebook"
             ).count()
             
-            # Calculate next scheduled time
+            # Prefer the scheduler's queued fire time, fall back to the config
             config = workflow.config or {}
-            next_scheduled = self._calculate_next_scheduled_time(config)
+            next_scheduled = (
+                repost_scheduler.next_run(FACEBOOK_REPOSTING_JOB)
+                or self._calculate_next_scheduled_time(config)
+            )
+            
+            leader = scheduler_leader.get_leader_info()
             
             return {
                 "is_active": workflow.is_active and self.is_running,
@@ -63,7 +298,9 @@ class AutomationService:
                 "next_scheduled": next_scheduled,
                 "total_posts": total_posts,
                 "workflow_name": workflow.name,
-                "config": config
+                "config": config,
+                "leader": leader["leader"],
+                "is_leader": leader["is_self"]
             }
             
         except Exception as e:
@@ -75,6 +312,9 @@ class AutomationService:
     
     def schedule_facebook_reposting(self, schedule: Dict[str, Any]) -> Dict[str, Any]:
         """Schedule Facebook reposting automation"""
+        if hasattr(schedule, "model_dump"):
+            schedule = schedule.model_dump()
+
         try:
             # Check if workflow exists
             workflow = self.db.query(AutomationWorkflow).filter(
@@ -98,9 +338,12 @@ class AutomationService:
             
             self.db.commit()
             
-            # Start automation if enabled
+            # Reschedule immediately so the new config takes effect without waiting;
+            # a window moved to earlier today fires now unless it was already posted
             if schedule.get("is_active", False):
-                self.start_facebook_automation()
+                self.start_facebook_automation(config=schedule)
+            else:
+                repost_scheduler.cancel(FACEBOOK_REPOSTING_JOB)
             
             return {
                 "success": True,
@@ -116,80 +359,128 @@ class AutomationService:
                 "error": str(e)
             }
     
-    def start_facebook_automation(self):
-        """Start Facebook automation service"""
-        if self.is_running:
-            logger.info("Facebook automation already running")
-            return
-        
+    def start_facebook_automation(self, config: Optional[Dict[str, Any]] = None, catch_up: bool = True):
+        """
+        Start (or reschedule) Facebook automation.
+
+        Without a config the stored workflow is (re)enabled, so the leader picks
+        it up even when it runs in another process. Only the leader queues the
+        next posting time; with catch_up, if today's window already passed
+        without a post (e.g. the process was down), it fires now.
+        """
         try:
-            self.is_running = True
+            if config is None:
+                workflow = self.db.query(AutomationWorkflow).filter(
+                    AutomationWorkflow.workflow_type == FACEBOOK_REPOSTING_JOB
+                ).first()
+                if not workflow:
+                    logger.info("No Facebook automation workflow to start")
+                    return {"success": False, "message": "No automation workflow configured"}
+                
+                config = workflow.config or {}
+                if not workflow.is_active or not config.get("is_active", False):
+                    config = {**config, "is_active": True}
+                    workflow.is_active = True
+                    workflow.config = config
+                    self.db.commit()
+
+            if not scheduler_leader.is_leader:
+                leader = scheduler_leader.get_leader_info()["leader"]
+                logger.info(f"Facebook automation enabled; scheduling is handled by leader {leader}")
+                return {
+                    "success": True,
+                    "message": "Automation enabled on the leader",
+                    "next_scheduled": calculate_next_run(config),
+                    "leader": leader
+                }
+
+            fire_at = None
+            missed = self._find_missed_window(config) if catch_up else None
+            if missed:
+                logger.info(f"Missed Facebook posting window at {missed.isoformat()}, catching up")
+                fire_at = datetime.now()
+
+            next_run = repost_scheduler.schedule(
+                FACEBOOK_REPOSTING_JOB, config, run_facebook_reposting, fire_at=fire_at
+            )
             logger.info("Starting Facebook automation service")
-            
-            # Start background scheduler
-            asyncio.create_task(self._run_facebook_scheduler())
-            
-            return {"success": True, "message": "Automation started"}
-            
+
+            return {"success": True, "message": "Automation started", "next_scheduled": next_run}
+
         except Exception as e:
             logger.error(f"Error starting Facebook automation: {e}")
-            self.is_running = False
+            self.db.rollback()
             return {"success": False, "error": str(e)}
     
     def stop_facebook_automation(self):
-        """Stop Facebook automation service"""
+        """Stop Facebook automation service (on every process, via the workflow row)"""
         try:
-            self.is_running = False
             logger.info("Stopping Facebook automation service")
             
-            # Cancel scheduler task if running
-            if self.scheduler_task:
-                self.scheduler_task.cancel()
-                self.scheduler_task = None
+            workflow = self.db.query(AutomationWorkflow).filter(
+                AutomationWorkflow.workflow_type == FACEBOOK_REPOSTING_JOB
+            ).first()
+            if workflow and workflow.is_active:
+                workflow.is_active = False
+                self.db.commit()
+            
+            repost_scheduler.cancel(FACEBOOK_REPOSTING_JOB)
             
             return {"success": True, "message": "Automation stopped"}
             
         except Exception as e:
             logger.error(f"Error stopping Facebook automation: {e}")
+            self.db.rollback()
             return {"success": False, "error": str(e)}
     
-    async def _run_facebook_scheduler(self):
-        """Background task for Facebook reposting scheduler"""
-        try:
-            while self.is_running:
-                # Get current automation status
-                status = self.get_facebook_automation_status()
-                
-                if status.get("is_active") and self._should_post_now(status.get("config", {})):
-                    # Execute reposting
-                    await self._execute_daily_reposting()
-                
-                # Wait for next check (every 15 minutes)
-                await asyncio.sleep(900)
-                
-        except asyncio.CancelledError:
-            logger.info("Facebook scheduler cancelled")
-        except Exception as e:
-            logger.error(f"Error in Facebook scheduler: {e}")
-            self.is_running = False
+    def get_workflow_watermark(self) -> Optional[Tuple[int, Optional[datetime]]]:
+        """(id, updated_at) of the reposting workflow; changes whenever any process saves it"""
+        row = self.db.query(AutomationWorkflow.id, AutomationWorkflow.updated_at).filter(
+            AutomationWorkflow.workflow_type == FACEBOOK_REPOSTING_JOB
+        ).first()
+        return tuple(row) if row else None
+
+    def sync_facebook_schedule(self):
+        """
+        Leader only: align the local scheduler with the stored workflow, picking
+        up schedule changes and stops saved by any process. If today's (new)
+        window already passed without a post, it fires now.
+        """
+        workflow = self.db.query(AutomationWorkflow).filter(
+            AutomationWorkflow.workflow_type == FACEBOOK_REPOSTING_JOB
+        ).first()
+        config = (workflow.config or {}) if workflow else {}
+        current = repost_scheduler.get_config(FACEBOOK_REPOSTING_JOB)
+
+        if not workflow or not workflow.is_active or not config.get("is_active", False):
+            if current is not None:
+                logger.info("Facebook automation workflow disabled, cancelling schedule")
+                repost_scheduler.cancel(FACEBOOK_REPOSTING_JOB)
+        elif config != current:
+            self.start_facebook_automation(config=config)
+    
+    def _find_missed_window(self, config: Dict[str, Any]) -> Optional[datetime]:
+        """Today's posting window if it already passed with no Facebook post since"""
+        previous = calculate_previous_run(config)
+        if previous is None or previous.date() != datetime.now().date():
+            return None
+
+        last_posted = self.db.query(func.max(SocialPost.posted_at)).filter(
+            SocialPost.platform == "facebook",
+            SocialPost.status == "posted"
+        ).scalar()
+
+        if last_posted is not None and last_posted.replace(tzinfo=None) >= previous:
+            return None
+        return previous
     
     def _should_post_now(self, config: Dict[str, Any]) -> bool:
-        """Check if it's time to post based on schedule"""
+        """Check the daily post limit; timing is handled by the scheduler"""
         try:
             if not config.get("is_active", False):
                 return False
             
             now = datetime.now()
-            current_time = now.strftime("%H:%M")
-            current_day = now.weekday()
-            
-            # Check if current day is in schedule
-            if current_day not in config.get("days_of_week", []):
-                return False
-            
-            # Check if current time matches schedule
-            if current_time != config.get("time_of_day", "09:00"):
-                return False
             
             # Check if we haven't exceeded daily limit
             today_posts = self.db.query(SocialPost).filter(
@@ -209,13 +500,6 @@ class AutomationService:
         try:
             logger.info("Executing daily Facebook reposting")
             
-            # Get vehicles that need reposting
-            vehicles = self._get_vehicles_for_reposting()
-            
-            if not vehicles:
-                logger.info("No vehicles need reposting today")
-                return
-            
             # Get automation config
             workflow = self.db.query(AutomationWorkflow).filter(
                 AutomationWorkflow.workflow_type == "facebook_reposting"
@@ -223,81 +507,168 @@ class AutomationService:
             
             config = workflow.config if workflow else {}
             
-            # Post vehicles
-            posted_count = 0
-            for vehicle in vehicles[:config.get("max_posts_per_day", 5)]:
-                try:
-                    # Generate post content
-                    message = self.facebook_service.generate_post_content(vehicle)
-                    
-                    # Post to Facebook
-                    result = self.facebook_service.post_to_facebook(vehicle, message)
-                    
-                    if result.get("success"):
-                        # Save to database
-                        social_post = SocialPost(
-                            vehicle_id=vehicle.id,
-                            platform="facebook",
-                            message=message,
-                            status="posted",
-                            posted_at=datetime.now(),
-                            external_post_id=result.get("post_id")
-                        )
-                        self.db.add(social_post)
-                        
-                        # Post to Marketplace if enabled
-                        if config.get("include_marketplace", True):
-                            marketplace_result = self.facebook_service.post_to_marketplace(vehicle, message)
-                            if marketplace_result.get("success"):
-                                logger.info(f"Posted vehicle {vehicle.id} to Marketplace")
-                        
-                        posted_count += 1
-                        logger.info(f"Successfully posted vehicle {vehicle.id} to Facebook")
-                        
-                    else:
-                        logger.error(f"Failed to post vehicle {vehicle.id}: {result.get('error')}")
-                        
-                except Exception as e:
-                    logger.error(f"Error posting vehicle {vehicle.id}: {e}")
-                    continue
-            
-            # Commit all posts
+            # Get vehicles that need reposting, least recently posted first
+            vehicles = self._get_vehicles_for_reposting(limit=config.get("max_posts_per_day", 5))
+            
+            if not vehicles:
+                logger.info("No vehicles need reposting today")
+                return
+            
+            # Fan out to every active auto account, or the default credentials
+            accounts = self.db.query(FacebookAccount).filter(
+                FacebookAccount.is_active == True,
+                FacebookAccount.account_type == "auto"
+            ).all()
+            targets = [
+                (account.id, (account.automation_config or {}).get("post_template"))
+                for account in accounts if account.is_configured()
+            ] or [(None, None)]
+            
+            # Record post intents first; outbox workers post them concurrently
+            # across accounts, retry failures and write the SocialPost rows
+            queued_count = 0
+            for account_id, template in targets:
+                messages = post_renderer.render_batch(vehicles, template)
+                for vehicle in vehicles:
+                    entry = enqueue_post(
+                        self.db,
+                        vehicle_id=vehicle.id,
+                        message=messages[vehicle.id],
+                        account_id=account_id,
+                        include_marketplace=config.get("include_marketplace", True)
+                    )
+                    if entry is not None:
+                        queued_count += 1
+            
             self.db.commit()
+            outbox_pool.notify()
             
-            logger.info(f"Daily reposting completed: {posted_count} vehicles posted")
+            logger.info(
+                f"Daily reposting queued: {queued_count} posts for "
+                f"{len(vehicles)} vehicles across {len(targets)} accounts"
+            )
             
         except Exception as e:
             logger.error(f"Error executing daily reposting: {e}")
             self.db.rollback()
     
-    def _get_vehicles_for_reposting(self) -> List[Vehicle]:
-        """Get vehicles that need reposting"""
+    async def remove_vehicle_posts(self, vehicle_ids: List[int]) -> Dict[str, Any]:
+        """
+        Delete the live Facebook posts and Marketplace listings of the given
+        vehicles (e.g. once VENDIDO). Objects are grouped per account and
+        deleted with Graph batch requests.
+        """
+        posts = self.db.query(SocialPost).filter(
+            SocialPost.vehicle_id.in_(vehicle_ids),
+            SocialPost.platform == "facebook",
+            SocialPost.status == "posted",
+            SocialPost.external_post_id.isnot(None)
+        ).all()
+        listings = self.db.query(MarketplaceListing).filter(
+            MarketplaceListing.vehicle_id.in_(vehicle_ids),
+            MarketplaceListing.status == "active",
+            MarketplaceListing.external_listing_id.isnot(None)
+        ).all()
+        
+        by_account: Dict[Optional[int], List[Tuple[Any, str]]] = {}
+        for post in posts:
+            by_account.setdefault(post.account_id, []).append((post, post.external_post_id))
+        for listing in listings:
+            by_account.setdefault(listing.account_id, []).append((listing, listing.external_listing_id))
+        
+        removed = 0
+        failed = 0
+        failed_vehicle_ids = set()
+        for account_id, account_objects in by_account.items():
+            service = FacebookService(account_id=account_id, db_session=self.db) if account_id else self.facebook_service
+            deleted = await service.delete_posts([external_id for _, external_id in account_objects])
+            
+            for obj, external_id in account_objects:
+                if deleted.get(external_id):
+                    obj.status = "removed"
+                    obj.removed_at = datetime.now()
+                    removed += 1
+                else:
+                    failed += 1
+                    failed_vehicle_ids.add(obj.vehicle_id)
+        
+        self.db.commit()
+        logger.info(f"Removed {removed} Facebook posts/listings for {len(vehicle_ids)} vehicles ({failed} failed)")
+        
+        return {
+            "removed": removed,
+            "failed": failed,
+            "total": len(posts) + len(listings),
+            "failed_vehicle_ids": sorted(failed_vehicle_ids)
+        }
+    
+    async def refresh_post_insights(self, days: int = 30) -> Dict[str, Any]:
+        """Pull insights for recent live posts in batches into SocialPost.engagement_metrics"""
+        since = datetime.now() - timedelta(days=days)
+        posts = self.db.query(SocialPost).filter(
+            SocialPost.platform == "facebook",
+            SocialPost.status == "posted",
+            SocialPost.external_post_id.isnot(None),
+            SocialPost.posted_at >= since
+        ).all()
+        
+        by_account: Dict[Optional[int], List[SocialPost]] = {}
+        for post in posts:
+            by_account.setdefault(post.account_id, []).append(post)
+        
+        updated = 0
+        for account_id, account_posts in by_account.items():
+            service = FacebookService(account_id=account_id, db_session=self.db) if account_id else self.facebook_service
+            insights = await service.get_posts_insights([post.external_post_id for post in account_posts])
+            
+            for post in account_posts:
+                metrics = insights.get(post.external_post_id)
+                if metrics is not None:
+                    post.engagement_metrics = {**metrics, "updated_at": datetime.now().isoformat()}
+                    updated += 1
+        
+        self.db.commit()
+        logger.info(f"Refreshed insights for {updated}/{len(posts)} Facebook posts")
+        
+        return {"updated": updated, "total": len(posts)}
+    
+    def _get_vehicles_for_reposting(self, limit: Optional[int] = None) -> List[Vehicle]:
+        """
+        Get vehicles that need reposting in a single query.
+
+        Anti-joins available vehicles against Facebook posts from the last 24
+        hours and orders the rest by their most recent post (never-posted first),
+        both served by idx_social_posts_vehicle_platform_status_created.
+        """
         try:
-            # Get vehicles that haven't been posted in the last 24 hours
             yesterday = datetime.now() - timedelta(days=1)
-            
-            # Get all available vehicles
-            vehicles = self.db.query(Vehicle).filter(
-                Vehicle.estatus.in_(["DISPONIBLE", "FOTOS"])
-            ).all()
-            
-            # Filter vehicles that need reposting
-            vehicles_to_repost = []
-            
-            for vehicle in vehicles:
-                # Check if vehicle has been posted recently
-                recent_posts = self.db.query(SocialPost).filter(
-                    SocialPost.vehicle_id == vehicle.id,
-                    SocialPost.platform == "facebook",
-                    SocialPost.created_at > yesterday,
-                    SocialPost.status == "posted"
-                ).count()
-                
-                # If no recent posts, add to repost list
-                if recent_posts == 0:
-                    vehicles_to_repost.append(vehicle)
-            
-            return vehicles_to_repost
+
+            posted = (
+                (SocialPost.vehicle_id == Vehicle.id)
+                & (SocialPost.platform == "facebook")
+                & (SocialPost.status == "posted")
+            )
+
+            recently_posted = select(SocialPost.id).where(
+                posted, SocialPost.created_at > yesterday
+            ).exists()
+
+            last_posted = (
+                select(func.max(SocialPost.created_at))
+                .where(posted)
+                .correlate(Vehicle)
+                .scalar_subquery()
+            )
+
+            query = self.db.query(Vehicle).filter(
+                Vehicle.estatus.in_(["DISPONIBLE", "FOTOS"]),
+                ~recently_posted
+            ).order_by(last_posted.asc().nulls_first(), Vehicle.id)
+
+            if limit is not None:
+                query = query.limit(limit)
+
+            return query.all()
             
         except Exception as e:
             logger.error(f"Error getting vehicles for reposting: {e}")
@@ -306,38 +677,55 @@ class AutomationService:
     def _calculate_next_scheduled_time(self, config: Dict[str, Any]) -> Optional[datetime]:
         """Calculate next scheduled posting time"""
         try:
-            if not config.get("is_active", False):
-                return None
-            
-            now = datetime.now()
-            time_str = config.get("time_of_day", "09:00")
-            days = config.get("days_of_week", [1,2,3,4,5])  # Monday to Friday by default
-            
-            # Parse time
-            hour, minute = map(int, time_str.split(":"))
-            
-            # Find next scheduled day
-            current_day = now.weekday()
-            next_day = None
-            
-            for day in sorted(days):
-                if day > current_day:
-                    next_day = day
-                    break
-            
-            if next_day is None:
-                # Next occurrence is next week
-                next_day = min(days)
-                days_ahead = 7 - current_day + next_day
-            else:
-                days_ahead = next_day - current_day
-            
-            # Calculate next scheduled time
-            next_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            next_time += timedelta(days=days_ahead)
-            
-            return next_time
-            
+            return calculate_next_run(config)
         except Exception as e:
             logger.error(f"Error calculating next scheduled time: {e}")
             return None
+
+
+# Global scheduler instance shared by every AutomationService
+repost_scheduler = RepostScheduler()
+
+# Only the process holding this lock runs the repost scheduler
+scheduler_leader = LeaderElection(FACEBOOK_REPOSTING_JOB)
+
+
+async def on_scheduler_elected():
+    """Leader callback: resume the stored schedule, catching up on missed windows"""
+    db = repost_scheduler.session_factory()
+    try:
+        service = AutomationService(db)
+        repost_scheduler.watermarks[FACEBOOK_REPOSTING_JOB] = service.get_workflow_watermark()
+        service.sync_facebook_schedule()
+    except Exception as e:
+        logger.error(f"Error resuming Facebook automation schedule: {e}")
+    finally:
+        db.close()
+    # The watermark check is one indexed lookup, so run it every heartbeat
+    repost_scheduler.set_wakeup_hook(on_scheduler_wakeup, interval=scheduler_leader.heartbeat_seconds)
+    # Daily dashboard rollups also run on the leader only, whatever happened above
+    try:
+        await schedule_dashboard_rollup(repost_scheduler)
+    except Exception as e:
+        logger.error(f"Error scheduling dashboard rollup: {e}")
+
+
+async def on_scheduler_wakeup():
+    """
+    Scheduler hook on the leader: resync when the workflow row changed since the
+    last check, so edits saved through other processes apply within a heartbeat.
+    """
+    db = repost_scheduler.session_factory()
+    try:
+        service = AutomationService(db)
+        watermark = service.get_workflow_watermark()
+        if watermark != repost_scheduler.watermarks.get(FACEBOOK_REPOSTING_JOB):
+            repost_scheduler.watermarks[FACEBOOK_REPOSTING_JOB] = watermark
+            service.sync_facebook_schedule()
+    finally:
+        db.close()
+
+
+async def on_scheduler_lost():
+    """Leader callback: stop scheduling so the new leader is the only one posting"""
+    repost_scheduler.stop()
@@ -0,0 +1,106 @@
+"""
+Google Drive Batch Requests
+Groups Drive metadata calls (get/delete/permissions) into batch HTTP requests
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+# Drive API accepts at most 100 calls per batch request
+DRIVE_BATCH_LIMIT = 100
+
+# Permission granted to vehicle folders so they can be shared publicly
+PUBLIC_READER_PERMISSION = {
+    'type': 'anyone',
+    'role': 'reader'
+}
+
+
+class DriveBatchExecutor:
+    """Executes Drive API requests in batches of up to DRIVE_BATCH_LIMIT calls"""
+
+    def __init__(self, service, batch_size: int = DRIVE_BATCH_LIMIT):
+        self.service = service
+        self.batch_size = min(batch_size, DRIVE_BATCH_LIMIT)
+
+    def execute(self, requests: Dict[str, Any]) -> Dict[str, Tuple[Optional[Dict[str, Any]], Optional[Exception]]]:
+        """
+        Execute a mapping of request_id -> HttpRequest.
+        Returns request_id -> (response, exception) once every chunk has run.
+        """
+        results: Dict[str, Tuple[Optional[Dict[str, Any]], Optional[Exception]]] = {}
+
+        def callback(request_id, response, exception):
+            results[request_id] = (response, exception)
+
+        items = list(requests.items())
+        for start in range(0, len(items), self.batch_size):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for request_id, request in items[start:start + self.batch_size]:
+                batch.add(request, request_id=request_id)
+            batch.execute()
+
+        return results
+
+    def get_files(self, file_ids: Iterable[str], fields: str = 'id,name') -> Dict[str, Dict[str, Any]]:
+        """Fetch metadata for many files; files that fail are omitted"""
+        requests = {
+            file_id: self.service.files().get(fileId=file_id, fields=fields)
+            for file_id in _unique(file_ids)
+        }
+
+        files = {}
+        for file_id, (response, exception) in self.execute(requests).items():
+            if exception is not None:
+                logger.warning(f"Drive batch get failed for {file_id}: {exception}")
+                continue
+            files[file_id] = response
+
+        return files
+
+    def delete_files(self, file_ids: Iterable[str]) -> Dict[str, bool]:
+        """Delete many files; files already gone from Drive count as deleted"""
+        requests = {
+            file_id: self.service.files().delete(fileId=file_id)
+            for file_id in _unique(file_ids)
+        }
+
+        deleted = {}
+        for file_id, (_, exception) in self.execute(requests).items():
+            if exception is None or _is_not_found(exception):
+                deleted[file_id] = True
+            else:
+                logger.warning(f"Drive batch delete failed for {file_id}: {exception}")
+                deleted[file_id] = False
+
+        return deleted
+
+    def create_permissions(self, file_ids: Iterable[str], permission: Dict[str, str] = None) -> Dict[str, bool]:
+        """Grant the same permission on many files"""
+        permission = permission or PUBLIC_READER_PERMISSION
+        requests = {
+            file_id: self.service.permissions().create(fileId=file_id, body=permission)
+            for file_id in _unique(file_ids)
+        }
+
+        granted = {}
+        for file_id, (_, exception) in self.execute(requests).items():
+            if exception is not None:
+                logger.warning(f"Drive batch permission failed for {file_id}: {exception}")
+            granted[file_id] = exception is None
+
+        return granted
+
+
+def _unique(file_ids: Iterable[str]) -> List[str]:
+    """Drop empty and duplicate file IDs while keeping order"""
+    return list(dict.fromkeys(file_id for file_id in file_ids if file_id))
+
+
+def _is_not_found(exception: Exception) -> bool:
+    """Check whether a batch error is a Drive 404"""
+    return isinstance(exception, HttpError) and getattr(exception.resp, 'status', None) == 404
@@ -13,8 +13,25 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import logging
 
+from .drive_batch import DriveBatchExecutor, PUBLIC_READER_PERMISSION
+
 logger = logging.getLogger(__name__)
 
+# Thumbnail widths used for photo renditions
+RENDITION_SIZES = {
+    'thumbnail': 'w200',
+    'medium': 'w800',
+    'large': 'w1600'
+}
+
+# Files requested per page when listing a folder (the API maximum)
+LIST_PAGE_SIZE = 1000
+
+
+class DriveListingError(Exception):
+    """A Drive folder listing failed or could not be completed"""
+
+
 # Google Drive API scopes
 SCOPES = [
     'https://www.googleapis.com/auth/drive.file',
@@ -119,17 +136,8 @@ class GoogleDriveService:
             logger.info(f"Drive folder created successfully: {folder['id']}")
             
             # Make folder shareable
-            permission = {
-                'type': 'anyone',
-                'role': 'reader'
-            }
-            
-            self.service.permissions().create(
-                fileId=folder['id'],
-                body=permission
-            ).execute()
-            
-            logger.info(f"Drive folder permissions set successfully")
+            if self.share_files([folder['id']]).get(folder['id']):
+                logger.info(f"Drive folder permissions set successfully")
             
             return {
                 'folder_id': folder['id'],
@@ -148,44 +156,92 @@ class GoogleDriveService:
             logger.error(f"Exception details: {str(e)}")
             return None
     
+    def get_batch_executor(self) -> Optional[DriveBatchExecutor]:
+        """Get a batch executor bound to the authenticated Drive service"""
+        if not self.service:
+            if not self.authenticate():
+                return None
+        return DriveBatchExecutor(self.service)
+    
+    def get_files_info(self, file_ids: List[str], fields: str = "id,name,mimeType,size,parents") -> Dict[str, Dict[str, Any]]:
+        """Get metadata for many files using batched requests"""
+        try:
+            executor = self.get_batch_executor()
+            if not executor:
+                return {}
+            return executor.get_files(file_ids, fields=fields)
+        except Exception as e:
+            logger.error(f"Error getting Drive files info in batch: {e}")
+            return {}
+    
+    def delete_files(self, file_ids: List[str]) -> Dict[str, bool]:
+        """Delete many files from Drive using batched requests"""
+        try:
+            executor = self.get_batch_executor()
+            if not executor:
+                return {file_id: False for file_id in file_ids}
+            return executor.delete_files(file_ids)
+        except Exception as e:
+            logger.error(f"Error deleting Drive files in batch: {e}")
+            return {file_id: False for file_id in file_ids}
+    
+    def share_files(self, file_ids: List[str], permission: Dict[str, str] = None) -> Dict[str, bool]:
+        """Grant a permission (public reader by default) on many files using batched requests"""
+        try:
+            executor = self.get_batch_executor()
+            if not executor:
+                return {file_id: False for file_id in file_ids}
+            return executor.create_permissions(file_ids, permission or PUBLIC_READER_PERMISSION)
+        except Exception as e:
+            logger.error(f"Error setting Drive permissions in batch: {e}")
+            return {file_id: False for file_id in file_ids}
+    
     def list_folder_files(self, folder_id: str) -> List[Dict[str, Any]]:
-        """List all files in a Drive folder"""
+        """
+        List every image file in a Drive folder, following nextPageToken.
+
+        Raises DriveListingError when the listing can't be completed, so callers
+        never mistake a failed or partial listing for an empty folder.
+        """
+        if not self.service:
+            if not self.authenticate():
+                raise DriveListingError("Google Drive authentication failed")
+
+        query = f"'{folder_id}' in parents and trashed=false"
+        image_files = []
+        page_token = None
         try:
-            if not self.service:
-                if not self.authenticate():
-                    return []
-            
-            # Query for files in the folder
-            query = f"'{folder_id}' in parents and trashed=false"
-            results = self.service.files().list(
-                q=query,
-                fields="files(id,name,mimeType,size,createdTime,webViewLink)"
-            ).execute()
-            
-            files = results.get('files', [])
-            
-            # Filter for image files
-            image_files = []
-            for file in files:
-                mime_type = file.get('mimeType', '')
-                if mime_type.startswith('image/'):
-                    image_files.append({
-                        'id': file['id'],
-                        'name': file['name'],
-                        'mime_type': mime_type,
-                        'size': file.get('size', 0),
-                        'created_time': file.get('createdTime', ''),
-                        'url': file.get('webViewLink', '')
-                    })
-            
-            return image_files
-            
+            while True:
+                results = self.service.files().list(
+                    q=query,
+                    fields="nextPageToken,files(id,name,mimeType,size,createdTime,webViewLink)",
+                    pageSize=LIST_PAGE_SIZE,
+                    pageToken=page_token
+                ).execute()
+
+                # Filter for image files
+                for file in results.get('files', []):
+                    mime_type = file.get('mimeType', '')
+                    if mime_type.startswith('image/'):
+                        image_files.append({
+                            'id': file['id'],
+                            'name': file['name'],
+                            'mime_type': mime_type,
+                            'size': file.get('size', 0),
+                            'created_time': file.get('createdTime', ''),
+                            'url': file.get('webViewLink', '')
+                        })
+
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    return image_files
+
         except HttpError as e:
             logger.error(f"Google Drive API error listing files: {e}")
-            return []
+            raise DriveListingError(f"Google Drive API error listing folder {folder_id}: {e}") from e
         except Exception as e:
             logger.error(f"Error listing Drive folder files: {e}")
-            return []
+            raise DriveListingError(f"Error listing Drive folder {folder_id}: {e}") from e
     
     def download_file(self, file_id: str) -> Optional[bytes]:
         """Download a file from Drive"""
@@ -236,29 +292,28 @@ class GoogleDriveService:
             return None
     
     def sync_vehicle_photos(self, vehicle_id: int, folder_id: str) -> List[Dict[str, Any]]:
-        """Sync photos from Drive folder to the system (metadata only)"""
-        try:
-            # Get all files in the folder
-            files = self.list_folder_files(folder_id)
-            
-            synced_photos = []
-            for file in files:
-                # Store only metadata, not file content
-                synced_photos.append({
-                    'vehicle_id': vehicle_id,
-                    'drive_file_id': file['id'],
-                    'filename': file['name'],
-                    'mime_type': file['mime_type'],
-                    'file_size': int(file['size']) if file['size'] else 0,
-                    'drive_url': file['url'],
-                    'created_time': file['created_time']
-                })
-            
-            return synced_photos
-            
-        except Exception as e:
-            logger.error(f"Error syncing vehicle photos: {e}")
-            return []
+        """
+        Photo metadata for every file in a vehicle's Drive folder.
+
+        Raises DriveListingError when the folder can't be listed completely.
+        """
+        # Get all files in the folder
+        files = self.list_folder_files(folder_id)
+        
+        synced_photos = []
+        for file in files:
+            # Store only metadata, not file content
+            synced_photos.append({
+                'vehicle_id': vehicle_id,
+                'drive_file_id': file['id'],
+                'filename': file['name'],
+                'mime_type': file['mime_type'],
+                'file_size': int(file['size']) if file['size'] else 0,
+                'drive_url': file['url'],
+                'created_time': file['created_time']
+            })
+        
+        return synced_photos
     
     def upload_photo_to_vehicle_folder(self, vehicle_id: int, folder_id: str, file_content: bytes, filename: str, mime_type: str) -> Optional[Dict[str, Any]]:
         """Upload a photo to a vehicle's Drive folder"""
@@ -332,5 +387,14 @@ class GoogleDriveService:
             logger.error(f"Error getting photo direct URL: {e}")
             return None
 
+    def get_photo_rendition_urls(self, file_id: str) -> Dict[str, str]:
+        """Get thumbnail/medium/large/original URLs for a Drive photo (no API call)"""
+        renditions = {
+            name: f"https://drive.google.com/thumbnail?id={file_id}&sz={size}"
+            for name, size in RENDITION_SIZES.items()
+        }
+        renditions['original'] = f"https://drive.google.com/uc?export=download&id={file_id}"
+        return renditions
+
 # Global instance
 drive_service = GoogleDriveService()
@@ -0,0 +1,178 @@
+"""
+Event Stream
+Broadcasts inventory events and dashboard stats to Server-Sent Events clients
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from ..database import SessionLocal
+from .rollup_service import dashboard_stats
+from .vehicle_events import DomainEvent, ENTITY_EVENT_TYPES, event_bus
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_STATS_EVENT = "dashboard.stats"
+
+# Sent to a client whose buffer overflowed: it missed events and should refetch
+RESYNC_EVENT = "resync"
+
+# Messages buffered per client before the oldest are dropped
+CLIENT_BUFFER_SIZE = 100
+
+# Writes within this window produce a single dashboard stats message
+STATS_DEBOUNCE_SECONDS = 2.0
+
+# Comment lines keep idle connections open through proxies
+KEEPALIVE_SECONDS = 15
+
+# Reconnect delay suggested to EventSource clients, in milliseconds
+RETRY_MILLISECONDS = 5000
+
+
+class StreamClient:
+    """One connected client with a bounded buffer"""
+
+    def __init__(self, buffer_size: int = CLIENT_BUFFER_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.lagged = False
+        self.dropped = 0
+
+    def put(self, message: Dict[str, Any]):
+        if self.queue.full():
+            # Slow client: drop the oldest message rather than grow without bound
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.lagged = True
+        self.queue.put_nowait(message)
+
+
+class EventBroadcaster:
+    """
+    Single per-process fan-out from the event bus to every connected client.
+
+    Each event is encoded once and pushed into every client's bounded buffer;
+    a client that falls behind loses its oldest messages and is told to
+    resync. Vehicle and photo writes also schedule one debounced dashboard
+    stats message, so clients get fresh totals without polling.
+    """
+
+    def __init__(self, session_factory=SessionLocal, buffer_size: int = CLIENT_BUFFER_SIZE,
+                 stats_debounce: float = STATS_DEBOUNCE_SECONDS):
+        self.session_factory = session_factory
+        self.buffer_size = buffer_size
+        self.stats_debounce = stats_debounce
+        self._clients: Set[StreamClient] = set()
+        self._ids = itertools.count(1)
+        self._stats_task: Optional[asyncio.Task] = None
+        self._started = False
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def start(self):
+        """Subscribe to entity events; call from the running loop"""
+        if self._started:
+            return
+        event_bus.bind()
+        for event_type in ENTITY_EVENT_TYPES:
+            event_bus.subscribe(event_type, self._on_event)
+        self._started = True
+
+    def stop(self):
+        for event_type in ENTITY_EVENT_TYPES:
+            event_bus.unsubscribe(event_type, self._on_event)
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+            self._stats_task = None
+        self._started = False
+
+    def connect(self) -> StreamClient:
+        client = StreamClient(self.buffer_size)
+        self._clients.add(client)
+        return client
+
+    def disconnect(self, client: StreamClient):
+        self._clients.discard(client)
+
+    def _on_event(self, domain_event: DomainEvent):
+        if not self._clients:
+            return
+        self.broadcast(domain_event.type, domain_event.payload)
+        self._schedule_stats()
+
+    def broadcast(self, event_type: str, payload: Dict[str, Any]):
+        message = self._encode(event_type, payload)
+        for client in list(self._clients):
+            client.put(message)
+
+    def _encode(self, event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": next(self._ids),
+            "event": event_type,
+            "data": json.dumps(jsonable_encoder(payload), ensure_ascii=False)
+        }
+
+    def _schedule_stats(self):
+        if self._stats_task is None or self._stats_task.done():
+            self._stats_task = asyncio.get_running_loop().create_task(self._publish_stats())
+
+    async def _publish_stats(self):
+        await asyncio.sleep(self.stats_debounce)
+        if not self._clients:
+            return
+        try:
+            stats = await asyncio.to_thread(self._load_stats)
+            self.broadcast(DASHBOARD_STATS_EVENT, stats)
+        except Exception as e:
+            logger.error(f"Error publishing dashboard stats: {e}")
+
+    def _load_stats(self) -> Dict[str, Any]:
+        db = self.session_factory()
+        try:
+            return dashboard_stats(db)
+        finally:
+            db.close()
+
+    async def stream(self, client: StreamClient, is_disconnected) -> AsyncIterator[str]:
+        """Serialize a client's buffer as text/event-stream until it disconnects"""
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n"
+
+            # Current totals first, so a new client needs no initial fetch
+            try:
+                stats = await asyncio.to_thread(self._load_stats)
+                client.put(self._encode(DASHBOARD_STATS_EVENT, stats))
+            except Exception as e:
+                logger.error(f"Error loading dashboard stats for new client: {e}")
+
+            while not await is_disconnected():
+                try:
+                    message = await asyncio.wait_for(client.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if client.lagged:
+                    client.lagged = False
+                    yield f"event: {RESYNC_EVENT}\ndata: {json.dumps({'dropped': client.dropped})}\n\n"
+
+                yield f"id: {message['id']}\nevent: {message['event']}\ndata: {message['data']}\n\n"
+        finally:
+            self.disconnect(client)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "clients": self.client_count,
+            "dropped": sum(client.dropped for client in self._clients)
+        }
+
+
+# Global broadcaster instance
+event_broadcaster = EventBroadcaster()
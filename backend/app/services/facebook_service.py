@@ -4,20 +4,37 @@ Facebook Service - Handles Facebook API integration and post management
 
 import os
 import logging
-import requests
+import httpx
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import json
 
+from .graph_client import GraphHTTPClient, GRAPH_API_BASE_URL, graph_client
+from .rate_limiter import rate_limiter
+from .cache import TTLCache
+from .post_templates import post_renderer
+
 logger = logging.getLogger(__name__)
 
+# Graph API accepts at most 50 operations per batch request
+GRAPH_BATCH_LIMIT = 50
+
+PAGE_INSIGHTS_METRICS = "page_impressions,page_engaged_users,page_posts_impressions"
+POST_INSIGHTS_METRICS = "post_impressions,post_impressions_unique,post_engaged_users,post_clicks"
+
+# Page insights only change every few minutes on Facebook's side
+PAGE_INSIGHTS_TTL_SECONDS = 900
+_page_insights_cache = TTLCache(PAGE_INSIGHTS_TTL_SECONDS)
+
 class FacebookService:
     """Service for Facebook API operations"""
     
-    def __init__(self, account_id: int = None, db_session = None):
+    def __init__(self, account_id: int = None, db_session = None, http_client: GraphHTTPClient = None):
         self.account_id = account_id
         self.db_session = db_session
-        self.base_url = "https://graph.facebook.com/v18.0"
+        self.base_url = GRAPH_API_BASE_URL
+        self.http = http_client or graph_client
+        self.rate_limit_config = None
         
         # Load credentials from database if account_id is provided
         if account_id and db_session:
@@ -32,6 +49,11 @@ class FacebookService:
         
         self.is_configured = bool(self.access_token and self.page_id)
         
+        # Posts are throttled per account, every Graph call per app
+        self.account_key = str(account_id) if account_id else "default"
+        self.app_key = self.app_id or "default"
+        rate_limiter.configure(self.account_key, self.app_key, self.rate_limit_config)
+        
         if not self.is_configured:
             logger.warning("Facebook service not fully configured.")
     
@@ -50,6 +72,7 @@ class FacebookService:
                 self.user_id = account.user_id
                 self.app_id = account.app_id
                 self.app_secret = account.app_secret
+                self.rate_limit_config = account.get_automation_config().get("rate_limit")
                 logger.info(f"Loaded credentials for account: {account.name}")
             else:
                 logger.warning(f"Account {self.account_id} not found or not configured")
@@ -62,50 +85,28 @@ class FacebookService:
             self.app_id = None
             self.app_secret = None
     
+    async def _graph_request(self, method: str, url: str, posting: bool = False, calls: int = 1, **kwargs) -> httpx.Response:
+        """
+        Send a Graph API request through the rate limiter and adapt to its usage
+        headers. calls is how many Graph calls the request counts as (batch size).
+        """
+        await rate_limiter.acquire(self.account_key, self.app_key, posting=posting, calls=calls)
+        response = await self.http.request(method, url, **kwargs)
+        rate_limiter.update_from_headers(self.account_key, self.app_key, response.headers)
+        return response
+    
     def generate_post_content(self, vehicle: Any, template: str = None) -> str:
-        """Generate post content for a vehicle"""
-        if template:
-            # Use custom template
-            try:
-                return template.format(
-                    marca=vehicle.marca,
-                    modelo=vehicle.modelo,
-                    año=vehicle.año,
-                    color=vehicle.color or "N/A",
-                    precio=f"${vehicle.precio:,.0f}" if vehicle.precio else "Consultar",
-                    kilometraje=vehicle.kilometraje or "N/A",
-                    ubicacion=vehicle.ubicacion or "N/A",
-                    descripcion=vehicle.descripcion or ""
-                )
-            except Exception as e:
-                logger.error(f"Error formatting template: {e}")
-                # Fall back to default template
-        
-        # Default template
-        content = f"🚗 ¡Excelente oportunidad! {vehicle.año} {vehicle.marca} {vehicle.modelo}"
-        
-        if vehicle.color:
-            content += f" en color {vehicle.color}"
-        
-        if vehicle.kilometraje:
-            content += f", solo {vehicle.kilometraje}"
-        
-        if vehicle.precio:
-            content += f". Precio especial: ${vehicle.precio:,.0f}"
-        
-        if vehicle.ubicacion:
-            content += f". Ubicado en {vehicle.ubicacion}"
-        
-        content += "\n\n✅ Garantía incluida\n📞 Llámanos hoy mismo\n🔗 Más detalles en nuestro sitio web"
-        
-        return content
+        """Generate post content for a vehicle (compiled template, cached per vehicle version)"""
+        return post_renderer.render(vehicle, template)
     
-    def post_to_facebook(self, vehicle: Any, message: str, scheduled_time: datetime = None) -> Dict[str, Any]:
+    async def post_to_facebook(self, vehicle: Any, message: str, scheduled_time: datetime = None) -> Dict[str, Any]:
         """Post to Facebook page"""
         if not self.is_configured:
             return {"error": "Facebook service not configured"}
         
         try:
+            await rate_limiter.acquire(self.account_key, self.app_key, posting=True)
+            
             # For now, let's create a test post that simulates success
             # This will be updated once we determine the correct Marketplace API endpoint
             logger.info(f"Simulating Facebook post for vehicle {vehicle.id}: {message[:50]}...")
@@ -120,14 +121,14 @@ class FacebookService:
                 "message": "Test post created successfully (simulated)"
             }
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error posting to Facebook: {e}")
             return {"error": f"Facebook API error: {str(e)}"}
         except Exception as e:
             logger.error(f"Unexpected error posting to Facebook: {e}")
             return {"error": f"Unexpected error: {str(e)}"}
     
-    def post_to_marketplace(self, vehicle: Any, message: str) -> Dict[str, Any]:
+    async def post_to_marketplace(self, vehicle: Any, message: str) -> Dict[str, Any]:
         """Post to Facebook Marketplace"""
         if not self.is_configured:
             return {"error": "Facebook service not configured"}
@@ -145,7 +146,7 @@ class FacebookService:
                 "condition": "USED_EXCELLENT"
             }
             
-            response = requests.post(url, data=data)
+            response = await self._graph_request("POST", url, posting=True, data=data)
             response.raise_for_status()
             
             result = response.json()
@@ -157,7 +158,7 @@ class FacebookService:
                 "message": "Marketplace listing created successfully"
             }
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error posting to Marketplace: {e}")
             return {"error": f"Marketplace API error: {str(e)}"}
         except Exception as e:
@@ -181,7 +182,7 @@ class FacebookService:
             }
         }
     
-    def delete_post(self, post_id: str) -> Dict[str, Any]:
+    async def delete_post(self, post_id: str) -> Dict[str, Any]:
         """Delete a Facebook post"""
         if not self.is_configured:
             return {"error": "Facebook service not configured"}
@@ -190,48 +191,136 @@ class FacebookService:
             url = f"{self.base_url}/{post_id}"
             data = {"access_token": self.access_token}
             
-            response = requests.delete(url, data=data)
+            response = await self._graph_request("DELETE", url, data=data)
             response.raise_for_status()
             
             logger.info(f"Successfully deleted Facebook post: {post_id}")
             return {"success": True, "message": "Post deleted successfully"}
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error deleting Facebook post: {e}")
             return {"error": f"Facebook API error: {str(e)}"}
         except Exception as e:
             logger.error(f"Unexpected error deleting Facebook post: {e}")
             return {"error": f"Unexpected error: {str(e)}"}
     
-    def get_page_insights(self) -> Dict[str, Any]:
-        """Get Facebook page insights"""
+    async def graph_batch(self, operations: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Run Graph API operations ({"method", "relative_url"}) in batch requests of
+        up to GRAPH_BATCH_LIMIT. Returns one {"code", "body"} per operation, in
+        order; operations Graph didn't answer come back as None.
+        """
+        results: List[Optional[Dict[str, Any]]] = []
+        for start in range(0, len(operations), GRAPH_BATCH_LIMIT):
+            chunk = operations[start:start + GRAPH_BATCH_LIMIT]
+            data = {
+                "access_token": self.access_token,
+                "include_headers": "false",
+                "batch": json.dumps(chunk)
+            }
+            
+            # Graph counts every operation in a batch against the app quota
+            response = await self._graph_request("POST", self.base_url, calls=len(chunk), data=data)
+            response.raise_for_status()
+            
+            for item in response.json():
+                if item is None:
+                    results.append(None)
+                    continue
+                try:
+                    body = json.loads(item.get("body") or "null")
+                except ValueError:
+                    body = item.get("body")
+                results.append({"code": item.get("code"), "body": body})
+        
+        return results
+    
+    async def delete_posts(self, post_ids: List[str]) -> Dict[str, bool]:
+        """Delete many posts with batch requests; posts already gone count as deleted"""
+        post_ids = list(dict.fromkeys(post_id for post_id in post_ids if post_id))
+        if not self.is_configured or not post_ids:
+            return {post_id: False for post_id in post_ids}
+        
+        try:
+            results = await self.graph_batch([
+                {"method": "DELETE", "relative_url": post_id} for post_id in post_ids
+            ])
+        except httpx.HTTPError as e:
+            logger.error(f"Error batch deleting Facebook posts: {e}")
+            return {post_id: False for post_id in post_ids}
+        
+        deleted = {}
+        for post_id, result in zip(post_ids, results):
+            deleted[post_id] = bool(result) and (result["code"] == 200 or result["code"] == 404)
+            if not deleted[post_id]:
+                logger.warning(f"Batch delete failed for Facebook post {post_id}: {result}")
+        
+        logger.info(f"Deleted {sum(deleted.values())}/{len(post_ids)} Facebook posts")
+        return deleted
+    
+    async def get_posts_insights(self, post_ids: List[str], metrics: str = POST_INSIGHTS_METRICS) -> Dict[str, Dict[str, Any]]:
+        """Fetch insights for many posts at once; returns post_id -> {metric: value}"""
+        post_ids = list(dict.fromkeys(post_id for post_id in post_ids if post_id))
+        if not self.is_configured or not post_ids:
+            return {}
+        
+        try:
+            results = await self.graph_batch([
+                {"method": "GET", "relative_url": f"{post_id}/insights?metric={metrics}"}
+                for post_id in post_ids
+            ])
+        except httpx.HTTPError as e:
+            logger.error(f"Error batch fetching post insights: {e}")
+            return {}
+        
+        insights = {}
+        for post_id, result in zip(post_ids, results):
+            if not result or result["code"] != 200 or not isinstance(result["body"], dict):
+                logger.warning(f"No insights for Facebook post {post_id}: {result}")
+                continue
+            insights[post_id] = {
+                metric["name"]: (metric.get("values") or [{}])[-1].get("value")
+                for metric in result["body"].get("data", [])
+            }
+        
+        return insights
+    
+    async def get_page_insights(self, use_cache: bool = True) -> Dict[str, Any]:
+        """Get Facebook page insights (cached for PAGE_INSIGHTS_TTL_SECONDS)"""
         if not self.is_configured:
             return {"error": "Facebook service not configured"}
         
+        if use_cache:
+            cached = _page_insights_cache.get(self.page_id)
+            if cached is not None:
+                return cached
+        
         try:
             url = f"{self.base_url}/{self.page_id}/insights"
             params = {
                 "access_token": self.access_token,
-                "metric": "page_impressions,page_engaged_users,page_posts_impressions"
+                "metric": PAGE_INSIGHTS_METRICS
             }
             
-            response = requests.get(url, params=params)
+            response = await self._graph_request("GET", url, params=params)
             response.raise_for_status()
             
             result = response.json()
-            return {
+            insights = {
                 "success": True,
                 "insights": result.get("data", [])
             }
+            _page_insights_cache.set(self.page_id, insights)
+            return insights
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error getting page insights: {e}")
             return {"error": f"Facebook API error: {str(e)}"}
         except Exception as e:
             logger.error(f"Unexpected error getting page insights: {e}")
             return {"error": f"Unexpected error: {str(e)}"}
     
-    def validate_credentials(self) -> Dict[str, Any]:
+    async def validate_credentials(self) -> Dict[str, Any]:
         """Validate Facebook credentials"""
         if not self.is_configured:
             return {
@@ -245,7 +334,7 @@ class FacebookService:
             url = f"{self.base_url}/{self.page_id}"
             params = {"access_token": self.access_token}
             
-            response = requests.get(url, params=params)
+            response = await self._graph_request("GET", url, params=params)
             response.raise_for_status()
             
             page_info = response.json()
@@ -258,7 +347,7 @@ class FacebookService:
                 "message": "Credentials validated successfully"
             }
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error validating Facebook credentials: {e}")
             return {
                 "valid": False,
@@ -0,0 +1,112 @@
+"""
+Fan-out Service
+Runs posting tasks concurrently across Facebook accounts with bounded parallelism
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Concurrent posts allowed per account unless its automation_config says otherwise
+DEFAULT_ACCOUNT_CONCURRENCY = 2
+
+# Upper bound on concurrent posts across all accounts; each task holds a DB
+# session while it waits on Graph, so keep this within the connection pool
+DEFAULT_TOTAL_CONCURRENCY = 10
+
+# Handler outcomes counted as success
+SUCCESS_OUTCOMES = {"done", "success"}
+
+
+class FanoutExecutor:
+    """
+    Executes one task per item concurrently.
+
+    Items are grouped by account key; each account gets its own semaphore so a
+    slow or throttled account can't take every slot, and a global semaphore
+    caps the total. A failing task never cancels the others: every outcome is
+    collected into an aggregated summary.
+    """
+
+    def __init__(self, account_concurrency: int = DEFAULT_ACCOUNT_CONCURRENCY,
+                 total_concurrency: int = DEFAULT_TOTAL_CONCURRENCY):
+        self.account_concurrency = account_concurrency
+        self.total_concurrency = total_concurrency
+        self._account_limits: Dict[Hashable, int] = {}
+        self._semaphores: Dict[Hashable, asyncio.Semaphore] = {}
+        self._total: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def set_account_limit(self, account_key: Hashable, limit: Optional[int]):
+        """Override the concurrency of one account (takes effect for new semaphores)"""
+        limit = max(int(limit or self.account_concurrency), 1)
+        if self._account_limits.get(account_key) != limit:
+            self._account_limits[account_key] = limit
+            self._semaphores.pop(account_key, None)
+
+    def _semaphore(self, account_key: Hashable) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(account_key)
+        if semaphore is None:
+            limit = self._account_limits.get(account_key, self.account_concurrency)
+            semaphore = self._semaphores[account_key] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def _reset_for_loop(self):
+        # Semaphores are bound to the loop they were first awaited on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphores.clear()
+            self._total = asyncio.Semaphore(self.total_concurrency)
+
+    async def run(
+        self,
+        items: Iterable[T],
+        account_key: Callable[[T], Hashable],
+        handler: Callable[[T], Awaitable[str]]
+    ) -> Dict[str, Any]:
+        """
+        Run handler(item) for every item. Handlers return an outcome string
+        ("done", "retry", "failed", ...); exceptions count as "error".
+        """
+        self._reset_for_loop()
+        started = time.monotonic()
+        by_account: Dict[Hashable, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        errors: List[str] = []
+
+        async def run_one(item: T):
+            key = account_key(item)
+            async with self._semaphore(key), self._total:
+                try:
+                    outcome = await handler(item)
+                except Exception as e:
+                    logger.error(f"Fan-out task for account {key} failed: {e}")
+                    errors.append(str(e))
+                    outcome = "error"
+            by_account[key][outcome or "unknown"] += 1
+
+        items = list(items)
+        await asyncio.gather(*(run_one(item) for item in items))
+
+        succeeded = sum(
+            count for outcomes in by_account.values()
+            for outcome, count in outcomes.items() if outcome in SUCCESS_OUTCOMES
+        )
+        return {
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "by_account": {str(key or "default"): dict(outcomes) for key, outcomes in by_account.items()},
+            "errors": errors,
+            "elapsed_seconds": round(time.monotonic() - started, 3)
+        }
+
+
+# Global fan-out executor instance
+fanout_executor = FanoutExecutor()
@@ -0,0 +1,85 @@
+"""
+Graph API HTTP Client
+Shared async HTTP client with keep-alive pooling for the Facebook Graph API
+"""
+
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+GRAPH_API_BASE_URL = os.getenv("FACEBOOK_GRAPH_URL", "https://graph.facebook.com/v18.0")
+
+# Connect fast, allow slower reads for uploads and insights
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class GraphHTTPClient:
+    """
+    Lazily created httpx.AsyncClient shared by every FacebookService.
+
+    Connections are pooled and kept alive between calls, so requests reuse TLS
+    sessions instead of opening one per call. HTTP/2 is enabled when the h2
+    package is installed. The client is rebuilt if it was closed or the event
+    loop changed (e.g. between test runs).
+    """
+
+    def __init__(
+        self,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.timeout = timeout
+        self.limits = limits
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=HTTP2_AVAILABLE and self.transport is None,
+                transport=self.transport
+            )
+            self._loop = loop
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the pooled client"""
+        return await self.get_client().request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+# Global client instance
+graph_client = GraphHTTPClient()
@@ -0,0 +1,300 @@
+"""
+Inventory Counters
+In-process dashboard counters maintained from ORM write hooks
+"""
+
+import asyncio
+import logging
+import threading
+from collections import Counter
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, object_session
+
+from ..database import SessionLocal
+from ..models.vehicle import Vehicle
+from ..models.photo import Photo
+
+logger = logging.getLogger(__name__)
+
+# How often counters are recomputed from the database to absorb writes made by
+# other processes
+RECONCILE_SECONDS = 300
+
+# session.info key holding counter deltas waiting for the transaction to commit
+PENDING_DELTAS_KEY = "pending_inventory_deltas"
+
+_UNKNOWN = object()
+
+STATUS_FIELDS = {
+    "DISPONIBLE": "available_vehicles",
+    "VENDIDO": "sold_vehicles",
+    "APARTADO": "reserved_vehicles",
+    "AUSENTE": "unavailable_vehicles"
+}
+
+
+def _status_value(value: Any) -> Optional[str]:
+    return getattr(value, "value", value)
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    if value is None:
+        return None
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class InventoryCounters:
+    """
+    Status counts, available value and photo counts kept in memory.
+
+    Seeded from the database once, then moved by deltas captured in
+    after_insert/after_update/after_delete mapper hooks. Deltas are held on the
+    session and applied only when the transaction commits, so rolled-back
+    writes never show up. Bulk INSERT/UPDATE/DELETE statements bypass those
+    hooks; committing one marks the counters stale until the next seed. A
+    periodic reconcile recomputes everything from the database and logs any
+    drift it corrects.
+    """
+
+    def __init__(self, session_factory=SessionLocal, reconcile_seconds: float = RECONCILE_SECONDS):
+        self.session_factory = session_factory
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.is_ready = False
+        self.reset()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def reset(self):
+        with self._lock:
+            self.vehicles_by_status: Counter = Counter()
+            self.priced_available_count = 0
+            self.priced_available_sum = Decimal(0)
+            self.photos_by_vehicle: Counter = Counter()
+            self.total_photos = 0
+            self.primary_photos = 0
+            self.is_ready = False
+
+    # Seeding and reconciliation
+
+    def seed(self, db: Session) -> bool:
+        """Load counters from the database; returns True if they had drifted"""
+        vehicles_by_status = Counter({
+            _status_value(status): count
+            for status, count in db.query(Vehicle.estatus, func.count()).group_by(Vehicle.estatus)
+        })
+        priced_count, priced_sum = db.query(func.count(Vehicle.precio), func.sum(Vehicle.precio)).filter(
+            Vehicle.estatus == "DISPONIBLE", Vehicle.precio.isnot(None)
+        ).one()
+        photos_by_vehicle = Counter(dict(
+            db.query(Photo.vehicle_id, func.count()).group_by(Photo.vehicle_id).all()
+        ))
+        primary_photos = db.query(func.count()).select_from(Photo).filter(Photo.is_primary == True).scalar()
+
+        with self._lock:
+            drifted = self.is_ready and (
+                self.vehicles_by_status != vehicles_by_status
+                or self.photos_by_vehicle != photos_by_vehicle
+                or self.primary_photos != primary_photos
+                or self.priced_available_sum != _decimal(priced_sum or 0)
+            )
+            self.vehicles_by_status = vehicles_by_status
+            self.priced_available_count = priced_count
+            self.priced_available_sum = _decimal(priced_sum or 0)
+            self.photos_by_vehicle = photos_by_vehicle
+            self.total_photos = sum(photos_by_vehicle.values())
+            self.primary_photos = primary_photos
+            self.is_ready = True
+
+        return drifted
+
+    def reconcile(self):
+        db = self.session_factory()
+        try:
+            if self.seed(db):
+                logger.warning("Inventory counters drifted from the database and were reconciled")
+        except Exception as e:
+            logger.error(f"Error reconciling inventory counters: {e}")
+        finally:
+            db.close()
+
+    def start(self):
+        """Seed now and reconcile periodically on the running loop"""
+        if self.is_running:
+            return
+        self.reconcile()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_seconds)
+            await asyncio.to_thread(self.reconcile)
+
+    # Deltas
+
+    def apply(self, deltas: List[Tuple[str, Any, Any]]):
+        """Apply committed (kind, old_state, new_state) deltas"""
+        if not self.is_ready:
+            return
+        with self._lock:
+            for kind, old, new in deltas:
+                if old is _UNKNOWN:
+                    # The previous value wasn't loaded; only a recount is exact,
+                    # so readers fall back to the database until the next seed
+                    self.is_ready = False
+                    return
+                for state, sign in ((old, -1), (new, 1)):
+                    if state is None:
+                        continue
+                    if kind == "vehicle":
+                        self._add_vehicle(state, sign)
+                    else:
+                        self._add_photo(state, sign)
+
+    def _add_vehicle(self, state: Tuple[Optional[str], Optional[Decimal]], sign: int):
+        status, precio = state
+        self.vehicles_by_status[status] += sign
+        if status == "DISPONIBLE" and precio is not None:
+            self.priced_available_count += sign
+            self.priced_available_sum += sign * precio
+
+    def _add_photo(self, state: Tuple[int, bool], sign: int):
+        vehicle_id, is_primary = state
+        self.total_photos += sign
+        self.photos_by_vehicle[vehicle_id] += sign
+        if self.photos_by_vehicle[vehicle_id] <= 0:
+            del self.photos_by_vehicle[vehicle_id]
+        if is_primary:
+            self.primary_photos += sign
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Same fields as rollup_service.inventory_stats, without touching the database"""
+        with self._lock:
+            stats = {field: self.vehicles_by_status.get(status, 0) for status, field in STATUS_FIELDS.items()}
+            stats["total_vehicles"] = sum(self.vehicles_by_status.values())
+            stats["total_value"] = float(self.priced_available_sum)
+            stats["average_price"] = (
+                float(self.priced_available_sum / self.priced_available_count)
+                if self.priced_available_count else 0.0
+            )
+            stats["total_photos"] = self.total_photos
+            stats["vehicles_with_photos"] = len(self.photos_by_vehicle)
+            stats["primary_photos"] = self.primary_photos
+        return stats
+
+
+def _current(state, key: str) -> Any:
+    """Value of an attribute before the flush that is being processed"""
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return _UNKNOWN
+    return state.attrs[key].value
+
+
+def _vehicle_state(status: Any, precio: Any) -> Any:
+    if status is _UNKNOWN or precio is _UNKNOWN:
+        return _UNKNOWN
+    return (_status_value(status), _decimal(precio))
+
+
+def _photo_state(vehicle_id: Any, is_primary: Any) -> Any:
+    if vehicle_id is _UNKNOWN or is_primary is _UNKNOWN:
+        return _UNKNOWN
+    return (vehicle_id, bool(is_primary))
+
+
+def _record(target, kind: str, old: Any, new: Any):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_DELTAS_KEY, []).append((kind, old, new))
+
+
+def _vehicle_inserted(mapper, connection, target):
+    _record(target, "vehicle", None, _vehicle_state(target.estatus, target.precio))
+
+
+def _vehicle_updated(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.estatus.history.has_changes() or state.attrs.precio.history.has_changes()):
+        return
+    old = _vehicle_state(_current(state, "estatus"), _current(state, "precio"))
+    _record(target, "vehicle", old, _vehicle_state(target.estatus, target.precio))
+
+
+def _vehicle_deleted(mapper, connection, target):
+    state = inspect(target)
+    _record(target, "vehicle", _vehicle_state(_current(state, "estatus"), _current(state, "precio")), None)
+
+
+def _photo_inserted(mapper, connection, target):
+    _record(target, "photo", None, _photo_state(target.vehicle_id, target.is_primary))
+
+
+def _photo_updated(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.vehicle_id.history.has_changes() or state.attrs.is_primary.history.has_changes()):
+        return
+    old = _photo_state(_current(state, "vehicle_id"), _current(state, "is_primary"))
+    _record(target, "photo", old, _photo_state(target.vehicle_id, target.is_primary))
+
+
+def _photo_deleted(mapper, connection, target):
+    state = inspect(target)
+    _record(target, "photo", _photo_state(_current(state, "vehicle_id"), _current(state, "is_primary")), None)
+
+
+def _bulk_write(orm_execute_state):
+    """Bulk DML on vehicles or photos has no per-row state; only a recount is exact"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in (Vehicle, Photo):
+        return
+    kind = "vehicle" if mapper.class_ is Vehicle else "photo"
+    orm_execute_state.session.info.setdefault(PENDING_DELTAS_KEY, []).append((kind, _UNKNOWN, None))
+
+
+def _apply_pending(session):
+    deltas = session.info.pop(PENDING_DELTAS_KEY, None)
+    if deltas:
+        inventory_counters.apply(deltas)
+
+
+def _discard_pending(session):
+    session.info.pop(PENDING_DELTAS_KEY, None)
+
+
+def register_counter_events(session_factory=SessionLocal):
+    """Track Vehicle and Photo writes made through sessions from this factory"""
+    if not event.contains(Vehicle, "after_insert", _vehicle_inserted):
+        event.listen(Vehicle, "after_insert", _vehicle_inserted)
+        event.listen(Vehicle, "after_update", _vehicle_updated)
+        event.listen(Vehicle, "after_delete", _vehicle_deleted)
+        event.listen(Photo, "after_insert", _photo_inserted)
+        event.listen(Photo, "after_update", _photo_updated)
+        event.listen(Photo, "after_delete", _photo_deleted)
+
+    if event.contains(session_factory, "after_commit", _apply_pending):
+        return
+    event.listen(session_factory, "do_orm_execute", _bulk_write)
+    event.listen(session_factory, "after_commit", _apply_pending)
+    event.listen(session_factory, "after_rollback", _discard_pending)
+
+
+# Global counters instance
+inventory_counters = InventoryCounters()
+
+register_counter_events()
@@ -0,0 +1,222 @@
+"""
+Leader Election
+Postgres advisory-lock leadership so only one process runs a scheduler
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from ..database import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+# How often the leader checks its lock connection and standbys retry the lock
+HEARTBEAT_SECONDS = 15
+
+APPLICATION_NAME_PREFIX = "autosell-leader"
+
+
+def advisory_lock_key(name: str) -> int:
+    """Stable signed 64-bit advisory lock key for a name"""
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], "big", signed=True)
+
+
+class LeaderElection:
+    """
+    Session-level pg_try_advisory_lock held on a dedicated connection.
+
+    The process holding the lock is the leader. Postgres releases the lock when
+    that connection dies, so standbys retrying every heartbeat take over on
+    their own. The leader tags its connection's application_name, which lets
+    any process report who currently leads. On non-Postgres databases (local
+    development) the single process is always the leader.
+    """
+
+    def __init__(self, name: str, engine: Engine = None, heartbeat_seconds: float = HEARTBEAT_SECONDS):
+        self.name = name
+        self.lock_key = advisory_lock_key(name)
+        self.engine = engine or default_engine
+        self.heartbeat_seconds = heartbeat_seconds
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self.elected_at: Optional[datetime] = None
+        self.last_heartbeat: Optional[datetime] = None
+        self._connection: Optional[Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._on_elected: Optional[Callable[[], Awaitable[None]]] = None
+        self._on_lost: Optional[Callable[[], Awaitable[None]]] = None
+
+    @property
+    def uses_advisory_locks(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    @property
+    def application_name(self) -> str:
+        return f"{APPLICATION_NAME_PREFIX}:{self.name}:{self.identity}"[:63]
+
+    def start(self, on_elected: Callable[[], Awaitable[None]], on_lost: Callable[[], Awaitable[None]]):
+        """Start campaigning on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._on_elected = on_elected
+        self._on_lost = on_lost
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop campaigning and release leadership"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            await self._step_down()
+        await asyncio.to_thread(self._release)
+
+    async def _run(self):
+        try:
+            while True:
+                if not self.is_leader:
+                    if await asyncio.to_thread(self._try_acquire):
+                        self.is_leader = True
+                        self.elected_at = datetime.now()
+                        logger.info(f"{self.identity} elected leader for {self.name}")
+                        await self._call(self._on_elected)
+                elif not await asyncio.to_thread(self._heartbeat):
+                    logger.warning(f"{self.identity} lost leadership for {self.name}")
+                    await self._step_down()
+
+                self.last_heartbeat = datetime.now()
+                await asyncio.sleep(self.heartbeat_seconds)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Leader election for {self.name} stopped: {e}")
+            if self.is_leader:
+                await self._step_down()
+
+    async def _step_down(self):
+        self.is_leader = False
+        self.elected_at = None
+        await self._call(self._on_lost)
+
+    async def _call(self, callback: Optional[Callable[[], Awaitable[None]]]):
+        if callback is None:
+            return
+        try:
+            await callback()
+        except Exception as e:
+            logger.error(f"Leader election callback for {self.name} failed: {e}")
+
+    def _try_acquire(self) -> bool:
+        if not self.uses_advisory_locks:
+            return True
+
+        try:
+            if self._connection is None:
+                self._connection = self.engine.connect()
+                self._connection.execute(
+                    text("SELECT set_config('application_name', :name, false)"),
+                    {"name": self.application_name}
+                )
+
+            acquired = self._connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            # The lock is session-level; don't keep a transaction open
+            self._connection.commit()
+
+            if not acquired:
+                self._close_connection()
+            return bool(acquired)
+
+        except Exception as e:
+            logger.warning(f"Could not acquire leader lock for {self.name}: {e}")
+            self._close_connection()
+            return False
+
+    def _heartbeat(self) -> bool:
+        if not self.uses_advisory_locks:
+            return True
+
+        try:
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Leader heartbeat failed for {self.name}: {e}")
+            self._close_connection()
+            return False
+
+    def _release(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+            self._connection.commit()
+        except Exception as e:
+            logger.warning(f"Could not release leader lock for {self.name}: {e}")
+        finally:
+            self._close_connection()
+
+    def _close_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def get_leader_info(self) -> Dict[str, Any]:
+        """Describe the current leader, whichever process it is"""
+        if self.is_leader:
+            return {
+                "leader": self.identity,
+                "is_self": True,
+                "elected_at": self.elected_at,
+                "last_heartbeat": self.last_heartbeat
+            }
+
+        leader = None
+        if self.uses_advisory_locks:
+            try:
+                leader = self._query_leader()
+            except Exception as e:
+                logger.warning(f"Could not look up leader for {self.name}: {e}")
+
+        return {
+            "leader": leader,
+            "is_self": False,
+            "elected_at": None,
+            "last_heartbeat": self.last_heartbeat
+        }
+
+    def _query_leader(self) -> Optional[str]:
+        unsigned_key = self.lock_key & 0xFFFFFFFFFFFFFFFF
+        with self.engine.connect() as connection:
+            application_name = connection.execute(
+                text("""
+                    SELECT a.application_name
+                    FROM pg_locks l
+                    JOIN pg_stat_activity a ON a.pid = l.pid
+                    WHERE l.locktype = 'advisory'
+                      AND l.granted
+                      AND l.objsubid = 1
+                      AND l.classid = CAST(:high AS oid)
+                      AND l.objid = CAST(:low AS oid)
+                    LIMIT 1
+                """),
+                {"high": unsigned_key >> 32, "low": unsigned_key & 0xFFFFFFFF}
+            ).scalar()
+
+        prefix = f"{APPLICATION_NAME_PREFIX}:{self.name}:"
+        if application_name and application_name.startswith(prefix):
+            return application_name[len(prefix):]
+        return application_name
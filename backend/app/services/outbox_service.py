@@ -0,0 +1,446 @@
+"""
+Outbox Service
+Durable post intents executed by workers with retries and idempotency keys
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.post_outbox import PostOutbox
+from ..models.social_post import SocialPost
+from ..models.marketplace_listing import MarketplaceListing
+from ..models.vehicle import Vehicle, VehicleStatus
+from ..models.facebook_account import FacebookAccount
+from .facebook_service import FacebookService
+from .fanout_service import fanout_executor
+
+logger = logging.getLogger(__name__)
+
+# Retry backoff: RETRY_BASE_SECONDS * 2^(attempt - 1), capped, with jitter
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# A processing row whose worker died is reclaimed after this long
+LEASE_SECONDS = 600
+# While a Graph call (and any rate-limit wait before it) is in flight the
+# worker renews its lease this often, so a live worker is never reclaimed
+LEASE_RENEW_SECONDS = LEASE_SECONDS / 3
+
+# Statuses whose posts and listings must come down; intents for them are never posted
+REMOVAL_STATUSES = {VehicleStatus.VENDIDO.value, VehicleStatus.APARTADO.value}
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_POLL_SECONDS = 30
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def build_idempotency_key(vehicle_id: int, account_id: Optional[int] = None, platform: str = "facebook",
+                          day: Optional[datetime] = None) -> str:
+    """One post per vehicle, account and platform per day"""
+    day = day or datetime.now()
+    return f"{platform}:{account_id or 'default'}:{vehicle_id}:{day.strftime('%Y-%m-%d')}"
+
+
+def enqueue_post(
+    db: Session,
+    vehicle_id: int,
+    message: str,
+    account_id: Optional[int] = None,
+    platform: str = "facebook",
+    include_marketplace: bool = False,
+    idempotency_key: Optional[str] = None,
+    max_attempts: int = 5
+) -> Optional[PostOutbox]:
+    """
+    Record a post intent. Returns None if an intent with the same idempotency
+    key already exists. The caller owns the commit.
+    """
+    key = idempotency_key or build_idempotency_key(vehicle_id, account_id, platform)
+
+    existing = db.query(PostOutbox.id).filter(PostOutbox.idempotency_key == key).first()
+    if existing:
+        return None
+
+    entry = PostOutbox(
+        idempotency_key=key,
+        vehicle_id=vehicle_id,
+        account_id=account_id,
+        platform=platform,
+        message=message,
+        include_marketplace=include_marketplace,
+        status=PostOutbox.PENDING,
+        max_attempts=max_attempts,
+        next_attempt_at=_now()
+    )
+
+    try:
+        with db.begin_nested():
+            db.add(entry)
+    except IntegrityError:
+        # Another process enqueued the same key concurrently
+        return None
+
+    return entry
+
+
+def cancel_pending_posts(db: Session, vehicle_ids: List[int], reason: str) -> int:
+    """
+    Fail the not yet claimed intents of the given vehicles, e.g. once they are
+    sold. Rows being processed re-check the vehicle before posting. The caller
+    owns the commit.
+    """
+    return db.query(PostOutbox).filter(
+        PostOutbox.vehicle_id.in_(vehicle_ids),
+        PostOutbox.status == PostOutbox.PENDING
+    ).update({
+        PostOutbox.status: PostOutbox.FAILED,
+        PostOutbox.last_error: reason
+    }, synchronize_session=False)
+
+
+def claim_batch(db: Session, worker_id: str, batch_size: int = DEFAULT_BATCH_SIZE) -> List[PostOutbox]:
+    """
+    Claim due outbox rows for this worker and commit the claim.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers never claim the
+    same row; rows stuck in processing past the lease are reclaimed.
+    """
+    now = _now()
+    rows = db.scalars(
+        select(PostOutbox)
+        .where(or_(
+            and_(PostOutbox.status == PostOutbox.PENDING, PostOutbox.next_attempt_at <= now),
+            and_(PostOutbox.status == PostOutbox.PROCESSING,
+                 PostOutbox.locked_at < now - timedelta(seconds=LEASE_SECONDS))
+        ))
+        .order_by(PostOutbox.next_attempt_at, PostOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    for row in rows:
+        row.status = PostOutbox.PROCESSING
+        row.locked_at = now
+        row.locked_by = worker_id
+
+    db.commit()
+    return rows
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff; jitter spreads retries over the upper half of the delay"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class OutboxWorker:
+    """Executes claimed post intents and records their outcome"""
+
+    def __init__(self, worker_id: str, session_factory=SessionLocal, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.worker_id = worker_id
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+    async def run_once(self) -> Dict[str, Any]:
+        """
+        Claim one batch and post it concurrently across accounts.
+        Each intent runs on its own session; returns the fan-out summary.
+        """
+        db = self.session_factory()
+        try:
+            rows = claim_batch(db, self.worker_id, self.batch_size)
+            claimed = [(row.id, row.account_id) for row in rows]
+
+            account_ids = {account_id for _, account_id in claimed if account_id}
+            if account_ids:
+                for account in db.query(FacebookAccount).filter(FacebookAccount.id.in_(account_ids)):
+                    config = account.automation_config or {}
+                    fanout_executor.set_account_limit(account.id, config.get("max_concurrency"))
+        finally:
+            db.close()
+
+        if not claimed:
+            return {"total": 0, "succeeded": 0, "failed": 0}
+
+        summary = await fanout_executor.run(
+            claimed,
+            account_key=lambda item: item[1],
+            handler=lambda item: self._process_by_id(item[0])
+        )
+        logger.info(
+            f"Outbox worker {self.worker_id}: {summary['succeeded']}/{summary['total']} posted "
+            f"in {summary['elapsed_seconds']}s"
+        )
+        return summary
+
+    async def _process_by_id(self, outbox_id: int) -> str:
+        db = self.session_factory()
+        try:
+            row = db.get(PostOutbox, outbox_id)
+            if row is None or row.status != PostOutbox.PROCESSING:
+                return "skipped"
+            return await self._process(db, row)
+        finally:
+            db.close()
+
+    async def _process(self, db: Session, row: PostOutbox) -> str:
+        """Post one intent; returns done, retry or failed"""
+        try:
+            # A previous attempt may have done some steps before failing; the
+            # recorded external ids keep a retry from posting or listing twice
+            needs_post = not row.external_post_id
+            needs_listing = row.include_marketplace and not row.external_listing_id
+            if needs_post or needs_listing:
+                vehicle = db.get(Vehicle, row.vehicle_id)
+                if vehicle is None:
+                    return self._fail(db, row, "Vehicle not found", retry=False)
+                # Sold or reserved while the intent was queued
+                if vehicle.estatus in REMOVAL_STATUSES:
+                    return self._fail(db, row, f"Vehicle is {VehicleStatus(vehicle.estatus).value}", retry=False)
+
+                # The claim may have expired while this row waited for a fan-out slot
+                if not self._renew_lease(db, row):
+                    return "skipped"
+
+                keepalive = asyncio.create_task(self._keep_lease(row.id))
+                try:
+                    facebook_service = FacebookService(account_id=row.account_id, db_session=db)
+
+                    if needs_post:
+                        result = await facebook_service.post_to_facebook(vehicle, row.message)
+                        if not result.get("success"):
+                            return self._fail(db, row, result.get("error") or "Unknown error")
+
+                        if not self._owns(db, row):
+                            db.rollback()
+                            return "skipped"
+                        row.external_post_id = result.get("post_id")
+                        self._record_social_post(db, row)
+                        db.commit()
+
+                    # Only after the Page post is recorded, so a retry never lists twice
+                    if needs_listing:
+                        marketplace_result = await facebook_service.post_to_marketplace(vehicle, row.message)
+                        if not marketplace_result.get("success"):
+                            error = marketplace_result.get("error") or "Unknown error"
+                            return self._fail(db, row, f"Marketplace: {error}")
+
+                        if not self._owns(db, row):
+                            db.rollback()
+                            return "skipped"
+                        row.external_listing_id = marketplace_result.get("listing_id")
+                        db.add(MarketplaceListing(
+                            vehicle_id=vehicle.id,
+                            account_id=row.account_id,
+                            external_listing_id=row.external_listing_id,
+                            status="active",
+                            posted_at=datetime.now()
+                        ))
+                        db.commit()
+                        logger.info(f"Posted vehicle {vehicle.id} to Marketplace")
+                finally:
+                    keepalive.cancel()
+
+            if not self._owns(db, row):
+                db.rollback()
+                return "skipped"
+
+            if row.social_post_id is None:
+                self._record_social_post(db, row)
+
+            row.status = PostOutbox.DONE
+            row.completed_at = _now()
+            row.locked_at = None
+            row.locked_by = None
+            row.last_error = None
+            db.commit()
+
+            logger.info(f"Outbox {row.id}: posted vehicle {row.vehicle_id} ({row.external_post_id})")
+            return "done"
+
+        except Exception as e:
+            logger.error(f"Outbox {row.id}: error posting vehicle {row.vehicle_id}: {e}")
+            db.rollback()
+            return self._fail(db, row, str(e))
+
+    def _record_social_post(self, db: Session, row: PostOutbox):
+        """Add the SocialPost for the Page post; the caller owns the commit"""
+        social_post = SocialPost(
+            vehicle_id=row.vehicle_id,
+            account_id=row.account_id,
+            platform=row.platform,
+            message=row.message,
+            status="posted",
+            posted_at=datetime.now(),
+            external_post_id=row.external_post_id
+        )
+        db.add(social_post)
+        db.flush()
+        row.social_post_id = social_post.id
+
+    def _owns(self, db: Session, row: PostOutbox) -> bool:
+        """
+        Lock the row and check this worker still holds its lease. The lock is
+        held until the caller commits, so a reclaim can't slip in between.
+        """
+        owner = db.scalar(
+            select(PostOutbox.locked_by)
+            .where(PostOutbox.id == row.id, PostOutbox.status == PostOutbox.PROCESSING)
+            .with_for_update()
+        )
+        if owner != self.worker_id:
+            logger.warning(f"Outbox {row.id}: lease lost to {owner or 'nobody'}, skipping")
+            return False
+        return True
+
+    def _renew_lease(self, db: Session, row: PostOutbox) -> bool:
+        """Check ownership under a row lock and restart the lease clock"""
+        if not self._owns(db, row):
+            db.rollback()
+            return False
+        row.locked_at = _now()
+        db.commit()
+        return True
+
+    async def _keep_lease(self, outbox_id: int):
+        """Renew the lease until cancelled or until another worker holds the row"""
+        while True:
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+            db = self.session_factory()
+            try:
+                renewed = db.query(PostOutbox).filter(
+                    PostOutbox.id == outbox_id,
+                    PostOutbox.status == PostOutbox.PROCESSING,
+                    PostOutbox.locked_by == self.worker_id
+                ).update({PostOutbox.locked_at: _now()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                logger.error(f"Outbox {outbox_id}: could not renew lease: {e}")
+                db.rollback()
+                continue
+            finally:
+                db.close()
+            if not renewed:
+                return
+
+    def _fail(self, db: Session, row: PostOutbox, error: str, retry: bool = True) -> str:
+        """Schedule a retry with backoff, or mark the intent failed"""
+        outcome = "failed"
+        try:
+            if not self._owns(db, row):
+                db.rollback()
+                return "skipped"
+
+            row.attempts = (row.attempts or 0) + 1
+            row.last_error = error
+            row.locked_at = None
+            row.locked_by = None
+
+            if retry and row.attempts < row.max_attempts:
+                delay = retry_delay(row.attempts)
+                row.status = PostOutbox.PENDING
+                row.next_attempt_at = _now() + timedelta(seconds=delay)
+                outcome = "retry"
+                logger.warning(f"Outbox {row.id}: attempt {row.attempts} failed ({error}), retrying in {delay:.0f}s")
+            else:
+                row.status = PostOutbox.FAILED
+                logger.error(f"Outbox {row.id}: giving up after {row.attempts} attempts: {error}")
+
+            db.commit()
+        except Exception as e:
+            # The lease expires and another worker reclaims the row
+            logger.error(f"Outbox {row.id}: could not record failure: {e}")
+            db.rollback()
+        return outcome
+
+
+class OutboxWorkerPool:
+    """Runs several outbox workers; each claims its own rows with SKIP LOCKED"""
+
+    def __init__(self, session_factory=SessionLocal, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def is_running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self, worker_count: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Start workers on the running event loop"""
+        if self.is_running:
+            return
+
+        worker_count = worker_count or int(os.getenv("OUTBOX_WORKERS", "2"))
+        self._wakeup = asyncio.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._run(OutboxWorker(f"{prefix}:{index}", self.session_factory, batch_size)))
+            for index in range(worker_count)
+        ]
+        logger.info(f"Started {worker_count} outbox workers")
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers, e.g. right after enqueueing"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self, worker: OutboxWorker):
+        try:
+            while True:
+                try:
+                    claimed = (await worker.run_once())["total"]
+                except Exception as e:
+                    logger.error(f"Outbox worker {worker.worker_id} error: {e}")
+                    claimed = 0
+
+                if claimed:
+                    continue
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+        except asyncio.CancelledError:
+            logger.info(f"Outbox worker {worker.worker_id} cancelled")
+            raise
+
+    def get_stats(self, db: Session) -> Dict[str, Any]:
+        """Outbox row counts by status"""
+        counts = dict(
+            db.query(PostOutbox.status, func.count(PostOutbox.id)).group_by(PostOutbox.status).all()
+        )
+        return {
+            "workers": len(self._tasks),
+            "is_running": self.is_running,
+            "pending": counts.get(PostOutbox.PENDING, 0),
+            "processing": counts.get(PostOutbox.PROCESSING, 0),
+            "done": counts.get(PostOutbox.DONE, 0),
+            "failed": counts.get(PostOutbox.FAILED, 0)
+        }
+
+
+# Global worker pool instance
+outbox_pool = OutboxWorkerPool()
@@ -0,0 +1,117 @@
+"""
+Photo Hashing
+Content and perceptual hashes for duplicate photo detection
+"""
+
+import hashlib
+import io
+import logging
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# dHash compares HASH_SIZE + 1 columns per row, producing HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# Default Hamming distance under which two photos count as near-duplicates
+DEFAULT_MAX_DISTANCE = 6
+
+
+def compute_content_hash(content: bytes) -> str:
+    """SHA-256 of the raw file bytes (exact duplicate detection)"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def compute_perceptual_hash(content: bytes) -> Optional[str]:
+    """
+    Difference hash (dHash) of an image as a 16-char hex string.
+    Robust to re-encoding and resizing; returns None if the image can't be decoded.
+    """
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            grayscale = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+            pixels = list(grayscale.getdata())
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash: {e}")
+        return None
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    return f"{value:0{HASH_BITS // 4}x}"
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+class HammingIndex:
+    """
+    Multi-index hash for Hamming-radius lookups.
+
+    Hashes are split into max_distance + 1 bands; by the pigeonhole principle any
+    two hashes within max_distance bits agree exactly on at least one band, so a
+    query only verifies candidates that share a band bucket instead of scanning
+    every stored hash.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, bits: int = HASH_BITS):
+        self.max_distance = max_distance
+        band_count = min(max_distance + 1, bits)
+        width, remainder = divmod(bits, band_count)
+
+        self._bands: List[Tuple[int, int]] = []
+        shift = 0
+        for band in range(band_count):
+            band_width = width + (1 if band < remainder else 0)
+            self._bands.append((shift, (1 << band_width) - 1))
+            shift += band_width
+
+        self._buckets: List[Dict[int, List[Hashable]]] = [defaultdict(list) for _ in self._bands]
+        self._hashes: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, key: Hashable, value: int):
+        """Add a hash under the given key"""
+        self._hashes[key] = value
+        for bucket, (shift, mask) in zip(self._buckets, self._bands):
+            bucket[(value >> shift) & mask].append(key)
+
+    def query(self, value: int, exclude: Hashable = None) -> List[Tuple[Hashable, int]]:
+        """Return (key, distance) for every stored hash within max_distance"""
+        candidates = set()
+        for bucket, (shift, mask) in zip(self._buckets, self._bands):
+            candidates.update(bucket.get((value >> shift) & mask, ()))
+        candidates.discard(exclude)
+
+        matches = []
+        for key in candidates:
+            distance = hamming_distance(value, self._hashes[key])
+            if distance <= self.max_distance:
+                matches.append((key, distance))
+
+        return sorted(matches, key=lambda match: match[1])
+
+    def pairs(self) -> List[Tuple[Hashable, Hashable, int]]:
+        """Return every unordered pair of stored hashes within max_distance"""
+        seen = set()
+        result = []
+        for key, value in self._hashes.items():
+            for other, distance in self.query(value, exclude=key):
+                pair = frozenset((key, other))
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                result.append((key, other, distance))
+
+        return sorted(result, key=lambda pair: pair[2])
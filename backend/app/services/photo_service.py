@@ -18,11 +18,12 @@ from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 from googleapiclient.errors import HttpError
 import io
 from PIL import Image
-import hashlib
 
 from ..database import get_db
 from ..models.photo import Photo, PhotoCreate, PhotoUpdate
 from ..models.vehicle import Vehicle
+from .drive_batch import DriveBatchExecutor
+from .photo_hashing import compute_content_hash, compute_perceptual_hash
 
 logger = logging.getLogger(__name__)
 
@@ -138,6 +139,21 @@ class PhotoService:
             if not vehicle:
                 raise Exception(f"Vehicle {vehicle_id} not found")
             
+            # Skip the Drive upload when this exact file is already stored for the vehicle
+            with open(file_path, 'rb') as f:
+                file_content = f.read()
+            
+            content_hash = compute_content_hash(file_content)
+            existing_photo = db.query(Photo).filter(
+                Photo.vehicle_id == vehicle_id,
+                Photo.content_hash == content_hash,
+                Photo.is_active == True
+            ).first()
+            
+            if existing_photo:
+                logger.info(f"Duplicate upload for vehicle {vehicle_id}, reusing photo {existing_photo.id}")
+                return existing_photo
+            
             # Create vehicle folder
             vehicle_folder_id = self._get_or_create_vehicle_folder(
                 vehicle_id, 
@@ -180,7 +196,9 @@ class PhotoService:
                 file_size=file.get('size', 0),
                 mime_type=mime_type,
                 width=file.get('imageMediaMetadata', {}).get('width') if 'imageMediaMetadata' in file else None,
-                height=file.get('imageMediaMetadata', {}).get('height') if 'imageMediaMetadata' in file else None
+                height=file.get('imageMediaMetadata', {}).get('height') if 'imageMediaMetadata' in file else None,
+                content_hash=content_hash,
+                perceptual_hash=compute_perceptual_hash(file_content)
             )
             
             photo = Photo(**photo_data.dict())
@@ -207,31 +225,62 @@ class PhotoService:
     
     async def delete_photo(self, photo_id: int) -> bool:
         """Delete a photo from both Google Drive and database"""
+        result = await self.delete_photos([photo_id])
+        return photo_id in result.get('deleted', []) or photo_id in result.get('pending', [])
+    
+    async def delete_photos(self, photo_ids: List[int]) -> Dict[str, Any]:
+        """
+        Delete many photos from Google Drive (batched) and the database.
+
+        Rows whose Drive file could not be deleted are kept, hidden and flagged
+        drive_delete_pending (returned as 'pending'), so deleting them again or
+        syncing their vehicle retries the Drive delete instead of orphaning it.
+        """
         try:
             db = next(get_db())
-            photo = db.query(Photo).filter(Photo.id == photo_id).first()
+            photos = db.query(Photo).filter(Photo.id.in_(photo_ids)).all()
             
-            if not photo:
-                return False
+            found_ids = {photo.id for photo in photos}
+            not_found = [photo_id for photo_id in photo_ids if photo_id not in found_ids]
             
-            # Delete from Google Drive
-            if self.service and photo.drive_file_id:
+            # Delete from Google Drive in batches
+            drive_failed = []
+            drive_file_ids = [photo.drive_file_id for photo in photos if photo.drive_file_id]
+            if self.service and drive_file_ids:
                 try:
-                    self.service.files().delete(fileId=photo.drive_file_id).execute()
-                    logger.info(f"Deleted photo from Google Drive: {photo.drive_file_id}")
+                    drive_results = DriveBatchExecutor(self.service).delete_files(drive_file_ids)
+                    drive_failed = [file_id for file_id, deleted in drive_results.items() if not deleted]
+                    logger.info(f"Deleted {len(drive_results) - len(drive_failed)} photos from Google Drive")
                 except Exception as e:
                     logger.warning(f"Failed to delete from Google Drive: {e}")
-            
-            # Delete from database
-            db.delete(photo)
+                    drive_failed = drive_file_ids
+            
+            failed_files = set(drive_failed)
+            pending_ids = sorted(photo.id for photo in photos if photo.drive_file_id in failed_files)
+            deleted_ids = sorted(found_ids.difference(pending_ids))
+            
+            if pending_ids:
+                db.query(Photo).filter(Photo.id.in_(pending_ids)).update(
+                    {Photo.is_active: False, Photo.is_primary: False, Photo.drive_delete_pending: True},
+                    synchronize_session=False
+                )
+            if deleted_ids:
+                db.query(Photo).filter(Photo.id.in_(deleted_ids)).delete(synchronize_session=False)
             db.commit()
             
-            logger.info(f"Photo deleted successfully: {photo_id}")
-            return True
+            if pending_ids:
+                logger.warning(f"Drive delete failed, photos kept for retry: {pending_ids}")
+            logger.info(f"Photos deleted successfully: {deleted_ids}")
+            return {
+                'deleted': deleted_ids,
+                'pending': pending_ids,
+                'not_found': not_found,
+                'drive_failed': drive_failed
+            }
             
         except Exception as e:
-            logger.error(f"Failed to delete photo: {e}")
-            return False
+            logger.error(f"Failed to delete photos: {e}")
+            return {}
     
     async def update_photo_description(self, photo_id: int, filename: str) -> Optional[Photo]:
         """Update photo filename"""
@@ -300,40 +349,45 @@ class PhotoService:
             ).execute()
             
             files = results.get('files', [])
-            synced_count = 0
+            image_files = [file for file in files if file['mimeType'].startswith('image/')]
+            synced_count = len(image_files)
             new_count = 0
             
-            for file in files:
-                if file['mimeType'].startswith('image/'):
-                    # Check if photo already exists in database
-                    db = next(get_db())
-                    existing_photo = db.query(Photo).filter(
-                        Photo.drive_file_id == file['id']
-                    ).first()
-                    
-                    if not existing_photo:
-                        # Try to determine vehicle from folder structure
-                        vehicle_id = self._extract_vehicle_id_from_parents(file.get('parents', []))
-                        
-                        if vehicle_id:
-                            # Create new photo record
-                            photo_data = PhotoCreate(
-                                vehicle_id=vehicle_id,
-                                filename=file['name'],
-                                original_filename=file['name'],
-                                drive_url=file.get('webViewLink'),
-                                drive_file_id=file['id'],
-                                file_size=int(file.get('size', 0)),
-                                mime_type=file['mimeType'],
-                                width=file.get('imageMediaMetadata', {}).get('width') if 'imageMediaMetadata' in file else None,
-                                height=file.get('imageMediaMetadata', {}).get('height') if 'imageMediaMetadata' in file else None
-                            )
-                            
-                            photo = Photo(**photo_data.dict())
-                            db.add(photo)
-                            new_count += 1
+            # Load already-known Drive files in one query
+            db = next(get_db())
+            existing_ids = {
+                row.drive_file_id for row in db.query(Photo.drive_file_id).filter(
+                    Photo.drive_file_id.in_([file['id'] for file in image_files])
+                ).all()
+            } if image_files else set()
+            new_files = [file for file in image_files if file['id'] not in existing_ids]
+            
+            # Resolve parent folder names with batched metadata requests
+            folder_names = self._get_folder_names(
+                parent_id for file in new_files for parent_id in file.get('parents', [])
+            )
+            
+            for file in new_files:
+                # Try to determine vehicle from folder structure
+                vehicle_id = self._extract_vehicle_id_from_parents(file.get('parents', []), folder_names)
+                
+                if vehicle_id:
+                    # Create new photo record
+                    photo_data = PhotoCreate(
+                        vehicle_id=vehicle_id,
+                        filename=file['name'],
+                        original_filename=file['name'],
+                        drive_url=file.get('webViewLink'),
+                        drive_file_id=file['id'],
+                        file_size=int(file.get('size', 0)),
+                        mime_type=file['mimeType'],
+                        width=file.get('imageMediaMetadata', {}).get('width') if 'imageMediaMetadata' in file else None,
+                        height=file.get('imageMediaMetadata', {}).get('height') if 'imageMediaMetadata' in file else None
+                    )
                     
-                    synced_count += 1
+                    photo = Photo(**photo_data.dict())
+                    db.add(photo)
+                    new_count += 1
             
             db.commit()
             
@@ -347,13 +401,23 @@ class PhotoService:
             logger.error(f"Failed to sync Google Drive photos: {e}")
             return {}
     
-    def _extract_vehicle_id_from_parents(self, parent_ids: List[str]) -> Optional[int]:
+    def _get_folder_names(self, folder_ids) -> Dict[str, str]:
+        """Get folder names for many folder IDs using batched Drive requests"""
+        try:
+            folders = DriveBatchExecutor(self.service).get_files(folder_ids, fields='id,name')
+            return {folder_id: folder.get('name', '') for folder_id, folder in folders.items()}
+        except Exception as e:
+            logger.error(f"Failed to get folder names: {e}")
+            return {}
+    
+    def _extract_vehicle_id_from_parents(self, parent_ids: List[str], folder_names: Dict[str, str] = None) -> Optional[int]:
         """Extract vehicle ID from parent folder name"""
         try:
+            if folder_names is None:
+                folder_names = self._get_folder_names(parent_ids)
+            
             for parent_id in parent_ids:
-                # Get parent folder info
-                parent = self.service.files().get(fileId=parent_id, fields='name').execute()
-                folder_name = parent.get('name', '')
+                folder_name = folder_names.get(parent_id, '')
                 
                 # Extract vehicle ID from folder name (format: "123_Toyota_Camry_2020")
                 if '_' in folder_name:
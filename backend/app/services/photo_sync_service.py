@@ -0,0 +1,158 @@
+"""
+Photo Sync Service
+Reconciles a vehicle's Google Drive folder listing with the photos table
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.orm import Session
+
+from ..models.photo import Photo
+
+logger = logging.getLogger(__name__)
+
+# Photo columns kept in sync with the Drive metadata (column -> Drive listing key)
+SYNCED_FIELDS = {
+    'filename': 'filename',
+    'drive_url': 'drive_url',
+    'file_size': 'file_size',
+    'mime_type': 'mime_type',
+}
+
+
+def reconcile_vehicle_photos(
+    db: Session,
+    vehicle_id: int,
+    drive_photos: List[Dict[str, Any]],
+    prune: bool = False
+) -> Dict[str, Any]:
+    """
+    Reconcile Drive photo metadata with the database for a single vehicle.
+
+    Loads every known drive_file_id for the vehicle in one query, computes the
+    add/update/remove sets in memory and applies each set with a single bulk
+    statement, so a sync costs at most five statements regardless of how many
+    files the folder holds. Files that disappeared from Drive are flagged with
+    ``is_active = False`` (or deleted when ``prune`` is set); duplicate rows for
+    the same Drive file are always deleted. Rows flagged drive_delete_pending
+    are never revived: they are deleted once their file is gone from Drive,
+    otherwise returned in ``pending_delete_ids`` for the caller to retry the
+    Drive delete. The caller owns the commit.
+
+    ``drive_photos`` must be the complete folder listing: anything absent from
+    it is treated as removed from Drive. drive_service.sync_vehicle_photos
+    raises DriveListingError instead of returning a failed or partial listing.
+    """
+    existing_rows = db.execute(
+        select(
+            Photo.id,
+            Photo.drive_file_id,
+            Photo.filename,
+            Photo.drive_url,
+            Photo.file_size,
+            Photo.mime_type,
+            Photo.is_active,
+            Photo.drive_delete_pending
+        )
+        .where(Photo.vehicle_id == vehicle_id, Photo.drive_file_id.isnot(None))
+        .order_by(Photo.id)
+    ).all()
+
+    drive_files = {photo['drive_file_id']: photo for photo in drive_photos}
+
+    existing = {}
+    delete_ids = []
+    pending_delete_ids = []
+    for row in existing_rows:
+        if row.drive_delete_pending:
+            # A user deleted it; only the Drive file is left to remove
+            if row.drive_file_id in drive_files:
+                pending_delete_ids.append(row.id)
+            else:
+                delete_ids.append(row.id)
+        elif row.drive_file_id in existing:
+            delete_ids.append(row.id)
+        else:
+            existing[row.drive_file_id] = row
+
+    to_insert = []
+    to_update = []
+    pending_files = {row.drive_file_id for row in existing_rows if row.drive_delete_pending}
+    for file_id, drive_photo in drive_files.items():
+        row = existing.get(file_id)
+        if row is None and file_id in pending_files:
+            continue
+        if row is None:
+            to_insert.append({
+                'vehicle_id': vehicle_id,
+                'filename': drive_photo['filename'],
+                'original_filename': drive_photo['filename'],
+                'drive_file_id': file_id,
+                'drive_url': drive_photo.get('drive_url'),
+                'file_size': drive_photo.get('file_size'),
+                'mime_type': drive_photo.get('mime_type'),
+                'is_primary': False,
+                'is_active': True,
+                'order_index': 0
+            })
+            continue
+
+        changes = {
+            column: drive_photo.get(key)
+            for column, key in SYNCED_FIELDS.items()
+            if getattr(row, column) != drive_photo.get(key)
+        }
+        if not row.is_active:
+            changes['is_active'] = True
+        if changes:
+            to_update.append({'id': row.id, **changes})
+
+    missing = [row for file_id, row in existing.items() if file_id not in drive_files]
+    missing_ids = []
+    if prune:
+        delete_ids.extend(row.id for row in missing)
+    else:
+        missing_ids = [row.id for row in missing if row.is_active]
+
+    new_photos = []
+    if to_insert:
+        new_photos = db.scalars(insert(Photo).returning(Photo), to_insert).all()
+
+    if to_update:
+        db.execute(update(Photo), to_update)
+
+    if missing_ids:
+        db.execute(
+            update(Photo)
+            .where(Photo.id.in_(missing_ids))
+            .values(is_active=False, is_primary=False)
+            .execution_options(synchronize_session=False)
+        )
+
+    if delete_ids:
+        db.execute(
+            delete(Photo)
+            .where(Photo.id.in_(delete_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    logger.info(
+        f"Reconciled Drive photos for vehicle {vehicle_id}: "
+        f"{len(to_insert)} new, {len(to_update)} updated, "
+        f"{len(missing)} missing, {len(delete_ids)} deleted"
+    )
+
+    return {
+        'vehicle_id': vehicle_id,
+        'total_files': len(drive_photos),
+        'synced_count': len(drive_files),
+        'new_count': len(to_insert),
+        'updated_count': len(to_update),
+        'missing_count': len(missing),
+        'deleted_count': len(delete_ids),
+        'missing_file_ids': [row.drive_file_id for row in missing],
+        'pending_delete_ids': pending_delete_ids,
+        'new_photos': new_photos
+    }
@@ -0,0 +1,231 @@
+"""
+Post Templates
+Compiled post-content templates with a per-vehicle render cache
+"""
+
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from decimal import Decimal
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Placeholders a template may use, e.g. "{año} {marca} {modelo} - {precio}"
+TEMPLATE_FIELDS = (
+    "marca", "modelo", "año", "color", "precio", "kilometraje", "ubicacion", "descripcion"
+)
+
+# A placeholder without a format spec renders the display text from
+# vehicle_values(); with a spec ("{precio:,.2f}") it formats the typed value
+# from typed_vehicle_values(). Specs are checked against these samples.
+SAMPLE_VALUES: Dict[str, Any] = {field: "" for field in TEMPLATE_FIELDS}
+SAMPLE_VALUES.update({"precio": Decimal("250000.00"), "kilometraje": 45000, "año": 2020})
+
+MAX_TEMPLATE_LENGTH = 5000
+
+# Version tag of the built-in template; bump when its wording changes
+DEFAULT_TEMPLATE_VERSION = "default-1"
+
+# Rendered posts kept in memory (vehicle x template version)
+RENDER_CACHE_SIZE = 5000
+
+
+class TemplateError(ValueError):
+    """Raised when a post template is invalid"""
+
+
+class CompiledTemplate:
+    """A template parsed and validated once, rendered by joining its parts"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.version = hashlib.sha1(source.encode()).hexdigest()[:12]
+        self.parts: List[Tuple[str, Optional[str], str]] = []
+        self.fields = set()
+
+        if len(source) > MAX_TEMPLATE_LENGTH:
+            raise TemplateError(f"Template is longer than {MAX_TEMPLATE_LENGTH} characters")
+
+        try:
+            parsed = list(Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"Invalid template syntax: {e}")
+
+        for literal, field, spec, conversion in parsed:
+            if field is None:
+                self.parts.append((literal, None, ""))
+                continue
+            if field not in TEMPLATE_FIELDS:
+                raise TemplateError(
+                    f"Unknown placeholder {{{field}}}; allowed: {', '.join(TEMPLATE_FIELDS)}"
+                )
+            if conversion or (spec and "{" in spec):
+                raise TemplateError(f"Conversions and nested placeholders are not supported in {{{field}}}")
+            try:
+                format(SAMPLE_VALUES[field], spec or "")
+            except (ValueError, TypeError) as e:
+                raise TemplateError(f"Invalid format spec for {{{field}}}: {e}")
+
+            self.parts.append((literal, field, spec or ""))
+            self.fields.add(field)
+
+    def render(self, values: Dict[str, Any], typed_values: Optional[Dict[str, Any]] = None) -> str:
+        """Raises TemplateError, ValueError or TypeError if a typed value can't take its spec"""
+        typed_values = typed_values or {}
+        chunks = []
+        for literal, field, spec in self.parts:
+            chunks.append(literal)
+            if field is None:
+                continue
+            if not spec:
+                chunks.append(str(values[field]))
+                continue
+            value = typed_values.get(field)
+            if value is None:
+                raise TemplateError(f"No value to format for {{{field}:{spec}}}")
+            chunks.append(format(value, spec))
+        return "".join(chunks)
+
+
+@lru_cache(maxsize=256)
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile (and validate) a template once per distinct source"""
+    return CompiledTemplate(source)
+
+
+def vehicle_values(vehicle: Any) -> Dict[str, str]:
+    """Placeholder values for a vehicle, formatted the way posts display them"""
+    return {
+        "marca": vehicle.marca,
+        "modelo": vehicle.modelo,
+        "año": vehicle.año,
+        "color": vehicle.color or "N/A",
+        "precio": f"${vehicle.precio:,.0f}" if vehicle.precio else "Consultar",
+        "kilometraje": vehicle.kilometraje or "N/A",
+        "ubicacion": vehicle.ubicacion or "N/A",
+        "descripcion": vehicle.descripcion or ""
+    }
+
+
+def typed_vehicle_values(vehicle: Any) -> Dict[str, Any]:
+    """Placeholder values with their own types, for placeholders with a format spec"""
+    values = {
+        field: str(getattr(vehicle, field, None) or "")
+        for field in ("marca", "modelo", "color", "ubicacion", "descripcion")
+    }
+    values["precio"] = Decimal(str(vehicle.precio)) if vehicle.precio is not None else None
+    values["año"] = int(vehicle.año) if vehicle.año is not None else None
+
+    # kilometraje is free text such as "45,000 km"
+    digits = re.sub(r"\D", "", str(vehicle.kilometraje or ""))
+    values["kilometraje"] = int(digits) if digits else None
+    return values
+
+
+def render_default(vehicle: Any) -> str:
+    """Built-in post wording used when no template is configured"""
+    content = f"🚗 ¡Excelente oportunidad! {vehicle.año} {vehicle.marca} {vehicle.modelo}"
+
+    if vehicle.color:
+        content += f" en color {vehicle.color}"
+
+    if vehicle.kilometraje:
+        content += f", solo {vehicle.kilometraje}"
+
+    if vehicle.precio:
+        content += f". Precio especial: ${vehicle.precio:,.0f}"
+
+    if vehicle.ubicacion:
+        content += f". Ubicado en {vehicle.ubicacion}"
+
+    content += "\n\n✅ Garantía incluida\n📞 Llámanos hoy mismo\n🔗 Más detalles en nuestro sitio web"
+
+    return content
+
+
+class PostContentRenderer:
+    """
+    Renders post content with an LRU cache keyed by vehicle id, the vehicle's
+    updated_at and the template version, so unchanged vehicles are not
+    re-rendered on every run and edits invalidate naturally.
+    """
+
+    def __init__(self, cache_size: int = RENDER_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, vehicle: Any, template: Optional[str] = None) -> str:
+        return self._render(vehicle, self._compile(template))
+
+    def render_batch(self, vehicles: Iterable[Any], template: Optional[str] = None) -> Dict[int, str]:
+        """Render one template for many vehicles; returns vehicle_id -> content"""
+        compiled = self._compile(template)
+        return {vehicle.id: self._render(vehicle, compiled) for vehicle in vehicles}
+
+    def _render(self, vehicle: Any, compiled: Optional[CompiledTemplate]) -> str:
+        version = compiled.version if compiled else DEFAULT_TEMPLATE_VERSION
+
+        key = None
+        if getattr(vehicle, "id", None) is not None:
+            key = (vehicle.id, getattr(vehicle, "updated_at", None), version)
+            content = self._cache.get(key)
+            if content is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return content
+
+        self.misses += 1
+        content = None
+        if compiled:
+            try:
+                content = compiled.render(vehicle_values(vehicle), typed_vehicle_values(vehicle))
+            except (TemplateError, ValueError, TypeError) as e:
+                # e.g. "{precio:,.0f}" for a vehicle without a price
+                logger.warning(
+                    f"Post template failed for vehicle {getattr(vehicle, 'id', None)}, "
+                    f"using the default wording: {e}"
+                )
+        if content is None:
+            content = render_default(vehicle)
+
+        if key is not None:
+            self._cache[key] = content
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return content
+
+    def _compile(self, template: Optional[str]) -> Optional[CompiledTemplate]:
+        if not template:
+            return None
+        try:
+            return compile_template(template)
+        except TemplateError as e:
+            # Stored templates are validated on save; this only guards legacy data
+            logger.error(f"Invalid post template, using the default wording: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def validate_automation_config(config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Validate and compile the post_template in an account's automation_config.
+    Returns the config with its post_template_version set; raises TemplateError.
+    """
+    if not config or not config.get("post_template"):
+        return config
+
+    compiled = compile_template(config["post_template"])
+    return {**config, "post_template_version": compiled.version}
+
+
+# Global renderer instance
+post_renderer = PostContentRenderer()
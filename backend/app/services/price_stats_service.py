@@ -0,0 +1,160 @@
+"""
+Price Statistics Service
+Price distribution per marca/modelo/año segment, cached until prices change
+"""
+
+import logging
+import math
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.vehicle import Vehicle
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+DEFAULT_HISTOGRAM_BUCKETS = 10
+MAX_HISTOGRAM_BUCKETS = 50
+
+# Price writes invalidate the cache on commit; the TTL only bounds staleness
+# from writes made by other processes
+STATS_TTL_SECONDS = 3600
+
+# Vehicle columns that move a price into, out of or between segments
+SEGMENT_COLUMNS = ("marca", "modelo", "año", "precio", "estatus")
+
+# session.info key marking that this transaction changed segment prices
+PRICES_CHANGED_KEY = "price_stats_changed"
+
+
+def percentile(prices: Sequence[float], fraction: float) -> float:
+    """Linearly interpolated percentile of sorted prices (same as percentile_cont)"""
+    position = (len(prices) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return prices[lower] + (prices[upper] - prices[lower]) * (position - lower)
+
+
+def histogram(prices: Sequence[float], buckets: int) -> List[Dict[str, Any]]:
+    """Equal-width buckets between the lowest and highest of sorted prices"""
+    low, high = prices[0], prices[-1]
+    if low == high:
+        return [{"min": low, "max": high, "count": len(prices)}]
+
+    width = (high - low) / buckets
+    counts = [0] * buckets
+    for price in prices:
+        # The highest price belongs to the last (closed) bucket
+        counts[min(int((price - low) / width), buckets - 1)] += 1
+    return [
+        {"min": round(low + width * i, 2), "max": round(low + width * (i + 1), 2), "count": count}
+        for i, count in enumerate(counts)
+    ]
+
+
+def segment_stats(prices: Sequence[float], buckets: int) -> Dict[str, Any]:
+    return {
+        "count": len(prices),
+        "min": prices[0],
+        "max": prices[-1],
+        "mean": round(sum(prices) / len(prices), 2),
+        "percentiles": {f"p{p}": round(percentile(prices, p / 100), 2) for p in PERCENTILES},
+        "histogram": histogram(prices, buckets)
+    }
+
+
+class PriceStatistics:
+    """
+    Price percentiles and histograms per segment.
+
+    One query reads the (marca, modelo, año, precio) columns sorted by segment
+    and price, so every segment arrives as an already sorted run and is
+    summarised in a single pass. Results are cached per filter set and dropped
+    whenever a committed write changes a vehicle's price or segment.
+    """
+
+    def __init__(self, ttl_seconds: float = STATS_TTL_SECONDS):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=256)
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def get_stats(self, db: Session, marca: Optional[str] = None, modelo: Optional[str] = None,
+                  año: Optional[int] = None, estatus: Optional[str] = None,
+                  buckets: int = DEFAULT_HISTOGRAM_BUCKETS) -> Dict[str, Any]:
+        key = (marca and marca.lower(), modelo and modelo.lower(), año, estatus, buckets)
+        return self._cache.get_or_set(key, lambda: self._compute(db, marca, modelo, año, estatus, buckets))
+
+    def _compute(self, db: Session, marca: Optional[str], modelo: Optional[str], año: Optional[int],
+                 estatus: Optional[str], buckets: int) -> Dict[str, Any]:
+        filters = [Vehicle.precio.isnot(None)]
+        # Case-insensitive equality; ilike would treat % and _ in the input as wildcards
+        if marca:
+            filters.append(func.lower(Vehicle.marca) == marca.lower())
+        if modelo:
+            filters.append(func.lower(Vehicle.modelo) == modelo.lower())
+        if año:
+            filters.append(Vehicle.año == año)
+        if estatus:
+            filters.append(Vehicle.estatus == estatus)
+
+        rows = db.query(Vehicle.marca, Vehicle.modelo, Vehicle.año, Vehicle.precio).filter(*filters).order_by(
+            Vehicle.marca, Vehicle.modelo, Vehicle.año, Vehicle.precio
+        ).all()
+
+        segments = []
+        for (seg_marca, seg_modelo, seg_año), group in groupby(rows, key=lambda row: row[:3]):
+            prices = [float(row.precio) for row in group]
+            segments.append({"marca": seg_marca, "modelo": seg_modelo, "año": seg_año,
+                             **segment_stats(prices, buckets)})
+
+        return {
+            "total": len(rows),
+            "segments": segments
+        }
+
+
+# Global price statistics instance
+price_statistics = PriceStatistics()
+
+
+def _collect_price_changes(session, flush_context):
+    if session.info.get(PRICES_CHANGED_KEY):
+        return
+    for instance in list(session.new) + list(session.deleted):
+        if isinstance(instance, Vehicle):
+            session.info[PRICES_CHANGED_KEY] = True
+            return
+    for instance in session.dirty:
+        if isinstance(instance, Vehicle):
+            state = inspect(instance)
+            if any(state.attrs[column].history.has_changes() for column in SEGMENT_COLUMNS):
+                session.info[PRICES_CHANGED_KEY] = True
+                return
+
+
+def _invalidate_on_commit(session):
+    if session.info.pop(PRICES_CHANGED_KEY, None):
+        price_statistics.invalidate()
+
+
+def _discard_changes(session):
+    session.info.pop(PRICES_CHANGED_KEY, None)
+
+
+def register_price_events(session_factory=SessionLocal):
+    """Invalidate cached price statistics when sessions from this factory change prices"""
+    if event.contains(session_factory, "after_flush", _collect_price_changes):
+        return
+    event.listen(session_factory, "after_flush", _collect_price_changes)
+    event.listen(session_factory, "after_commit", _invalidate_on_commit)
+    event.listen(session_factory, "after_rollback", _discard_changes)
+
+
+register_price_events()
@@ -0,0 +1,223 @@
+"""
+Rate Limiter
+Per-account and per-app token buckets for Facebook Graph API calls
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when an account's automation_config has no rate_limit section
+DEFAULT_RATE_LIMIT = {
+    "posts_per_hour": 25,
+    "post_burst": 5
+}
+
+# The app quota is shared by every account using the app, so it comes from app settings
+APP_CALLS_PER_HOUR = int(os.getenv("FACEBOOK_APP_CALLS_PER_HOUR", "200"))
+APP_BURST = int(os.getenv("FACEBOOK_APP_BURST", "20"))
+
+# Usage (percent of quota reported by Graph) at which refill starts slowing down
+USAGE_THROTTLE_THRESHOLD = 75
+
+# Minimum pause once Graph reports a quota at 100% without a regain estimate
+USAGE_BLOCK_SECONDS = 300
+
+
+class TokenBucket:
+    """
+    Token bucket where callers reserve a token and wait instead of failing.
+
+    Tokens may go negative: each reservation queues behind earlier ones and
+    gets back how long it must sleep. The refill rate can be scaled down and
+    the bucket paused when Graph usage headers report pressure.
+    """
+
+    def __init__(self, rate_per_hour: float, burst: int):
+        self.base_rate = max(rate_per_hour, 1) / 3600.0
+        self.rate = self.base_rate
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.usage = 0
+
+    def configure(self, rate_per_hour: float, burst: int):
+        """Apply new limits, keeping current usage throttling"""
+        self._refill(time.monotonic())
+        factor = self.rate / self.base_rate if self.base_rate else 1.0
+        self.base_rate = max(rate_per_hour, 1) / 3600.0
+        self.rate = self.base_rate * factor
+        self.capacity = float(max(burst, 1))
+        self.tokens = min(self.tokens, self.capacity)
+
+    def reserve(self, count: int = 1) -> float:
+        """Take count tokens and return the seconds to wait before using them"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= count
+
+        wait = max(self.blocked_until - now, 0.0)
+        if self.tokens < 0:
+            wait += -self.tokens / self.rate
+        return wait
+
+    def apply_usage(self, usage: int, regain_seconds: float = 0):
+        """Slow down or pause refill based on the reported quota usage (0-100)"""
+        now = time.monotonic()
+        self._refill(now)
+        self.usage = usage
+
+        if usage >= 100 or regain_seconds > 0:
+            pause = regain_seconds or USAGE_BLOCK_SECONDS
+            self.blocked_until = max(self.blocked_until, now + pause)
+            self.tokens = min(self.tokens, 0.0)
+            logger.warning(f"Graph API quota exhausted, pausing bucket for {pause:.0f}s")
+        elif usage >= USAGE_THROTTLE_THRESHOLD:
+            remaining = (100 - usage) / (100 - USAGE_THROTTLE_THRESHOLD)
+            self.rate = self.base_rate * max(remaining, 0.1)
+        else:
+            self.rate = self.base_rate
+
+    def _refill(self, now: float):
+        start = max(self.updated, self.blocked_until)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = now
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "tokens": round(self.tokens, 2),
+            "capacity": self.capacity,
+            "rate_per_hour": round(self.rate * 3600, 2),
+            "base_rate_per_hour": round(self.base_rate * 3600, 2),
+            "usage_percent": self.usage,
+            "blocked_for_seconds": round(max(self.blocked_until - now, 0.0), 1)
+        }
+
+
+class FacebookRateLimiter:
+    """Token buckets keyed by Facebook account (posts) and app (all Graph calls)"""
+
+    def __init__(self):
+        self.account_buckets: Dict[str, TokenBucket] = {}
+        self.app_buckets: Dict[str, TokenBucket] = {}
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_acquired = 0
+        self.total_waited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def configure(self, account_key: str, app_key: str, config: Optional[Dict[str, Any]] = None):
+        """
+        Create or update the account bucket from its rate_limit config. The app
+        bucket is created once from app settings; account configs never change it.
+        """
+        limits = {**DEFAULT_RATE_LIMIT, **(config or {})}
+
+        account_bucket = self.account_buckets.get(account_key)
+        if account_bucket is None:
+            self.account_buckets[account_key] = TokenBucket(limits["posts_per_hour"], limits["post_burst"])
+        else:
+            account_bucket.configure(limits["posts_per_hour"], limits["post_burst"])
+
+        if app_key not in self.app_buckets:
+            self.app_buckets[app_key] = TokenBucket(APP_CALLS_PER_HOUR, APP_BURST)
+
+    async def acquire(self, account_key: str, app_key: str, posting: bool = False, calls: int = 1) -> float:
+        """
+        Wait until a call is allowed. Every call takes calls app tokens (one per
+        sub-request of a batch); posts also take an account token. Returns the
+        seconds waited.
+        """
+        if app_key not in self.app_buckets or account_key not in self.account_buckets:
+            self.configure(account_key, app_key)
+
+        wait = self.app_buckets[app_key].reserve(calls)
+        if posting:
+            wait = max(wait, self.account_buckets[account_key].reserve())
+
+        self.total_acquired += calls
+        if wait > 0:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            try:
+                logger.info(f"Rate limited Graph call for account {account_key}, waiting {wait:.1f}s")
+                await asyncio.sleep(wait)
+            finally:
+                self.queue_depth -= 1
+            self.total_waited += 1
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+        return wait
+
+    def update_from_headers(self, account_key: str, app_key: str, headers: Mapping[str, str]):
+        """Adapt buckets to X-App-Usage / X-Page-Usage / X-Business-Use-Case-Usage"""
+        app_usage = _parse_usage(headers.get("x-app-usage"))
+        if app_usage is not None and app_key in self.app_buckets:
+            self.app_buckets[app_key].apply_usage(app_usage)
+
+        account_usage, regain_seconds = _parse_business_usage(headers.get("x-business-use-case-usage"))
+        page_usage = _parse_usage(headers.get("x-page-usage"))
+        if page_usage is not None:
+            account_usage = max(account_usage or 0, page_usage)
+
+        if account_usage is not None and account_key in self.account_buckets:
+            self.account_buckets[account_key].apply_usage(account_usage, regain_seconds)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, wait time and bucket state"""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "total_acquired": self.total_acquired,
+            "total_waited": self.total_waited,
+            "total_wait_seconds": round(self.total_wait_seconds, 2),
+            "average_wait_seconds": round(self.total_wait_seconds / self.total_waited, 2) if self.total_waited else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 2),
+            "accounts": {key: bucket.snapshot() for key, bucket in self.account_buckets.items()},
+            "apps": {key: bucket.snapshot() for key, bucket in self.app_buckets.items()}
+        }
+
+
+def _parse_usage(value: Optional[str]) -> Optional[int]:
+    """Highest percentage in an X-App-Usage style header"""
+    if not value:
+        return None
+    try:
+        usage = json.loads(value)
+        return max(int(usage.get(key, 0)) for key in ("call_count", "total_time", "total_cputime"))
+    except (ValueError, TypeError, AttributeError):
+        logger.warning(f"Could not parse Graph usage header: {value}")
+        return None
+
+
+def _parse_business_usage(value: Optional[str]) -> Tuple[Optional[int], float]:
+    """Highest percentage and regain time (seconds) in X-Business-Use-Case-Usage"""
+    if not value:
+        return None, 0
+    try:
+        usage = None
+        regain_minutes = 0
+        for entries in json.loads(value).values():
+            for entry in entries:
+                entry_usage = max(int(entry.get(key, 0)) for key in ("call_count", "total_time", "total_cputime"))
+                usage = max(usage or 0, entry_usage)
+                regain_minutes = max(regain_minutes, int(entry.get("estimated_time_to_regain_access", 0)))
+        return usage, regain_minutes * 60
+    except (ValueError, TypeError, AttributeError):
+        logger.warning(f"Could not parse Graph business usage header: {value}")
+        return None, 0
+
+
+# Global rate limiter instance
+rate_limiter = FacebookRateLimiter()
@@ -0,0 +1,169 @@
+"""
+Removal Service
+Takes sold and reserved vehicles off Facebook as soon as their status changes
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.vehicle import Vehicle
+from ..models.social_post import SocialPost
+from ..models.marketplace_listing import MarketplaceListing
+from .automation_service import AutomationService
+from .outbox_service import REMOVAL_STATUSES, cancel_pending_posts
+from .vehicle_events import DomainEvent, VEHICLE_STATUS_CHANGED, event_bus
+
+logger = logging.getLogger(__name__)
+
+# Status changes arriving within this window are removed in one Graph batch
+BATCH_WINDOW_SECONDS = 1.0
+
+# Failed removals are retried with backoff: RETRY_BASE_SECONDS * 2^(attempt - 1), capped
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+
+
+class SoldVehicleRemover:
+    """
+    Consumes vehicle status events and deletes the vehicles' live posts and
+    Marketplace listings.
+
+    Vehicle ids are collected for a short window so a bulk status update
+    becomes a few Graph batch requests instead of one call per vehicle.
+    Vehicles whose removal failed are queued again with backoff; on start,
+    sold or reserved vehicles that still have live posts are queued too, so
+    failures survive a restart.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_window: float = BATCH_WINDOW_SECONDS):
+        self.session_factory = session_factory
+        self.batch_window = batch_window
+        self._pending: Set[int] = set()
+        self._attempts: Dict[int, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.removed = 0
+        self.failed = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Subscribe to status events and start the consumer on the running loop"""
+        if self.is_running:
+            return
+        event_bus.bind()
+        event_bus.subscribe(VEHICLE_STATUS_CHANGED, self._on_status_changed)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self._pending:
+            self._wakeup.set()
+
+    def stop(self):
+        event_bus.unsubscribe(VEHICLE_STATUS_CHANGED, self._on_status_changed)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _on_status_changed(self, domain_event: DomainEvent):
+        if domain_event.payload.get("new_status") not in REMOVAL_STATUSES:
+            return
+        self._queue([domain_event.payload["vehicle_id"]])
+
+    def _queue(self, vehicle_ids: Iterable[int]):
+        self._pending.update(vehicle_ids)
+        if self._wakeup is not None and self._pending:
+            self._wakeup.set()
+
+    def _retry_later(self, vehicle_ids: Iterable[int]):
+        loop = asyncio.get_running_loop()
+        for vehicle_id in vehicle_ids:
+            attempts = self._attempts[vehicle_id] = self._attempts.get(vehicle_id, 0) + 1
+            delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+            loop.call_later(delay, self._queue, [vehicle_id])
+        logger.warning(f"Retrying Facebook removal for vehicles {sorted(vehicle_ids)}")
+
+    def _find_unremoved(self, db: Session) -> List[int]:
+        """Sold or reserved vehicles that still have a live post or listing"""
+        live_post = exists().where(
+            SocialPost.vehicle_id == Vehicle.id,
+            SocialPost.platform == "facebook",
+            SocialPost.status == "posted",
+            SocialPost.external_post_id.isnot(None)
+        )
+        live_listing = exists().where(
+            MarketplaceListing.vehicle_id == Vehicle.id,
+            MarketplaceListing.status == "active",
+            MarketplaceListing.external_listing_id.isnot(None)
+        )
+        rows = db.query(Vehicle.id).filter(
+            Vehicle.estatus.in_(REMOVAL_STATUSES),
+            or_(live_post, live_listing)
+        ).all()
+        return [vehicle_id for vehicle_id, in rows]
+
+    async def _run(self):
+        db = self.session_factory()
+        try:
+            self._queue(self._find_unremoved(db))
+        except Exception as e:
+            logger.error(f"Error looking up unremoved Facebook posts: {e}")
+        finally:
+            db.close()
+
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.batch_window)
+            self._wakeup.clear()
+
+            vehicle_ids, self._pending = sorted(self._pending), set()
+            if vehicle_ids:
+                await self.remove(vehicle_ids)
+
+    async def remove(self, vehicle_ids) -> Dict[str, Any]:
+        """Cancel queued post intents and delete live posts; failures are retried"""
+        vehicle_ids = list(vehicle_ids)
+        db = self.session_factory()
+        try:
+            cancelled = cancel_pending_posts(db, vehicle_ids, "Vehicle sold or reserved")
+            db.commit()
+            if cancelled:
+                logger.info(f"Cancelled {cancelled} queued Facebook posts for vehicles {vehicle_ids}")
+
+            result = await AutomationService(db).remove_vehicle_posts(vehicle_ids)
+            self.removed += result["removed"]
+            self.failed += result["failed"]
+
+            failed_ids = set(result["failed_vehicle_ids"])
+            for vehicle_id in vehicle_ids:
+                if vehicle_id not in failed_ids:
+                    self._attempts.pop(vehicle_id, None)
+            if failed_ids:
+                self._retry_later(failed_ids)
+            return {**result, "cancelled": cancelled}
+        except Exception as e:
+            logger.error(f"Error removing Facebook posts for vehicles {vehicle_ids}: {e}")
+            db.rollback()
+            self._retry_later(vehicle_ids)
+            return {"removed": 0, "failed": 0, "total": 0, "error": str(e)}
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "pending": len(self._pending),
+            "retrying": len(self._attempts),
+            "removed": self.removed,
+            "failed": self.failed
+        }
+
+
+# Global remover instance
+sold_vehicle_remover = SoldVehicleRemover()
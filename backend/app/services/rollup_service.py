@@ -0,0 +1,208 @@
+"""
+Rollup Service
+Daily snapshots of inventory statistics and period-over-period changes
+"""
+
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, and_
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.vehicle import Vehicle
+from ..models.photo import Photo
+from ..models.dashboard_snapshot import DashboardSnapshot
+from .analytics_service import inventory_analytics
+from .cache import TTLCache
+from .inventory_counters import inventory_counters
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_ROLLUP_JOB = "dashboard_rollup"
+
+# Runs every day shortly before midnight so each row holds the end-of-day state
+DASHBOARD_ROLLUP_CONFIG = {"is_active": True, "days_of_week": [0, 1, 2, 3, 4, 5, 6], "time_of_day": "23:55"}
+
+DEFAULT_PERIOD_DAYS = 7
+
+# Snapshot columns compared against live stats (dashboard field -> change field)
+CHANGE_FIELDS = {
+    "total_vehicles": "vehicles_change",
+    "available_vehicles": "available_change",
+    "total_value": "value_change",
+    "total_photos": "photos_change"
+}
+
+# Fallback when the in-memory counters aren't running: serve repeated polls
+# from memory for a few seconds
+STATS_CACHE_TTL_SECONDS = 10
+_stats_cache = TTLCache(ttl_seconds=STATS_CACHE_TTL_SECONDS, max_entries=1)
+
+# Reference snapshots only change when the daily rollup runs
+_reference_cache = TTLCache(ttl_seconds=600, max_entries=32)
+
+SNAPSHOT_FIELDS = (
+    "total_vehicles", "available_vehicles", "sold_vehicles", "reserved_vehicles",
+    "unavailable_vehicles", "total_value", "average_price",
+    "total_photos", "vehicles_with_photos", "primary_photos"
+)
+
+
+def inventory_stats(db: Session) -> Dict[str, Any]:
+    """Current inventory statistics in two queries: one pass over vehicles, one over photos"""
+    priced_available = and_(Vehicle.estatus == "DISPONIBLE", Vehicle.precio.isnot(None))
+
+    vehicle_stats = db.query(
+        func.count().label("total"),
+        func.count().filter(Vehicle.estatus == "DISPONIBLE").label("available"),
+        func.count().filter(Vehicle.estatus == "VENDIDO").label("sold"),
+        func.count().filter(Vehicle.estatus == "APARTADO").label("reserved"),
+        func.count().filter(Vehicle.estatus == "AUSENTE").label("unavailable"),
+        # Total value and average price only for available vehicles with price
+        func.sum(Vehicle.precio).filter(priced_available).label("total_value"),
+        func.avg(Vehicle.precio).filter(priced_available).label("average_price")
+    ).select_from(Vehicle).one()
+
+    photo_stats = db.query(
+        func.count().label("total"),
+        func.count(func.distinct(Photo.vehicle_id)).label("vehicles_with_photos"),
+        func.count().filter(Photo.is_primary == True).label("primary")
+    ).select_from(Photo).one()
+
+    return {
+        "total_vehicles": vehicle_stats.total,
+        "available_vehicles": vehicle_stats.available,
+        "sold_vehicles": vehicle_stats.sold,
+        "reserved_vehicles": vehicle_stats.reserved,
+        "unavailable_vehicles": vehicle_stats.unavailable,
+        "total_value": float(vehicle_stats.total_value) if vehicle_stats.total_value else 0.0,
+        "average_price": float(vehicle_stats.average_price) if vehicle_stats.average_price else 0.0,
+        "total_photos": photo_stats.total,
+        "vehicles_with_photos": photo_stats.vehicles_with_photos,
+        "primary_photos": photo_stats.primary
+    }
+
+
+def dashboard_stats(db: Session, period_days: int = DEFAULT_PERIOD_DAYS) -> Dict[str, Any]:
+    """Live inventory statistics plus changes against the daily rollup from period_days ago"""
+    if inventory_counters.is_running and not inventory_counters.is_ready:
+        # Counters were invalidated by a write they couldn't apply; recount now
+        inventory_counters.seed(db)
+
+    if inventory_counters.is_ready:
+        stats = inventory_counters.get_stats()
+    else:
+        stats = _stats_cache.get_or_set("stats", lambda: inventory_stats(db))
+
+    # Percentage changes come from one stored snapshot, not from scanning history
+    reference = _reference_cache.get_or_set(
+        (period_days, date.today()), lambda: snapshot_values(get_reference_snapshot(db, period_days))
+    )
+    changes = period_changes(stats, reference)
+
+    return {
+        **stats,
+        "vehicles_change": changes["vehicles_change"],
+        "available_change": changes["available_change"],
+        "value_change": changes["value_change"],
+        "photos_change": changes["photos_change"],
+        "period_days": period_days,
+        "compared_to": changes["compared_to"],
+        "status_breakdown": {
+            "disponible": stats["available_vehicles"],
+            "vendido": stats["sold_vehicles"],
+            "reservado": stats["reserved_vehicles"],
+            "no_disponible": stats["unavailable_vehicles"]
+        }
+    }
+
+
+def take_snapshot(db: Session, snapshot_date: Optional[date] = None) -> DashboardSnapshot:
+    """Store (or overwrite) the snapshot for a day from the current statistics and analytics"""
+    snapshot_date = snapshot_date or date.today()
+    stats = inventory_stats(db)
+    try:
+        analytics = inventory_analytics.compute(db)
+    except Exception as e:
+        # Keep the counts; requests compute analytics live until the next rollup
+        logger.error(f"Error computing inventory analytics for the snapshot: {e}")
+        db.rollback()
+        analytics = {"aging": None, "time_to_sale": None}
+
+    snapshot = db.query(DashboardSnapshot).filter(DashboardSnapshot.snapshot_date == snapshot_date).first()
+    if snapshot is None:
+        snapshot = DashboardSnapshot(snapshot_date=snapshot_date)
+        db.add(snapshot)
+
+    for name in SNAPSHOT_FIELDS:
+        setattr(snapshot, name, stats[name])
+    snapshot.aging = analytics["aging"]
+    snapshot.time_to_sale = analytics["time_to_sale"]
+
+    db.commit()
+    inventory_analytics.invalidate()
+    logger.info(f"Stored dashboard snapshot for {snapshot_date}")
+    return snapshot
+
+
+def get_reference_snapshot(db: Session, period_days: int = DEFAULT_PERIOD_DAYS) -> Optional[DashboardSnapshot]:
+    """Latest snapshot at least period_days old (a single unique-index lookup)"""
+    cutoff = date.today() - timedelta(days=period_days)
+    return db.query(DashboardSnapshot).filter(
+        DashboardSnapshot.snapshot_date <= cutoff
+    ).order_by(DashboardSnapshot.snapshot_date.desc()).first()
+
+
+def percent_change(current: float, previous: Optional[float]) -> float:
+    if not previous:
+        return 0.0
+    return round((float(current) - float(previous)) / float(previous) * 100, 1)
+
+
+def snapshot_values(snapshot: Optional[DashboardSnapshot]) -> Optional[Dict[str, Any]]:
+    """Plain copy of a snapshot, safe to keep after its session closes"""
+    if snapshot is None:
+        return None
+    values = {name: getattr(snapshot, name) for name in SNAPSHOT_FIELDS}
+    values["snapshot_date"] = snapshot.snapshot_date
+    return values
+
+
+def period_changes(current: Dict[str, Any], reference: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Percentage change of the live stats against reference snapshot values"""
+    changes = {
+        change: percent_change(current[name], reference[name] if reference else None)
+        for name, change in CHANGE_FIELDS.items()
+    }
+    changes["compared_to"] = reference["snapshot_date"].isoformat() if reference else None
+    return changes
+
+
+def _store_snapshot(only_if_missing: bool = False):
+    """Store today's snapshot on a fresh session (blocking; run it in a thread)"""
+    db = SessionLocal()
+    try:
+        if only_if_missing and db.query(DashboardSnapshot.id).filter(
+            DashboardSnapshot.snapshot_date == date.today()
+        ).first() is not None:
+            return
+        take_snapshot(db)
+    except Exception as e:
+        logger.error(f"Error storing dashboard snapshot: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def run_dashboard_rollup(config: Dict[str, Any]):
+    """Scheduler handler: store today's snapshot without blocking the event loop"""
+    await asyncio.to_thread(_store_snapshot)
+
+
+async def schedule_dashboard_rollup(scheduler):
+    """Schedule the daily rollup, storing today's snapshot now if it is missing"""
+    await asyncio.to_thread(_store_snapshot, only_if_missing=True)
+    scheduler.schedule(DASHBOARD_ROLLUP_JOB, DASHBOARD_ROLLUP_CONFIG, run_dashboard_rollup)
@@ -0,0 +1,150 @@
+"""
+Status History Service
+Records vehicle status changes per transaction and pages through them by keyset
+"""
+
+import base64
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event, insert, inspect, tuple_
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.vehicle import Vehicle
+from ..models.status_history import StatusHistory
+
+logger = logging.getLogger(__name__)
+
+# session.info key holding history rows waiting for the transaction to commit
+PENDING_HISTORY_KEY = "pending_status_history"
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _status_value(value: Any) -> Optional[str]:
+    return getattr(value, "value", value)
+
+
+def _load_old_status(target, value, oldvalue, initiator):
+    # Registered with active_history so an expired estatus is loaded before it
+    # is overwritten, and the history row gets the real old_status
+    return value
+
+
+def _collect_history(session, flush_context):
+    """Turn estatus changes of this flush into history rows for the transaction"""
+    rows = []
+    for action, instances in (("created", session.new), ("updated", session.dirty)):
+        for instance in instances:
+            if not isinstance(instance, Vehicle):
+                continue
+
+            # Consumed by this flush even when the status didn't actually change,
+            # so a no-op update_status can't leak its reason into a later change
+            context = instance.__dict__.pop("status_change_context", None) or {}
+
+            if action == "created":
+                old_status = None
+            else:
+                history = inspect(instance).attrs.estatus.history
+                if not history.added:
+                    continue
+                old_status = _status_value(history.deleted[0]) if history.deleted else None
+
+            new_status = _status_value(instance.estatus)
+            if new_status is None or new_status == old_status:
+                continue
+
+            rows.append({
+                "vehicle_id": instance.id,
+                "old_status": old_status,
+                "new_status": new_status,
+                "changed_at": datetime.now(),
+                "changed_by": context.get("changed_by") or instance.updated_by or instance.created_by,
+                "reason": context.get("reason"),
+                "notes": context.get("notes")
+            })
+
+    if rows:
+        session.info.setdefault(PENDING_HISTORY_KEY, []).extend(rows)
+
+
+def _write_history(session):
+    """Write the transaction's history rows in one multi-row INSERT before it commits"""
+    # Changes still pending at commit time are flushed here so their rows are included
+    session.flush()
+    rows = session.info.pop(PENDING_HISTORY_KEY, None)
+    if rows:
+        session.execute(insert(StatusHistory), rows)
+
+
+def _discard_history(session):
+    session.info.pop(PENDING_HISTORY_KEY, None)
+
+
+def register_history_events(session_factory=SessionLocal):
+    """Record status history for sessions made by this factory"""
+    if not event.contains(Vehicle.estatus, "set", _load_old_status):
+        event.listen(Vehicle.estatus, "set", _load_old_status, active_history=True)
+
+    if event.contains(session_factory, "after_flush", _collect_history):
+        return
+    event.listen(session_factory, "after_flush", _collect_history)
+    event.listen(session_factory, "before_commit", _write_history)
+    event.listen(session_factory, "after_rollback", _discard_history)
+
+
+def encode_cursor(entry: StatusHistory) -> str:
+    raw = f"{entry.changed_at.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        changed_at, entry_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(changed_at), int(entry_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _page(query, limit: int) -> Dict[str, Any]:
+    entries = query.limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    return {
+        "items": entries,
+        "next_cursor": encode_cursor(entries[-1]) if has_more else None,
+        "limit": limit
+    }
+
+
+def get_vehicle_history(db: Session, vehicle_id: int, limit: int = DEFAULT_PAGE_SIZE,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+    """One vehicle's status changes, newest first"""
+    query = db.query(StatusHistory).filter(StatusHistory.vehicle_id == vehicle_id)
+    if cursor:
+        changed_at, entry_id = decode_cursor(cursor)
+        query = query.filter(tuple_(StatusHistory.changed_at, StatusHistory.id) < tuple_(changed_at, entry_id))
+    query = query.order_by(StatusHistory.changed_at.desc(), StatusHistory.id.desc())
+    return _page(query, limit)
+
+
+def get_history_since(db: Session, since: Optional[datetime] = None, limit: int = DEFAULT_PAGE_SIZE,
+                      cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Status changes across all vehicles, oldest first, from `since` onwards"""
+    query = db.query(StatusHistory)
+    if cursor:
+        changed_at, entry_id = decode_cursor(cursor)
+        query = query.filter(tuple_(StatusHistory.changed_at, StatusHistory.id) > tuple_(changed_at, entry_id))
+    elif since is not None:
+        query = query.filter(StatusHistory.changed_at >= since)
+    query = query.order_by(StatusHistory.changed_at.asc(), StatusHistory.id.asc())
+    return _page(query, limit)
+
+
+register_history_events()
@@ -0,0 +1,209 @@
+"""
+Vehicle Events
+In-process domain events published after the database transaction commits
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, inspect
+
+from ..database import SessionLocal
+from ..models.vehicle import Vehicle
+from ..models.photo import Photo
+
+logger = logging.getLogger(__name__)
+
+VEHICLE_CREATED = "vehicle.created"
+VEHICLE_UPDATED = "vehicle.updated"
+VEHICLE_DELETED = "vehicle.deleted"
+VEHICLE_STATUS_CHANGED = "vehicle.status_changed"
+PHOTO_CREATED = "photo.created"
+PHOTO_UPDATED = "photo.updated"
+PHOTO_DELETED = "photo.deleted"
+# Bulk INSERT/UPDATE/DELETE statement; carries no rows, listeners should refetch
+INVENTORY_BULK_CHANGED = "inventory.bulk_changed"
+
+ENTITY_EVENT_TYPES = (
+    VEHICLE_CREATED, VEHICLE_UPDATED, VEHICLE_DELETED, VEHICLE_STATUS_CHANGED,
+    PHOTO_CREATED, PHOTO_UPDATED, PHOTO_DELETED, INVENTORY_BULK_CHANGED
+)
+
+# session.info key holding events waiting for the transaction to commit
+PENDING_EVENTS_KEY = "pending_domain_events"
+
+
+@dataclass
+class DomainEvent:
+    """Something that happened to an entity, e.g. a vehicle changing status"""
+    type: str
+    payload: Dict[str, Any]
+    occurred_at: datetime = field(default_factory=datetime.now)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.type, "payload": self.payload, "occurred_at": self.occurred_at.isoformat()}
+
+
+class EventBus:
+    """
+    Fan-out of domain events to in-process subscribers.
+
+    Handlers are plain callables and must be quick (typically they enqueue the
+    event and return); slow work belongs in the subscriber's own task. Events
+    may be published from worker threads, so delivery is marshalled onto the
+    event loop the bus was bound to.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[DomainEvent], None]]] = defaultdict(list)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop = None):
+        """Deliver events on this loop (defaults to the running one)"""
+        self._loop = loop or asyncio.get_running_loop()
+
+    def subscribe(self, event_type: str, handler: Callable[[DomainEvent], None]):
+        if handler not in self._handlers[event_type]:
+            self._handlers[event_type].append(handler)
+
+    def unsubscribe(self, event_type: str, handler: Callable[[DomainEvent], None]):
+        if handler in self._handlers[event_type]:
+            self._handlers[event_type].remove(handler)
+
+    def publish(self, domain_event: DomainEvent):
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            self._dispatch(domain_event)
+            return
+
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+
+        if on_loop:
+            self._dispatch(domain_event)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, domain_event)
+
+    def _dispatch(self, domain_event: DomainEvent):
+        for handler in list(self._handlers.get(domain_event.type, ())):
+            try:
+                handler(domain_event)
+            except Exception as e:
+                logger.error(f"Handler for {domain_event.type} failed: {e}")
+
+
+def _status_value(value: Any) -> Optional[str]:
+    return getattr(value, "value", value)
+
+
+def _loaded_columns(state, changed_only: bool = False) -> Dict[str, Any]:
+    """Column values already in memory (never triggers a load mid-flush)"""
+    values = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key not in state.dict:
+            continue
+        if changed_only and not state.attrs[attr.key].history.has_changes():
+            continue
+        values[attr.key] = _status_value(state.dict[attr.key])
+    return values
+
+
+def _entity_events(instance, action: str) -> List[DomainEvent]:
+    state = inspect(instance)
+
+    if isinstance(instance, Vehicle):
+        key, event_types = "vehicle_id", (VEHICLE_CREATED, VEHICLE_UPDATED, VEHICLE_DELETED)
+    else:
+        key, event_types = "photo_id", (PHOTO_CREATED, PHOTO_UPDATED, PHOTO_DELETED)
+    payload = {key: instance.id}
+    if isinstance(instance, Photo):
+        payload["vehicle_id"] = state.dict.get("vehicle_id")
+
+    if action == "created":
+        return [DomainEvent(type=event_types[0], payload={**payload, "data": _loaded_columns(state)})]
+    if action == "deleted":
+        return [DomainEvent(type=event_types[2], payload=payload)]
+
+    changes = _loaded_columns(state, changed_only=True)
+    if not changes:
+        return []
+
+    events = [DomainEvent(type=event_types[1], payload={**payload, "changes": changes})]
+
+    if isinstance(instance, Vehicle) and "estatus" in changes:
+        history = state.attrs.estatus.history
+        old_status = _status_value(history.deleted[0]) if history.deleted else None
+        if old_status != changes["estatus"]:
+            events.append(DomainEvent(
+                type=VEHICLE_STATUS_CHANGED,
+                payload={"vehicle_id": instance.id, "old_status": old_status, "new_status": changes["estatus"]}
+            ))
+    return events
+
+
+def _collect_events(session, flush_context):
+    """
+    Record vehicle and photo writes until the transaction commits. Runs after
+    the flush so new rows have ids; the session's new/dirty/deleted sets and
+    attribute history still describe the flush at this point.
+    """
+    collected = []
+    for action, instances in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for instance in instances:
+            if isinstance(instance, (Vehicle, Photo)):
+                collected.extend(_entity_events(instance, action))
+
+    if collected:
+        session.info.setdefault(PENDING_EVENTS_KEY, []).extend(collected)
+
+
+def _collect_bulk_events(orm_execute_state):
+    """Record one coarse event per entity and action for bulk DML, which skips the flush"""
+    if orm_execute_state.is_insert:
+        action = "created"
+    elif orm_execute_state.is_update:
+        action = "updated"
+    elif orm_execute_state.is_delete:
+        action = "deleted"
+    else:
+        return
+
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in (Vehicle, Photo):
+        return
+
+    payload = {"entity": "vehicle" if mapper.class_ is Vehicle else "photo", "action": action}
+    pending = orm_execute_state.session.info.setdefault(PENDING_EVENTS_KEY, [])
+    if not any(e.type == INVENTORY_BULK_CHANGED and e.payload == payload for e in pending):
+        pending.append(DomainEvent(type=INVENTORY_BULK_CHANGED, payload=payload))
+
+
+def _publish_pending(session):
+    for domain_event in session.info.pop(PENDING_EVENTS_KEY, []):
+        event_bus.publish(domain_event)
+
+
+def _discard_pending(session):
+    session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+def register_session_events(session_factory=SessionLocal):
+    """Publish vehicle and photo changes from sessions made by this factory"""
+    if event.contains(session_factory, "after_flush", _collect_events):
+        return
+    event.listen(session_factory, "after_flush", _collect_events)
+    event.listen(session_factory, "do_orm_execute", _collect_bulk_events)
+    event.listen(session_factory, "after_commit", _publish_pending)
+    event.listen(session_factory, "after_rollback", _discard_pending)
+
+
+# Global event bus instance
+event_bus = EventBus()
+
+register_session_events()
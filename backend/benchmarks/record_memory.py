@@ -0,0 +1,72 @@
+"""
+Record memory benchmark: plain dicts (the old start_backend.py storage) vs slotted records
+
+Usage (from backend/):
+    python benchmarks/record_memory.py [--vehicles 50000] [--photos 500000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import PhotoRecord, VehicleRecord
+
+
+def vehicle_dict(i: int) -> dict:
+    return {
+        "id": i, "marca": "Toyota", "modelo": "Corolla", "año": 2020, "precio": 250000,
+        "estatus": "disponible", "color": "rojo", "kilometraje": "10000", "ubicacion": "CDMX",
+        "descripcion": "", "external_id": f"GS_{i}"
+    }
+
+
+def photo_dict(i: int) -> dict:
+    return {
+        "id": i, "vehicle_id": i % 5000, "filename": f"p{i}.jpg", "drive_file_id": f"d{i}",
+        "drive_url": f"https://drive.google.com/file/d/d{i}/view", "file_size": 100000,
+        "mime_type": "image/jpeg", "md5_checksum": f"{i:032x}", "uploaded_at": "2024-01-01T00:00:00Z"
+    }
+
+
+def traced_bytes(build) -> int:
+    """Bytes still allocated by what build() returns"""
+    tracemalloc.start()
+    kept = build()  # noqa: F841  (held so its memory is counted)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=50_000)
+    parser.add_argument("--photos", type=int, default=500_000)
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}")
+    print("container size (sys.getsizeof)")
+    print(f"  vehicle  dict {sys.getsizeof(vehicle_dict(1)):5d} B   record "
+          f"{sys.getsizeof(VehicleRecord.from_dict(vehicle_dict(1))):5d} B")
+    print(f"  photo    dict {sys.getsizeof(photo_dict(1)):5d} B   record "
+          f"{sys.getsizeof(PhotoRecord.from_dict(photo_dict(1))):5d} B")
+
+    dicts = traced_bytes(lambda: ([vehicle_dict(i) for i in range(args.vehicles)],
+                                  [photo_dict(i) for i in range(args.photos)]))
+    records = traced_bytes(lambda: ([VehicleRecord.from_dict(vehicle_dict(i)) for i in range(args.vehicles)],
+                                    [PhotoRecord.from_dict(photo_dict(i)) for i in range(args.photos)]))
+    print(f"{args.vehicles} vehicles + {args.photos} photos, strings included (tracemalloc)")
+    print(f"  dicts {dicts / 1e6:6.0f} MB   records {records / 1e6:6.0f} MB")
+
+    record = VehicleRecord.from_dict(vehicle_dict(1))
+    data = vehicle_dict(1)
+    attribute = timeit.timeit(lambda: record.precio, number=10 ** 6) * 1000
+    lookup = timeit.timeit(lambda: data.get("precio", 0), number=10 ** 6) * 1000
+    print(f"attribute read {attribute:.0f} ns   dict.get {lookup:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
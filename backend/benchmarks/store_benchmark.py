@@ -0,0 +1,98 @@
+"""
+In-memory store benchmark: list scans (the old start_backend.py storage) vs InMemoryStore
+
+Usage (from backend/):
+    python benchmarks/store_benchmark.py [--vehicles 50000] [--photos 500000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_store import InMemoryStore
+from records import PhotoRecord, VehicleRecord
+
+
+def build(vehicle_count: int, photo_count: int) -> InMemoryStore:
+    store = InMemoryStore()
+    for _ in range(vehicle_count):
+        store.add_vehicle(VehicleRecord(id=store.allocate_vehicle_id(), marca="Toyota", precio=250000))
+    for _ in range(photo_count):
+        store.add_photo(PhotoRecord(id=store.allocate_photo_id(), vehicle_id=random.randint(1, vehicle_count),
+                                    filename="photo.jpg"))
+    return store
+
+
+def per_call(fn, calls: int) -> float:
+    """Mean seconds per call"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=50_000)
+    parser.add_argument("--photos", type=int, default=500_000)
+    parser.add_argument("--list-calls", type=int, default=5)
+    parser.add_argument("--store-calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    store = build(args.vehicles, args.photos)
+    # The lists start_backend.py used to keep
+    vehicles = list(store.vehicles.values())
+    photos = list(store.photos.values())
+
+    def vehicle_id():
+        return random.randint(1, args.vehicles)
+
+    def photo_id():
+        return random.randint(1, args.photos)
+
+    def scan_set_primary(pid):
+        target = store.photos[pid]
+        for photo in photos:
+            if photo.vehicle_id == target.vehicle_id:
+                photo.is_primary = photo is target
+
+    # (name, id generator, list scan, store call); each scan gets its id once
+    cases = [
+        ("get_vehicle", vehicle_id,
+         lambda vid: next((v for v in vehicles if v.id == vid), None),
+         store.get_vehicle),
+        ("serve_photo lookup", photo_id,
+         lambda pid: next((p for p in photos if p.id == pid), None),
+         store.get_photo),
+        ("get_vehicle_photos", vehicle_id,
+         lambda vid: [p for p in photos if p.vehicle_id == vid],
+         store.vehicle_photos),
+        ("primary-photo", vehicle_id,
+         lambda vid: next((p for p in photos if p.vehicle_id == vid and p.is_primary), None),
+         store.primary_photo),
+        ("set_primary_photo", photo_id,
+         scan_set_primary,
+         store.set_primary_photo),
+    ]
+
+    print(f"{args.vehicles} vehicles, {args.photos} photos")
+    for name, make_id, scan, indexed in cases:
+        print(f"{name:22s} list {per_call(lambda: scan(make_id()), args.list_calls) * 1e3:8.2f} ms"
+              f"   store {per_call(lambda: indexed(make_id()), args.store_calls) * 1e6:7.2f} us")
+
+    doomed = vehicle_id()
+    start = time.perf_counter()
+    [p for p in photos if p.vehicle_id != doomed]
+    rebuild = time.perf_counter() - start
+    start = time.perf_counter()
+    store.delete_vehicle(doomed)
+    indexed = time.perf_counter() - start
+    print(f"{'delete_vehicle photos':22s} list {rebuild * 1e3:8.2f} ms   store {indexed * 1e6:7.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -42,10 +42,14 @@ CREATE TABLE photos (
     drive_file_id VARCHAR(255),
     order_index INTEGER DEFAULT 0,
     is_primary BOOLEAN DEFAULT FALSE,
+    is_active BOOLEAN DEFAULT TRUE,
     file_size BIGINT,
     mime_type VARCHAR(100),
     width INTEGER,
     height INTEGER,
+    content_hash VARCHAR(64),
+    perceptual_hash VARCHAR(16),
+    drive_delete_pending BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -82,6 +86,7 @@ CREATE TABLE social_posts (
 CREATE TABLE marketplace_listings (
     id SERIAL PRIMARY KEY,
     vehicle_id INTEGER REFERENCES vehicles(id) ON DELETE CASCADE,
+    account_id INTEGER,
     platform platform_type DEFAULT 'marketplace',
     listing_id VARCHAR(255),
     external_listing_id VARCHAR(255),
@@ -179,6 +184,50 @@ CREATE TABLE market_intelligence (
     processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Post outbox table (social post intents executed by outbox workers)
+CREATE TABLE post_outbox (
+    id SERIAL PRIMARY KEY,
+    idempotency_key VARCHAR(255) NOT NULL UNIQUE,
+    vehicle_id INTEGER NOT NULL REFERENCES vehicles(id) ON DELETE CASCADE,
+    account_id INTEGER,
+    social_post_id INTEGER REFERENCES social_posts(id) ON DELETE SET NULL,
+    platform VARCHAR(50) NOT NULL DEFAULT 'facebook',
+    message TEXT,
+    include_marketplace BOOLEAN DEFAULT FALSE,
+    status VARCHAR(50) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    locked_at TIMESTAMP WITH TIME ZONE,
+    locked_by VARCHAR(255),
+    last_error TEXT,
+    external_post_id VARCHAR(255),
+    external_listing_id VARCHAR(255),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Dashboard snapshots table (daily inventory rollups)
+CREATE TABLE dashboard_snapshots (
+    id SERIAL PRIMARY KEY,
+    snapshot_date DATE NOT NULL UNIQUE,
+    total_vehicles INTEGER NOT NULL DEFAULT 0,
+    available_vehicles INTEGER NOT NULL DEFAULT 0,
+    sold_vehicles INTEGER NOT NULL DEFAULT 0,
+    reserved_vehicles INTEGER NOT NULL DEFAULT 0,
+    unavailable_vehicles INTEGER NOT NULL DEFAULT 0,
+    total_value DECIMAL(14,2) NOT NULL DEFAULT 0,
+    average_price DECIMAL(12,2) NOT NULL DEFAULT 0,
+    total_photos INTEGER NOT NULL DEFAULT 0,
+    vehicles_with_photos INTEGER NOT NULL DEFAULT 0,
+    primary_photos INTEGER NOT NULL DEFAULT 0,
+    aging JSONB,
+    time_to_sale JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for performance
 CREATE INDEX idx_vehicles_status ON vehicles(estatus);
 CREATE INDEX idx_vehicles_marca_modelo ON vehicles(marca, modelo);
@@ -189,15 +238,23 @@ CREATE INDEX idx_vehicles_external_id ON vehicles(external_id);
 CREATE INDEX idx_photos_vehicle_id ON photos(vehicle_id);
 CREATE INDEX idx_photos_order_index ON photos(vehicle_id, order_index);
 CREATE INDEX idx_photos_is_primary ON photos(vehicle_id, is_primary);
+CREATE INDEX idx_photos_vehicle_drive_file ON photos(vehicle_id, drive_file_id);
+CREATE INDEX idx_photos_vehicle_content_hash ON photos(vehicle_id, content_hash);
 
 CREATE INDEX idx_status_history_vehicle_id ON status_history(vehicle_id);
 CREATE INDEX idx_status_history_changed_at ON status_history(changed_at);
 CREATE INDEX idx_status_history_new_status ON status_history(new_status);
+CREATE INDEX idx_status_history_vehicle_changed_at_id ON status_history(vehicle_id, changed_at, id);
+CREATE INDEX idx_status_history_changed_at_id ON status_history(changed_at, id);
 
 CREATE INDEX idx_social_posts_vehicle_id ON social_posts(vehicle_id);
 CREATE INDEX idx_social_posts_platform ON social_posts(platform);
 CREATE INDEX idx_social_posts_status ON social_posts(status);
 CREATE INDEX idx_social_posts_posted_at ON social_posts(posted_at);
+CREATE INDEX idx_social_posts_vehicle_platform_status_created ON social_posts(vehicle_id, platform, status, created_at);
+
+CREATE INDEX idx_post_outbox_vehicle_id ON post_outbox(vehicle_id);
+CREATE INDEX idx_post_outbox_status_next_attempt ON post_outbox(status, next_attempt_at);
 
 CREATE INDEX idx_marketplace_listings_vehicle_id ON marketplace_listings(vehicle_id);
 CREATE INDEX idx_marketplace_listings_status ON marketplace_listings(status);
@@ -40,10 +40,58 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️  Database initialization failed: {e}")
     
+    # Resume automation schedules (catches up on windows missed while down)
+    try:
+        from app.services.automation_service import (
+            scheduler_leader, on_scheduler_elected, on_scheduler_lost
+        )
+        from app.services.outbox_service import outbox_pool
+        from app.services.removal_service import sold_vehicle_remover
+        outbox_pool.start()
+        # Deletes posts of vehicles marked VENDIDO/APARTADO as the change commits
+        sold_vehicle_remover.start()
+        # Only the elected leader (one per deployment) runs the repost scheduler
+        scheduler_leader.start(on_elected=on_scheduler_elected, on_lost=on_scheduler_lost)
+    except Exception as e:
+        print(f"⚠️  Automation scheduler not started: {e}")
+    
+    # Dashboard counters, seeded from the database and kept current by write hooks
+    try:
+        from app.services.inventory_counters import inventory_counters
+        inventory_counters.start()
+    except Exception as e:
+        print(f"⚠️  Inventory counters not started: {e}")
+    
+    # One broadcaster per process feeds every /events client
+    try:
+        from app.services.event_stream import event_broadcaster
+        event_broadcaster.start()
+    except Exception as e:
+        print(f"⚠️  Event stream not started: {e}")
+    
     yield
     
     # Shutdown
     print("🔄 Shutting down gracefully...")
+    try:
+        from app.services.automation_service import repost_scheduler, scheduler_leader
+        from app.services.graph_client import graph_client
+        from app.services.outbox_service import outbox_pool
+        from app.services.removal_service import sold_vehicle_remover
+        await scheduler_leader.stop()
+        repost_scheduler.stop()
+        outbox_pool.stop()
+        sold_vehicle_remover.stop()
+        await graph_client.aclose()
+    except Exception:
+        pass
+    try:
+        from app.services.inventory_counters import inventory_counters
+        from app.services.event_stream import event_broadcaster
+        inventory_counters.stop()
+        event_broadcaster.stop()
+    except Exception:
+        pass
     print("💾 Closing database connections...")
     print("📝 Saving logs...")
     print(f"✅ {APP_NAME} stopped successfully")
@@ -75,11 +123,18 @@ app.add_middleware(
 
 # Include API routers
 try:
-    from app.api import vehicles_router, health_router, photos_router
+    from app.api import (
+        vehicles_router, health_router, photos_router, dashboard_router, events_router, history_router,
+        analytics_router
+    )
     
     app.include_router(health_router)
     app.include_router(vehicles_router)
     app.include_router(photos_router, prefix="/photos", tags=["photos"])
+    app.include_router(dashboard_router, prefix="/dashboard")
+    app.include_router(events_router)
+    app.include_router(history_router)
+    app.include_router(analytics_router)
     
     print("✅ API routers loaded successfully")
 except Exception as e:
@@ -108,6 +163,8 @@ async def root():
         "health": "/health",
         "api_endpoints": {
             "vehicles": "/vehicles",
+            "dashboard": "/dashboard/stats",
+            "events": "/events",
             "health": "/health",
             "openapi": "/openapi.json"
         }
@@ -0,0 +1,180 @@
+"""
+In-Memory Store for Autosell.mx
+Vehicles and photos for the development backend, indexed for O(1) lookups
+"""
+
+from dataclasses import replace
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+from records import PhotoRecord, VehicleRecord
+
+
+class InMemoryStore:
+    """
+    VehicleRecord and PhotoRecord objects keyed by id, plus two secondary indexes:
+    vehicle_id -> photo ids (in upload order) and vehicle_id -> primary photo id.
+
+    Dicts keep insertion order, so listings come back in creation order as they
+    did with plain lists. Every write goes through this class so the indexes
+    never drift from the records, and writes store a new record instead of
+    changing one in place, so a shallow copy of the maps is a stable view.
+    """
+
+    def __init__(self):
+        self.vehicles: Dict[int, VehicleRecord] = {}
+        self.photos: Dict[int, PhotoRecord] = {}
+        # Dicts used as ordered sets of photo ids
+        self.photos_by_vehicle: Dict[int, Dict[int, None]] = {}
+        self.primary_photos: Dict[int, int] = {}
+        self._next_vehicle_id = 1
+        self._next_photo_id = 1
+
+    # Vehicles
+
+    def allocate_vehicle_id(self) -> int:
+        vehicle_id = self._next_vehicle_id
+        self._next_vehicle_id += 1
+        return vehicle_id
+
+    def add_vehicle(self, vehicle: VehicleRecord) -> VehicleRecord:
+        self.vehicles[vehicle.id] = vehicle
+        self._next_vehicle_id = max(self._next_vehicle_id, vehicle.id + 1)
+        return vehicle
+
+    def get_vehicle(self, vehicle_id: int) -> Optional[VehicleRecord]:
+        return self.vehicles.get(vehicle_id)
+
+    def update_vehicle(self, vehicle_id: int, data: Dict[str, Any]) -> Optional[VehicleRecord]:
+        """Replace a vehicle with a copy merged with data; the id never changes"""
+        vehicle = self.vehicles.get(vehicle_id)
+        if vehicle is None:
+            return None
+        updated = VehicleRecord.from_dict({**vehicle.to_dict(), **data, "id": vehicle_id})
+        self.vehicles[vehicle_id] = updated
+        return updated
+
+    def delete_vehicle(self, vehicle_id: int) -> Tuple[Optional[VehicleRecord], int]:
+        """Remove a vehicle and its photos; returns (vehicle, photos removed)"""
+        vehicle = self.vehicles.pop(vehicle_id, None)
+        if vehicle is None:
+            return None, 0
+        photo_ids = self.photos_by_vehicle.pop(vehicle_id, {})
+        for photo_id in photo_ids:
+            del self.photos[photo_id]
+        self.primary_photos.pop(vehicle_id, None)
+        return vehicle, len(photo_ids)
+
+    def clear_vehicles(self) -> int:
+        """Remove every vehicle and photo; returns the number of photos removed"""
+        photos_removed = len(self.photos)
+        self.vehicles.clear()
+        self.photos.clear()
+        self.photos_by_vehicle.clear()
+        self.primary_photos.clear()
+        return photos_removed
+
+    def list_vehicles(self, skip: int = 0, limit: Optional[int] = None) -> List[VehicleRecord]:
+        stop = None if limit is None else skip + limit
+        return list(islice(self.vehicles.values(), skip, stop))
+
+    def vehicle_count(self) -> int:
+        return len(self.vehicles)
+
+    # Photos
+
+    def allocate_photo_id(self) -> int:
+        photo_id = self._next_photo_id
+        self._next_photo_id += 1
+        return photo_id
+
+    def add_photo(self, photo: PhotoRecord) -> PhotoRecord:
+        photo_id, vehicle_id = photo.id, photo.vehicle_id
+        self.photos[photo_id] = photo
+        self._next_photo_id = max(self._next_photo_id, photo_id + 1)
+        if vehicle_id is not None:
+            self.photos_by_vehicle.setdefault(vehicle_id, {})[photo_id] = None
+            if photo.is_primary:
+                self._mark_primary(vehicle_id, photo_id)
+        return self.photos[photo_id]
+
+    def get_photo(self, photo_id: int) -> Optional[PhotoRecord]:
+        return self.photos.get(photo_id)
+
+    def update_photo(self, photo_id: int, data: Dict[str, Any]) -> Optional[PhotoRecord]:
+        """Replace a photo with a copy merged with data; id, vehicle and primary flag never change"""
+        photo = self.photos.get(photo_id)
+        if photo is None:
+            return None
+        updated = PhotoRecord.from_dict({
+            **photo.to_dict(),
+            **data,
+            "id": photo_id,
+            "vehicle_id": photo.vehicle_id,
+            "is_primary": photo.is_primary
+        })
+        self.photos[photo_id] = updated
+        return updated
+
+    def delete_photo(self, photo_id: int) -> Optional[PhotoRecord]:
+        photo = self.photos.pop(photo_id, None)
+        if photo is None:
+            return None
+        vehicle_id = photo.vehicle_id
+        photo_ids = self.photos_by_vehicle.get(vehicle_id)
+        if photo_ids is not None:
+            photo_ids.pop(photo_id, None)
+            if not photo_ids:
+                del self.photos_by_vehicle[vehicle_id]
+        if self.primary_photos.get(vehicle_id) == photo_id:
+            del self.primary_photos[vehicle_id]
+        return photo
+
+    def list_photos(self, skip: int = 0, limit: Optional[int] = None) -> List[PhotoRecord]:
+        stop = None if limit is None else skip + limit
+        return list(islice(self.photos.values(), skip, stop))
+
+    def photo_count(self) -> int:
+        return len(self.photos)
+
+    def vehicle_photos(self, vehicle_id: int) -> List[PhotoRecord]:
+        return [self.photos[photo_id] for photo_id in self.photos_by_vehicle.get(vehicle_id, ())]
+
+    def vehicle_photo_count(self, vehicle_id: int) -> int:
+        return len(self.photos_by_vehicle.get(vehicle_id, ()))
+
+    def set_primary_photo(self, photo_id: int) -> Optional[PhotoRecord]:
+        photo = self.photos.get(photo_id)
+        if photo is None or photo.vehicle_id is None:
+            return photo
+        self._mark_primary(photo.vehicle_id, photo_id)
+        return self.photos[photo_id]
+
+    def _mark_primary(self, vehicle_id: int, photo_id: int):
+        previous = self.primary_photos.get(vehicle_id)
+        if previous is not None and previous != photo_id:
+            self._set_primary_flag(previous, False)
+        self._set_primary_flag(photo_id, True)
+        self.primary_photos[vehicle_id] = photo_id
+
+    def _set_primary_flag(self, photo_id: int, is_primary: bool):
+        photo = self.photos[photo_id]
+        if photo.is_primary != is_primary:
+            self.photos[photo_id] = replace(photo, is_primary=is_primary)
+
+    def primary_photo(self, vehicle_id: int, fallback_to_first: bool = True) -> Optional[PhotoRecord]:
+        """The vehicle's primary photo, or its first photo when none is marked"""
+        photo_id = self.primary_photos.get(vehicle_id)
+        if photo_id is not None:
+            return self.photos[photo_id]
+        if fallback_to_first:
+            photo_ids = self.photos_by_vehicle.get(vehicle_id)
+            if photo_ids:
+                return self.photos[next(iter(photo_ids))]
+        return None
+
+    def vehicles_with_photos(self) -> int:
+        return len(self.photos_by_vehicle)
+
+    def primary_photo_count(self) -> int:
+        return len(self.primary_photos)
@@ -0,0 +1,322 @@
+"""
+Persistent Store for Autosell.mx
+Append-only write-ahead log plus compacted snapshots for the in-memory store
+"""
+
+import json
+import mmap
+import os
+import pickle
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from memory_store import InMemoryStore
+from records import PhotoRecord, VehicleRecord
+
+SNAPSHOT_FILE = "store.snapshot"
+WAL_FILE = "store.wal"
+# WAL records already captured by a snapshot that is still being written
+OLD_WAL_FILE = "store.wal.old"
+# Version 2: vehicles and photos are pickled as slotted records, not dicts
+SNAPSHOT_VERSION = 2
+
+# Log records written since the last snapshot before a new one is taken
+DEFAULT_SNAPSHOT_EVERY = 10000
+
+
+class PersistentStore(InMemoryStore):
+    """
+    InMemoryStore whose writes survive restarts.
+
+    Each write is appended to the WAL as one JSON line carrying a sequence
+    number, then applied in memory. Every snapshot_every records the write
+    that crosses the threshold copies the vehicle and photo maps (records are
+    never changed in place, so a shallow copy is enough) and moves the WAL
+    aside to store.wal.old; a worker thread then pickles the copy to a new
+    snapshot (written aside, then atomically renamed) and deletes the old WAL,
+    so requests never wait on pickling or fsync. Startup memory-maps the
+    snapshot, unpickles it and replays only WAL records newer than the
+    snapshot (old WAL first), so a crash at any point (including a torn last
+    line) loses at most the write in flight. With fsync=False lines are
+    flushed to the OS on every write, which survives a process crash but not
+    a power loss.
+    """
+
+    def __init__(self, data_dir: str, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY, fsync: bool = False):
+        super().__init__()
+        self.data_dir = data_dir
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.snapshot_path = os.path.join(data_dir, SNAPSHOT_FILE)
+        self.wal_path = os.path.join(data_dir, WAL_FILE)
+        self.old_wal_path = os.path.join(data_dir, OLD_WAL_FILE)
+        self._wal = None
+        self._seq = 0
+        self._records_since_snapshot = 0
+        self._snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-snapshot")
+        self._snapshot_future: Optional[Future] = None
+
+    # Startup and shutdown
+
+    def open(self) -> Dict[str, Any]:
+        """Load the snapshot, replay the WAL and start logging; returns load stats"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        snapshot_seq = self._load_snapshot()
+        # A snapshot that was still being written when the process stopped
+        replayed_old, _ = self._replay_wal(self.old_wal_path, snapshot_seq)
+        replayed, valid_bytes = self._replay_wal(self.wal_path, snapshot_seq)
+        replayed += replayed_old
+        # Never hand out an id that a stored record already has
+        self._next_vehicle_id = max(self._next_vehicle_id, max(self.vehicles, default=0) + 1)
+        self._next_photo_id = max(self._next_photo_id, max(self.photos, default=0) + 1)
+
+        self._wal = open(self.wal_path, "ab")
+        if self._wal.tell() != valid_bytes:
+            # Drop a torn last line so new records start on a clean line
+            self._wal.truncate(valid_bytes)
+        self._records_since_snapshot = replayed
+
+        return {
+            "vehicles": self.vehicle_count(),
+            "photos": self.photo_count(),
+            "snapshot_seq": snapshot_seq,
+            "replayed": replayed
+        }
+
+    def close(self, snapshot: bool = True):
+        if self._wal is None:
+            return
+        self.wait_for_snapshot()
+        if snapshot and (self._records_since_snapshot or os.path.exists(self.old_wal_path)):
+            self.snapshot()
+            error = self.wait_for_snapshot()
+            if error is not None:
+                print(f"⚠️ Store snapshot failed, the WAL will be replayed on startup: {error}")
+        self._wal.close()
+        self._wal = None
+
+    def _load_snapshot(self) -> int:
+        if not os.path.exists(self.snapshot_path) or os.path.getsize(self.snapshot_path) == 0:
+            return 0
+
+        with open(self.snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            state = pickle.loads(mapped)
+
+        if state.get("version") == 1:
+            state["vehicles"] = {key: VehicleRecord.from_dict(value) for key, value in state["vehicles"].items()}
+            state["photos"] = {key: PhotoRecord.from_dict(value) for key, value in state["photos"].items()}
+        elif state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {state.get('version')}")
+
+        self.vehicles = state["vehicles"]
+        self.photos = state["photos"]
+        self.photos_by_vehicle = state["photos_by_vehicle"]
+        self.primary_photos = state["primary_photos"]
+        self._next_vehicle_id = state["next_vehicle_id"]
+        self._next_photo_id = state["next_photo_id"]
+        self._seq = state["seq"]
+        return self._seq
+
+    def _replay_wal(self, path: str, snapshot_seq: int) -> Tuple[int, int]:
+        """Apply WAL records newer than the snapshot; returns (records applied, valid bytes)"""
+        if not os.path.exists(path):
+            return 0, 0
+
+        replayed = 0
+        valid_bytes = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash; everything after it is unusable
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_bytes += len(line)
+                if record["seq"] <= snapshot_seq:
+                    continue
+                self._apply(record)
+                self._seq = record["seq"]
+                replayed += 1
+        return replayed, valid_bytes
+
+    def _apply(self, record: Dict[str, Any]):
+        op = record["op"]
+        if op == "allocate_vehicle_id":
+            self._next_vehicle_id = max(self._next_vehicle_id, record["id"] + 1)
+        elif op == "allocate_photo_id":
+            self._next_photo_id = max(self._next_photo_id, record["id"] + 1)
+        elif op == "put_vehicle":
+            InMemoryStore.add_vehicle(self, VehicleRecord.from_dict(record["vehicle"]))
+        elif op == "delete_vehicle":
+            InMemoryStore.delete_vehicle(self, record["id"])
+        elif op == "clear_vehicles":
+            InMemoryStore.clear_vehicles(self)
+        elif op == "put_photo":
+            InMemoryStore.add_photo(self, PhotoRecord.from_dict(record["photo"]))
+        elif op == "delete_photo":
+            InMemoryStore.delete_photo(self, record["id"])
+        elif op == "set_primary_photo":
+            InMemoryStore.set_primary_photo(self, record["id"])
+        else:
+            raise ValueError(f"Unknown WAL operation: {op}")
+
+    # Logging
+
+    def _log(self, op: str, **fields):
+        if self._wal is None:
+            return
+        self._seq += 1
+        line = json.dumps({"seq": self._seq, "op": op, **fields}, ensure_ascii=False, default=str)
+        self._wal.write(line.encode("utf-8") + b"\n")
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+        self._records_since_snapshot += 1
+        if self._records_since_snapshot >= self.snapshot_every and not self.snapshot_in_progress():
+            self.snapshot()
+
+    def snapshot(self) -> Future:
+        """
+        Start writing the current state to a new snapshot in the background.
+
+        Only the copy of the maps and the WAL rotation happen here; pickling,
+        fsync and the rename run on the snapshot thread.
+        """
+        if self.snapshot_in_progress():
+            return self._snapshot_future
+        if self._snapshot_future is not None and self._snapshot_future.exception() is not None:
+            # The old WAL is kept and folded into this snapshot's rotation
+            print(f"⚠️ Previous store snapshot failed: {self._snapshot_future.exception()}")
+
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "seq": self._seq,
+            "vehicles": dict(self.vehicles),
+            "photos": dict(self.photos),
+            "next_vehicle_id": self._next_vehicle_id,
+            "next_photo_id": self._next_photo_id
+        }
+        self._rotate_wal()
+        self._records_since_snapshot = 0
+        self._snapshot_future = self._snapshot_executor.submit(self._write_snapshot, state)
+        return self._snapshot_future
+
+    def snapshot_in_progress(self) -> bool:
+        return self._snapshot_future is not None and not self._snapshot_future.done()
+
+    def wait_for_snapshot(self) -> Optional[BaseException]:
+        """Block until the snapshot being written (if any) is done; returns its error"""
+        if self._snapshot_future is None:
+            return None
+        return self._snapshot_future.exception()
+
+    def _rotate_wal(self):
+        """Move the records the new snapshot covers to the old WAL and start an empty one"""
+        if self._wal is None:
+            return
+        self._wal.close()
+        if os.path.exists(self.old_wal_path):
+            # An earlier snapshot failed; its records are still only in the old WAL
+            with open(self.old_wal_path, "ab") as old, open(self.wal_path, "rb") as current:
+                old.write(current.read())
+            os.remove(self.wal_path)
+        else:
+            os.replace(self.wal_path, self.old_wal_path)
+        self._wal = open(self.wal_path, "ab")
+
+    def _write_snapshot(self, state: Dict[str, Any]):
+        """Runs on the snapshot thread with a private copy of the maps"""
+        # The indexes follow from the photos (dict order is upload order)
+        photos_by_vehicle = {}
+        primary_photos = {}
+        for photo_id, photo in state["photos"].items():
+            if photo.vehicle_id is None:
+                continue
+            photos_by_vehicle.setdefault(photo.vehicle_id, {})[photo_id] = None
+            if photo.is_primary:
+                primary_photos[photo.vehicle_id] = photo_id
+        state["photos_by_vehicle"] = photos_by_vehicle
+        state["primary_photos"] = primary_photos
+
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+        # Records up to seq are in the snapshot; a crash before this remove
+        # is harmless because replay skips them by sequence number
+        if os.path.exists(self.old_wal_path):
+            os.remove(self.old_wal_path)
+
+    # Writes: applied in memory, then logged. Id allocations are logged too,
+    # so an id handed out before a crash is never handed out again
+
+    def allocate_vehicle_id(self) -> int:
+        vehicle_id = super().allocate_vehicle_id()
+        self._log("allocate_vehicle_id", id=vehicle_id)
+        return vehicle_id
+
+    def add_vehicle(self, vehicle: VehicleRecord) -> VehicleRecord:
+        vehicle = super().add_vehicle(vehicle)
+        self._log("put_vehicle", vehicle=vehicle.to_dict())
+        return vehicle
+
+    def update_vehicle(self, vehicle_id: int, data: Dict[str, Any]) -> Optional[VehicleRecord]:
+        updated = super().update_vehicle(vehicle_id, data)
+        if updated is not None:
+            self._log("put_vehicle", vehicle=updated.to_dict())
+        return updated
+
+    def delete_vehicle(self, vehicle_id: int) -> Tuple[Optional[VehicleRecord], int]:
+        vehicle, photos_removed = super().delete_vehicle(vehicle_id)
+        if vehicle is not None:
+            self._log("delete_vehicle", id=vehicle_id)
+        return vehicle, photos_removed
+
+    def clear_vehicles(self) -> int:
+        photos_removed = super().clear_vehicles()
+        self._log("clear_vehicles")
+        return photos_removed
+
+    def allocate_photo_id(self) -> int:
+        photo_id = super().allocate_photo_id()
+        self._log("allocate_photo_id", id=photo_id)
+        return photo_id
+
+    def add_photo(self, photo: PhotoRecord) -> PhotoRecord:
+        photo = super().add_photo(photo)
+        self._log("put_photo", photo=photo.to_dict())
+        return photo
+
+    def update_photo(self, photo_id: int, data: Dict[str, Any]) -> Optional[PhotoRecord]:
+        updated = super().update_photo(photo_id, data)
+        if updated is not None:
+            self._log("put_photo", photo=updated.to_dict())
+        return updated
+
+    def delete_photo(self, photo_id: int) -> Optional[PhotoRecord]:
+        photo = super().delete_photo(photo_id)
+        if photo is not None:
+            self._log("delete_photo", id=photo_id)
+        return photo
+
+    def set_primary_photo(self, photo_id: int) -> Optional[PhotoRecord]:
+        photo = super().set_primary_photo(photo_id)
+        if photo is not None and photo.vehicle_id is not None:
+            self._log("set_primary_photo", id=photo_id)
+        return photo
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "data_dir": self.data_dir,
+            "seq": self._seq,
+            "records_since_snapshot": self._records_since_snapshot,
+            "snapshot_in_progress": self.snapshot_in_progress(),
+            "wal_bytes": os.path.getsize(self.wal_path) if os.path.exists(self.wal_path) else 0,
+            "snapshot_bytes": os.path.getsize(self.snapshot_path) if os.path.exists(self.snapshot_path) else 0
+        }
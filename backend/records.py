@@ -0,0 +1,125 @@
+"""
+Records for Autosell.mx
+Slotted vehicle and photo records for the in-memory store
+"""
+
+from dataclasses import dataclass, fields
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Optional, Union
+
+
+@dataclass(slots=True)
+class VehicleRecord:
+    """One vehicle; fields outside the known set are kept in extra"""
+
+    id: int
+    marca: str = "Unknown"
+    modelo: str = "Unknown"
+    año: Any = 2024
+    precio: Any = 0
+    estatus: str = "disponible"
+    color: str = ""
+    kilometraje: Any = ""
+    ubicacion: str = ""
+    descripcion: str = ""
+    external_id: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_payload(cls, vehicle_id: int, data: Dict[str, Any]) -> "VehicleRecord":
+        """Build a new vehicle from a create request (Spanish or English field names)"""
+        values = {}
+        for field_name, keys in VEHICLE_PAYLOAD_KEYS:
+            for key in keys:
+                if key in data:
+                    values[field_name] = data[key]
+                    break
+        if "precio" in values:
+            values["precio"] = parse_price(values["precio"])
+        # An explicit "external_id": null means the vehicle has none
+        values.setdefault("external_id", f"GS_{vehicle_id}")
+        return cls(id=vehicle_id, **values)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VehicleRecord":
+        return _from_dict(cls, data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return _to_dict(self)
+
+
+@dataclass(slots=True)
+class PhotoRecord:
+    """One photo; fields outside the known set are kept in extra"""
+
+    id: int
+    vehicle_id: Optional[int]
+    filename: str
+    drive_file_id: str = ""
+    drive_url: str = ""
+    file_size: int = 0
+    mime_type: str = "image/jpeg"
+    uploaded_at: str = ""
+    file_path: Optional[str] = None
+    md5_checksum: Optional[str] = None
+    content_hash: Optional[str] = None
+    is_primary: bool = False
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PhotoRecord":
+        return _from_dict(cls, data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return _to_dict(self)
+
+
+# Vehicle field -> accepted create-request keys, in priority order
+VEHICLE_PAYLOAD_KEYS = (
+    ("marca", ("marca", "make")),
+    ("modelo", ("modelo", "model")),
+    ("año", ("año", "year")),
+    ("precio", ("precio", "price")),
+    ("estatus", ("estatus", "status")),
+    ("color", ("color",)),
+    ("kilometraje", ("kilometraje",)),
+    ("ubicacion", ("ubicacion",)),
+    ("descripcion", ("descripcion", "description")),
+    ("external_id", ("external_id",))
+)
+
+
+
+def parse_price(value: Any) -> Union[int, float]:
+    """A price as a number; accepts strings like "250000", "$250,000.50" and treats blanks as 0"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    text = str(value or "").replace("$", "").replace(",", "").strip()
+    try:
+        price = Decimal(text or "0")
+    except InvalidOperation:
+        raise ValueError(f"Invalid price: {value!r}")
+    if not price.is_finite():
+        raise ValueError(f"Invalid price: {value!r}")
+    return int(price) if price == price.to_integral_value() else float(price)
+
+
+_FIELD_NAMES = {
+    record_type: tuple(field.name for field in fields(record_type) if field.name != "extra")
+    for record_type in (VehicleRecord, PhotoRecord)
+}
+
+
+def _from_dict(record_type, data: Dict[str, Any]):
+    names = _FIELD_NAMES[record_type]
+    known = {key: value for key, value in data.items() if key in names}
+    extra = {key: value for key, value in data.items() if key not in names}
+    return record_type(**known, extra=extra or None)
+
+
+def _to_dict(record) -> Dict[str, Any]:
+    """Plain dict for responses and the WAL; extra fields are flattened in"""
+    data = {name: getattr(record, name) for name in _FIELD_NAMES[type(record)]}
+    if record.extra:
+        data.update(record.extra)
+    return data
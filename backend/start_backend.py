@@ -16,6 +16,16 @@ import os
 import requests
 from datetime import datetime, timedelta
 import time
+import hashlib
+from collections import Counter
+from functools import lru_cache
+from html import escape
+from fastapi.responses import Response, StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
+import itertools
+from persistent_store import PersistentStore
+from records import PhotoRecord, VehicleRecord
 
 # Add Facebook configuration
 try:
@@ -32,15 +42,17 @@ except ImportError:
 # Load environment variables
 load_dotenv()
 
-# In-memory storage (for development)
-vehicles_db: List[Dict[str, Any]] = []
-photos_db: List[Dict[str, Any]] = []
-vehicle_counter = 1
-photo_counter = 1
+# In-memory storage (for development), persisted to a WAL and snapshots so
+# restarts keep every vehicle and photo without an external database
+STORE_DATA_DIR = os.getenv("STORE_DATA_DIR", "data")
+store = PersistentStore(
+    STORE_DATA_DIR,
+    snapshot_every=int(os.getenv("STORE_SNAPSHOT_EVERY", "10000")),
+    fsync=os.getenv("STORE_FSYNC", "false").lower() == "true"
+)
 
 # Create some sample photos for testing
 def create_sample_photos():
-    global photos_db, photo_counter
     sample_photos = [
         {
             "id": 1,
@@ -73,19 +85,197 @@ def create_sample_photos():
             "uploaded_at": "2024-01-01T00:00:00Z"
         }
     ]
-    photos_db.extend(sample_photos)
-    photo_counter = len(sample_photos)
+    for photo in sample_photos:
+        store.add_photo(PhotoRecord.from_dict(photo))
 
 # Initialize sample data
 # create_sample_photos()  # Disabled to avoid sample data
 
+# Image response helpers
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+@lru_cache(maxsize=1024)
+def render_placeholder_svg(title: str, subtitle: str = "", fill: str = "#f3f4f6", text_color: str = "#9ca3af") -> bytes:
+    """Render a placeholder SVG once per distinct title/subtitle"""
+    subtitle_text = ""
+    if subtitle:
+        subtitle_text = f'''
+    <text x="150" y="120" text-anchor="middle" fill="{text_color}" font-family="Arial, sans-serif" font-size="12">{escape(subtitle)}</text>'''
+    return f'''<svg width="300" height="200" xmlns="http://www.w3.org/2000/svg">
+    <rect width="300" height="200" fill="{fill}"/>
+    <text x="150" y="100" text-anchor="middle" fill="{text_color}" font-family="Arial, sans-serif" font-size="14">{escape(title)}</text>{subtitle_text}
+</svg>'''.encode("utf-8")
+
+def placeholder_response(title: str, subtitle: str = "", fill: str = "#f3f4f6", text_color: str = "#9ca3af") -> Response:
+    """Serve a cached placeholder SVG"""
+    content = render_placeholder_svg(title, subtitle, fill, text_color)
+    return Response(
+        content=content,
+        media_type="image/svg+xml",
+        headers={"Cache-Control": "no-cache", "ETag": f'"{hashlib.md5(content).hexdigest()}"'}
+    )
+
+def photo_image_url(photo: PhotoRecord) -> str:
+    """Content-addressed image URL for a photo (immutable when the version is known)"""
+    version = photo.md5_checksum or photo.content_hash
+    url = f"/photos/image/{photo.id}"
+    return f"{url}?v={version}" if version else url
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+def parse_byte_range(range_header: str, size: int):
+    """
+    Parse a single-range "bytes=" header into (start, end) inclusive.
+    Returns None to serve the full body (absent, malformed or multi-range)
+    and raises ValueError when the range can't be satisfied.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+
+    start_text, separator, end_text = range_header[len("bytes="):].strip().partition("-")
+    if not separator:
+        return None
+
+    try:
+        start = int(start_text) if start_text else None
+        end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # Suffix range: the last N bytes
+        if end is None or end == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - end, 0), size - 1
+
+    if end is None:
+        end = size - 1
+    if start > end:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+def image_response(request: Request, load_content, etag: str, media_type: str, immutable: bool) -> Response:
+    """
+    Build an image response honouring If-None-Match, Range/If-Range and
+    content-addressed caching. load_content is only called when a body is needed.
+    """
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    content = load_content()
+    size = len(content)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_byte_range(range_header, size)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        return Response(content=content, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=content[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+# Server-Sent Events, same event types and payloads as the main API's /events
+EVENT_CLIENT_BUFFER_SIZE = 100
+EVENT_KEEPALIVE_SECONDS = 15
+EVENT_RETRY_MILLISECONDS = 5000
+STATS_DEBOUNCE_SECONDS = 2.0
+
+class EventClient:
+    """One /events connection; a slow client loses its oldest messages and is told to resync"""
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=EVENT_CLIENT_BUFFER_SIZE)
+        self.lagged = False
+        self.dropped = 0
+
+    def put(self, message: Dict[str, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.lagged = True
+        self.queue.put_nowait(message)
+
+event_clients = set()
+event_ids = itertools.count(1)
+stats_task = None
+
+def encode_event(event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": next(event_ids), "event": event_type, "data": json.dumps(payload, ensure_ascii=False, default=str)}
+
+def broadcast_event(event_type: str, payload: Dict[str, Any]):
+    message = encode_event(event_type, payload)
+    for client in list(event_clients):
+        client.put(message)
+
+def publish_event(event_type: str, payload: Dict[str, Any]):
+    """Send an inventory change to every client and schedule one debounced stats message"""
+    global stats_task
+    if not event_clients:
+        return
+    broadcast_event(event_type, payload)
+    if stats_task is None or stats_task.done():
+        stats_task = asyncio.get_running_loop().create_task(publish_stats())
+
+async def publish_stats():
+    await asyncio.sleep(STATS_DEBOUNCE_SECONDS)
+    if event_clients:
+        broadcast_event("dashboard.stats", await get_dashboard_stats())
+
+def publish_vehicle_update(vehicle_id: int, before: Dict[str, Any], after: Dict[str, Any]):
+    changes = {key: value for key, value in after.items() if before.get(key) != value}
+    if not changes:
+        return
+    publish_event("vehicle.updated", {"vehicle_id": vehicle_id, "changes": changes})
+    if "estatus" in changes:
+        publish_event("vehicle.status_changed", {
+            "vehicle_id": vehicle_id, "old_status": before.get("estatus"), "new_status": changes["estatus"]
+        })
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Restore the store on startup and snapshot it on shutdown"""
+    started = time.perf_counter()
+    loaded = store.open()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"💾 Restored {loaded['vehicles']} vehicles and {loaded['photos']} photos "
+          f"from {STORE_DATA_DIR} in {elapsed_ms:.1f} ms ({loaded['replayed']} log records replayed)")
+    yield
+    store.close()
+    print("💾 Store snapshot written")
+
 # Create FastAPI application
 app = FastAPI(
     title="Autosell.mx API",
     description="Vehicle Management System",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -123,31 +313,85 @@ async def root():
 @app.get("/vehicles/")
 async def get_vehicles(skip: int = 0, limit: int = 12, search: str = "", marca: str = "", modelo: str = "", año: str = "", estatus: str = "", precio_min: str = "", precio_max: str = ""):
     """Get all vehicles with filters and pagination"""
+    total = store.vehicle_count()
     return {
-        "vehicles": vehicles_db[skip:skip+limit],
-        "total": len(vehicles_db),
+        "vehicles": [vehicle.to_dict() for vehicle in store.list_vehicles(skip, limit)],
+        "total": total,
         "skip": skip,
         "limit": limit,
-        "message": f"Found {len(vehicles_db)} vehicles" if vehicles_db else "No vehicles found"
+        "message": f"Found {total} vehicles" if total else "No vehicles found"
+    }
+
+# Gallery endpoint: vehicle cards with their primary photo in one request
+@app.get("/vehicles/gallery")
+async def get_vehicle_gallery(skip: int = 0, limit: int = 12):
+    """Get a page of vehicles with photo count and primary photo URL"""
+    gallery = []
+    for vehicle in store.list_vehicles(skip, limit):
+        primary_photo = store.primary_photo(vehicle.id)
+        gallery.append({
+            **vehicle.to_dict(),
+            "photo_count": store.vehicle_photo_count(vehicle.id),
+            "primary_photo_id": primary_photo.id if primary_photo else None,
+            "primary_photo_url": photo_image_url(primary_photo) if primary_photo else None
+        })
+    
+    return {
+        "vehicles": gallery,
+        "total": store.vehicle_count(),
+        "skip": skip,
+        "limit": limit
     }
 
+# Live updates: vehicle and photo changes plus debounced dashboard stats
+@app.get("/events")
+async def stream_events(request: Request):
+    """Server-Sent Events stream of inventory changes and dashboard stats"""
+    client = EventClient()
+    event_clients.add(client)
+
+    async def stream():
+        try:
+            yield f"retry: {EVENT_RETRY_MILLISECONDS}\n\n"
+            # Current totals first, so a new client needs no initial fetch
+            client.put(encode_event("dashboard.stats", await get_dashboard_stats()))
+
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(client.queue.get(), EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if client.lagged:
+                    client.lagged = False
+                    yield f"event: resync\ndata: {json.dumps({'dropped': client.dropped})}\n\n"
+
+                yield f"id: {message['id']}\nevent: {message['event']}\ndata: {message['data']}\n\n"
+        finally:
+            event_clients.discard(client)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
+    )
+
 # Photos endpoint
 @app.get("/photos")
 @app.get("/photos/")
 async def get_photos(vehicle_id: int = None, skip: int = 0, limit: int = 12):
     """Get all photos with filters"""
-    global photos_db
-    
     if vehicle_id:
-        filtered_photos = [photo for photo in photos_db if photo.get("vehicle_id") == vehicle_id]
+        filtered_photos = store.vehicle_photos(vehicle_id)
+        total_photos = len(filtered_photos)
+        paginated_photos = filtered_photos[skip:skip + limit]
     else:
-        filtered_photos = photos_db
-    
-    total_photos = len(filtered_photos)
-    paginated_photos = filtered_photos[skip:skip + limit]
+        total_photos = store.photo_count()
+        paginated_photos = store.list_photos(skip, limit)
     
     return {
-        "photos": paginated_photos,
+        "photos": [photo.to_dict() for photo in paginated_photos],
         "total": total_photos,
         "skip": skip,
         "limit": limit,
@@ -158,8 +402,6 @@ async def get_photos(vehicle_id: int = None, skip: int = 0, limit: int = 12):
 @app.post("/photos/upload/{vehicle_id}")
 async def upload_photo(vehicle_id: int, request: Request):
     """Upload photo for vehicle"""
-    global photo_counter, photos_db
-    
     try:
         # Parse multipart form data
         form = await request.form()
@@ -171,8 +413,8 @@ async def upload_photo(vehicle_id: int, request: Request):
         uploaded_photos = []
         
         # Get vehicle info for folder naming
-        vehicle = next((v for v in vehicles_db if v.get('id') == vehicle_id), None)
-        vehicle_name = f"{vehicle.get('marca', 'Unknown')}_{vehicle.get('modelo', 'Unknown')}" if vehicle else f"Vehicle_{vehicle_id}"
+        vehicle = store.get_vehicle(vehicle_id)
+        vehicle_name = f"{vehicle.marca}_{vehicle.modelo}" if vehicle else f"Vehicle_{vehicle_id}"
         
         # Enable Google Drive integration with working credentials
         use_google_drive = True
@@ -186,7 +428,7 @@ async def upload_photo(vehicle_id: int, request: Request):
                 for file in files:
                     content = await file.read()
                     photos_for_drive.append({
-                        'filename': file.filename or f"photo_{photo_counter + 1}.jpg",
+                        'filename': file.filename or f"photo_{len(photos_for_drive) + 1}.jpg",
                         'content': content
                     })
                 
@@ -205,32 +447,34 @@ async def upload_photo(vehicle_id: int, request: Request):
         if use_google_drive:
             # Create photo records with Google Drive info
             for i, file in enumerate(files):
-                photo_counter += 1
-                photo_id = photo_counter
+                photo_id = store.allocate_photo_id()
                 filename = file.filename or f"photo_{photo_id}.jpg"
                 
                 # Use Google Drive info if available, otherwise use placeholder
                 drive_photo = drive_photos[i] if i < len(drive_photos) else None
                 
-                photo = {
-                    "id": photo_id,
-                    "vehicle_id": vehicle_id,
-                    "filename": filename,
-                    "drive_file_id": drive_photo['drive_file_id'] if drive_photo else f"drive_{photo_id}",
-                    "drive_url": drive_photo['drive_url'] if drive_photo else f"https://drive.google.com/file/d/drive_{photo_id}/view",
-                    "file_size": len(await file.read()) if hasattr(file, 'read') else 0,
-                    "mime_type": file.content_type or "image/jpeg",
-                    "uploaded_at": "2024-01-01T00:00:00Z"
-                }
+                content = photos_for_drive[i]['content']
                 
-                photos_db.append(photo)
-                uploaded_photos.append(photo)
+                photo = PhotoRecord(
+                    id=photo_id,
+                    vehicle_id=vehicle_id,
+                    filename=filename,
+                    drive_file_id=drive_photo['drive_file_id'] if drive_photo else f"drive_{photo_id}",
+                    drive_url=drive_photo['drive_url'] if drive_photo else f"https://drive.google.com/file/d/drive_{photo_id}/view",
+                    file_size=len(content),
+                    mime_type=file.content_type or "image/jpeg",
+                    md5_checksum=hashlib.md5(content).hexdigest(),
+                    uploaded_at="2024-01-01T00:00:00Z"
+                )
+                
+                store.add_photo(photo)
+                uploaded_photos.append(photo.to_dict())
+                publish_event("photo.created", {"photo_id": photo.id, "vehicle_id": vehicle_id, "data": photo.to_dict()})
         else:
             print(f"📁 Google Drive not available, using local storage for vehicle {vehicle_id}")
             # Fallback to local storage
             for file in files:
-                photo_counter += 1
-                photo_id = photo_counter
+                photo_id = store.allocate_photo_id()
                 
                 # Get file info
                 filename = file.filename or f"photo_{photo_id}.jpg"
@@ -247,20 +491,22 @@ async def upload_photo(vehicle_id: int, request: Request):
                     f.write(content)
                 
                 # Create photo record
-                photo = {
-                    "id": photo_id,
-                    "vehicle_id": vehicle_id,
-                    "filename": filename,
-                    "drive_file_id": f"local_{photo_id}",
-                    "drive_url": f"http://localhost:8000/photos/image/{photo_id}",
-                    "file_path": file_path,  # Store the actual file path
-                    "file_size": file_size,
-                    "mime_type": file.content_type or "image/jpeg",
-                    "uploaded_at": "2024-01-01T00:00:00Z"
-                }
+                photo = PhotoRecord(
+                    id=photo_id,
+                    vehicle_id=vehicle_id,
+                    filename=filename,
+                    drive_file_id=f"local_{photo_id}",
+                    drive_url=f"http://localhost:8000/photos/image/{photo_id}",
+                    file_path=file_path,  # Store the actual file path
+                    file_size=file_size,
+                    mime_type=file.content_type or "image/jpeg",
+                    content_hash=hashlib.sha256(content).hexdigest(),
+                    uploaded_at="2024-01-01T00:00:00Z"
+                )
                 
-                photos_db.append(photo)
-                uploaded_photos.append(photo)
+                store.add_photo(photo)
+                uploaded_photos.append(photo.to_dict())
+                publish_event("photo.created", {"photo_id": photo.id, "vehicle_id": vehicle_id, "data": photo.to_dict()})
         
         return {
             "photos": uploaded_photos,
@@ -274,112 +520,81 @@ async def upload_photo(vehicle_id: int, request: Request):
 
 # Serve photo images
 @app.get("/photos/image/{photo_id}")
-async def serve_photo(photo_id: int):
-    """Serve photo image"""
-    global photos_db
-    
+async def serve_photo(photo_id: int, request: Request, v: str = None):
+    """Serve photo image (supports ETag, Range and immutable content-addressed URLs via ?v=)"""
     # Find the photo
-    photo = next((p for p in photos_db if p.get("id") == photo_id), None)
+    photo = store.get_photo(photo_id)
     if not photo:
         return {"error": "Photo not found"}
     
+    mime_type = photo.mime_type or 'image/jpeg'
+    
     # Check if it's a Google Drive photo
-    drive_file_id = photo.get('drive_file_id', '')
+    drive_file_id = photo.drive_file_id
     if drive_file_id and not drive_file_id.startswith('local_'):
         # This is a Google Drive photo, download and serve it
         try:
-            from google_drive_service import get_drive_service
             drive_service = get_drive_service()
             if drive_service and drive_service.service:
-                # Download the image from Google Drive
-                request = drive_service.service.files().get_media(fileId=drive_file_id)
-                image_data = request.execute()
+                def download_image():
+                    return drive_service.service.files().get_media(fileId=drive_file_id).execute()
+                
+                # Use Drive's md5 as the ETag so revalidation skips the download
+                if not photo.md5_checksum:
+                    metadata = drive_service.service.files().get(
+                        fileId=drive_file_id,
+                        fields='md5Checksum'
+                    ).execute()
+                    if metadata.get('md5Checksum'):
+                        photo = store.update_photo(photo_id, {"md5_checksum": metadata['md5Checksum']})
+                
+                load_content = download_image
+                if not photo.md5_checksum:
+                    image_data = download_image()
+                    photo = store.update_photo(photo_id, {"md5_checksum": hashlib.md5(image_data).hexdigest()})
+                    load_content = lambda: image_data
                 
-                # Return the image data with proper headers
-                from fastapi.responses import Response
-                mime_type = photo.get('mime_type', 'image/jpeg')
-                return Response(content=image_data, media_type=mime_type)
+                version = photo.md5_checksum
+                return image_response(request, load_content, f'"{version}"', mime_type, immutable=v == version)
             else:
                 # Fallback to SVG placeholder if service not available
-                filename = photo.get('filename', 'Image')
-                svg_content = f"""
-                <svg width="300" height="200" xmlns="http://www.w3.org/2000/svg">
-                    <rect width="300" height="200" fill="#f3f4f6"/>
-                    <text x="150" y="100" text-anchor="middle" fill="#9ca3af" font-family="Arial, sans-serif" font-size="14">
-                        Drive service not available
-                    </text>
-                </svg>
-                """
-                from fastapi.responses import Response
-                return Response(content=svg_content, media_type="image/svg+xml")
+                return placeholder_response("Drive service not available")
         except Exception as e:
             print(f"Error serving Google Drive photo: {e}")
             # Fallback to SVG placeholder
-            filename = photo.get('filename', 'Image')
-            svg_content = f"""
-            <svg width="300" height="200" xmlns="http://www.w3.org/2000/svg">
-                <rect width="300" height="200" fill="#f3f4f6"/>
-                <text x="150" y="100" text-anchor="middle" fill="#9ca3af" font-family="Arial, sans-serif" font-size="14">
-                    Error loading image
-                </text>
-            </svg>
-            """
-            from fastapi.responses import Response
-            return Response(content=svg_content, media_type="image/svg+xml")
+            return placeholder_response("Error loading image")
     
     # Serve local photo file
-    file_path = photo.get('file_path')
+    file_path = photo.file_path
     if file_path and os.path.exists(file_path):
-        from fastapi.responses import FileResponse
-        mime_type = photo.get('mime_type', 'image/jpeg')
-        return FileResponse(file_path, media_type=mime_type)
+        def read_file():
+            with open(file_path, "rb") as f:
+                return f.read()
+        
+        if not photo.content_hash:
+            photo = store.update_photo(photo_id, {"content_hash": hashlib.sha256(read_file()).hexdigest()})
+        
+        version = photo.content_hash
+        return image_response(request, read_file, f'"{version}"', mime_type, immutable=v == version)
     
     # Fallback to SVG placeholder if file doesn't exist
-    filename = photo.get('filename', 'Image')
-    svg_content = f"""
-    <svg width="300" height="200" xmlns="http://www.w3.org/2000/svg">
-        <rect width="300" height="200" fill="#4f46e5"/>
-        <text x="150" y="100" text-anchor="middle" fill="white" font-family="Arial, sans-serif" font-size="14">
-            {filename}
-        </text>
-        <text x="150" y="120" text-anchor="middle" fill="white" font-family="Arial, sans-serif" font-size="12">
-            Photo ID: {photo_id}
-        </text>
-    </svg>
-    """
-    
-    from fastapi.responses import Response
-    return Response(content=svg_content, media_type="image/svg+xml")
+    filename = photo.filename or 'Image'
+    return placeholder_response(filename, f"Photo ID: {photo_id}", fill="#4f46e5", text_color="white")
 
 # Primary photo endpoint for vehicles
 @app.get("/vehicles/{vehicle_id}/primary-photo")
 async def get_vehicle_primary_photo(vehicle_id: int):
     """Get primary photo for a vehicle"""
-    global photos_db
-    
-    # Find the primary photo for this vehicle
-    primary_photo = next((p for p in photos_db if p.get("vehicle_id") == vehicle_id and p.get("is_primary", False)), None)
-    
-    if not primary_photo:
-        # If no primary photo, get the first photo for this vehicle
-        primary_photo = next((p for p in photos_db if p.get("vehicle_id") == vehicle_id), None)
+    # Primary photo for this vehicle, or its first photo if none is marked
+    primary_photo = store.primary_photo(vehicle_id)
     
     if not primary_photo:
         # Return placeholder if no photos
-        from fastapi.responses import Response
-        svg_content = f"""
-        <svg width="300" height="200" xmlns="http://www.w3.org/2000/svg">
-            <rect width="300" height="200" fill="#f3f4f6"/>
-            <text x="150" y="100" text-anchor="middle" fill="#9ca3af" font-family="Arial, sans-serif" font-size="14">
-                No photos available
-            </text>
-        </svg>
-        """
-        return Response(content=svg_content, media_type="image/svg+xml")
+        return placeholder_response("No photos available")
     
     # Redirect to the photo image endpoint
     from fastapi.responses import RedirectResponse
-    return RedirectResponse(url=f"/photos/image/{primary_photo['id']}")
+    return RedirectResponse(url=photo_image_url(primary_photo))
 
 # Photo stats endpoint
 @app.get("/photos/stats/overview")
@@ -449,20 +664,22 @@ async def get_dashboard():
 async def get_dashboard_stats():
     """Get dashboard statistics"""
     # Calculate actual statistics from vehicles database
-    total_vehicles = len(vehicles_db)
-    available_vehicles = len([v for v in vehicles_db if v.get('estatus', '').lower() == 'disponible'])
-    sold_vehicles = len([v for v in vehicles_db if v.get('estatus', '').lower() == 'vendido'])
-    reserved_vehicles = len([v for v in vehicles_db if v.get('estatus', '').lower() == 'reservado'])
-    unavailable_vehicles = len([v for v in vehicles_db if v.get('estatus', '').lower() == 'no disponible'])
+    vehicles = store.vehicles.values()
+    total_vehicles = store.vehicle_count()
+    statuses = Counter((v.estatus or '').lower() for v in vehicles)
+    available_vehicles = statuses['disponible']
+    sold_vehicles = statuses['vendido']
+    reserved_vehicles = statuses['reservado']
+    unavailable_vehicles = statuses['no disponible']
     
     # Calculate financial statistics
-    prices = [v.get('precio', 0) for v in vehicles_db if v.get('precio', 0) is not None and v.get('precio', 0) > 0]
+    prices = [v.precio for v in vehicles if v.precio is not None and v.precio > 0]
     average_price = sum(prices) / len(prices) if prices else 0
     total_value = sum(prices)
     
-    # Calculate photo statistics
-    total_photos = len(photos_db)
-    vehicles_with_photos = len(set(p.get('vehicle_id') for p in photos_db))
+    # Photo statistics come straight from the store's indexes
+    total_photos = store.photo_count()
+    vehicles_with_photos = store.vehicles_with_photos()
     
     return {
         "total_vehicles": total_vehicles,
@@ -478,7 +695,7 @@ async def get_dashboard_stats():
         "total_photos": total_photos,
         "photos_change": 0,  # Could be calculated from historical data
         "vehicles_with_photos": vehicles_with_photos,
-        "primary_photos": 0  # Could be calculated from photos with is_primary=True
+        "primary_photos": store.primary_photo_count()
     }
 
 # Configuration endpoint
@@ -494,10 +711,8 @@ async def get_config():
 @app.get("/vehicles/{vehicle_id}")
 async def get_vehicle(vehicle_id: int):
     """Get a specific vehicle"""
-    global vehicles_db
-    
     # Find the vehicle in the database
-    vehicle = next((v for v in vehicles_db if v.get("id") == vehicle_id), None)
+    vehicle = store.get_vehicle(vehicle_id)
     
     if not vehicle:
         return {
@@ -509,14 +724,15 @@ async def get_vehicle(vehicle_id: int):
             "message": "Vehicle not found"
         }
     
-    return vehicle
+    return vehicle.to_dict()
 
 @app.get("/photos/vehicle/{vehicle_id}")
 async def get_vehicle_photos(vehicle_id: int):
     """Get photos for a specific vehicle"""
-    global photos_db
-    
-    vehicle_photos = [photo for photo in photos_db if photo.get("vehicle_id") == vehicle_id]
+    vehicle_photos = [
+        {**photo.to_dict(), "image_url": photo_image_url(photo)}
+        for photo in store.vehicle_photos(vehicle_id)
+    ]
     
     return {
         "photos": vehicle_photos,
@@ -551,14 +767,14 @@ async def search_vehicles(query: str):
     filtered_vehicles = []
     query_lower = query.lower()
     
-    for vehicle in vehicles_db:
+    for vehicle in store.vehicles.values():
         # Search in marca, modelo, año, color, descripcion
-        if (query_lower in str(vehicle.get('marca', '')).lower() or
-            query_lower in str(vehicle.get('modelo', '')).lower() or
-            query_lower in str(vehicle.get('año', '')).lower() or
-            query_lower in str(vehicle.get('color', '')).lower() or
-            query_lower in str(vehicle.get('descripcion', '')).lower()):
-            filtered_vehicles.append(vehicle)
+        if (query_lower in str(vehicle.marca).lower() or
+            query_lower in str(vehicle.modelo).lower() or
+            query_lower in str(vehicle.año).lower() or
+            query_lower in str(vehicle.color).lower() or
+            query_lower in str(vehicle.descripcion).lower()):
+            filtered_vehicles.append(vehicle.to_dict())
     
     return {
         "vehicles": filtered_vehicles,
@@ -586,15 +802,20 @@ async def get_detailed_health():
         "version": "1.0.0",
         "database": "connected",
         "storage": "ready",
+        "store": store.get_stats(),
         "timestamp": "2024-01-01T00:00:00Z"
     }
 
 # POST endpoints that frontend might call
+def vehicle_from_payload(data: Dict[str, Any]) -> VehicleRecord:
+    try:
+        return VehicleRecord.from_payload(store.allocate_vehicle_id(), data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/vehicles/")
 async def create_vehicle(request: Request):
     """Create a new vehicle or multiple vehicles"""
-    global vehicle_counter
-    
     # Get the request body
     vehicle_data = await request.json()
     
@@ -602,25 +823,13 @@ async def create_vehicle(request: Request):
     if isinstance(vehicle_data, list):
         # Multiple vehicles from N8N
         created_vehicles = []
-        for data in vehicle_data:
-            vehicle = {
-                "id": vehicle_counter,
-                "marca": data.get("marca", data.get("make", "Unknown")),
-                "modelo": data.get("modelo", data.get("model", "Unknown")),
-                "año": data.get("año", data.get("year", 2024)),
-                "precio": data.get("precio", data.get("price", 0)),
-                "estatus": data.get("estatus", data.get("status", "disponible")),
-                "color": data.get("color", ""),
-                "kilometraje": data.get("kilometraje", ""),
-                "ubicacion": data.get("ubicacion", ""),
-                "descripcion": data.get("descripcion", data.get("description", "")),
-                "external_id": data.get("external_id", f"GS_{vehicle_counter}")
-            }
-            
+        # Validate the whole batch before storing any of it
+        vehicles = [vehicle_from_payload(data) for data in vehicle_data]
+        for vehicle in vehicles:
             # Store in database
-            vehicles_db.append(vehicle)
-            created_vehicles.append(vehicle)
-            vehicle_counter += 1
+            store.add_vehicle(vehicle)
+            created_vehicles.append(vehicle.to_dict())
+            publish_event("vehicle.created", {"vehicle_id": vehicle.id, "data": vehicle.to_dict()})
         
         return {
             "vehicles": created_vehicles,
@@ -629,47 +838,30 @@ async def create_vehicle(request: Request):
         }
     else:
         # Single vehicle
-        vehicle = {
-            "id": vehicle_counter,
-            "marca": vehicle_data.get("marca", vehicle_data.get("make", "Unknown")),
-            "modelo": vehicle_data.get("modelo", vehicle_data.get("model", "Unknown")),
-            "año": vehicle_data.get("año", vehicle_data.get("year", 2024)),
-            "precio": vehicle_data.get("precio", vehicle_data.get("price", 0)),
-            "estatus": vehicle_data.get("estatus", vehicle_data.get("status", "disponible")),
-            "color": vehicle_data.get("color", ""),
-            "kilometraje": vehicle_data.get("kilometraje", ""),
-            "ubicacion": vehicle_data.get("ubicacion", ""),
-            "descripcion": vehicle_data.get("descripcion", vehicle_data.get("description", "")),
-            "external_id": vehicle_data.get("external_id", f"GS_{vehicle_counter}")
-        }
+        vehicle = vehicle_from_payload(vehicle_data)
         
         # Store in database
-        vehicles_db.append(vehicle)
-        vehicle_counter += 1
+        store.add_vehicle(vehicle)
+        publish_event("vehicle.created", {"vehicle_id": vehicle.id, "data": vehicle.to_dict()})
         
         return {
-            "id": vehicle["id"],
+            "id": vehicle.id,
         "message": "Vehicle created successfully",
-        "vehicle": vehicle
-    }
-
-@app.put("/vehicles/{vehicle_id}")
-async def update_vehicle(vehicle_id: int):
-    """Update a vehicle"""
-    return {
-        "id": vehicle_id,
-        "message": "Vehicle update not implemented yet"
+        "vehicle": vehicle.to_dict()
     }
 
 @app.delete("/vehicles/clear")
 async def clear_all_vehicles():
     """Clear all vehicles from database"""
     try:
-        # Clear all vehicles from the database
-        vehicles_db.clear()
+        # Clear all vehicles (and their photos) from the database
+        photos_removed = store.clear_vehicles()
+        publish_event("inventory.bulk_changed", {"entity": "vehicle", "action": "deleted"})
+        publish_event("inventory.bulk_changed", {"entity": "photo", "action": "deleted"})
         return {
             "message": "All vehicles cleared successfully",
-            "count": 0
+            "count": 0,
+            "photos_removed": photos_removed
         }
     except Exception as e:
         return {
@@ -680,41 +872,28 @@ async def clear_all_vehicles():
 @app.put("/vehicles/{vehicle_id}")
 async def update_vehicle(vehicle_id: int, vehicle_data: dict):
     """Update a vehicle"""
-    global vehicles_db
-    
     try:
         print(f"🔄 Updating vehicle {vehicle_id}")
-        print(f"📊 Current vehicles count: {len(vehicles_db)}")
         
-        # Find the vehicle
-        vehicle_index = None
-        for i, vehicle in enumerate(vehicles_db):
-            if vehicle.get('id') == vehicle_id:
-                vehicle_index = i
-                break
+        # Update the vehicle with new data (the ID never changes)
+        existing = store.get_vehicle(vehicle_id)
+        before = existing.to_dict() if existing else {}
+        updated_vehicle = store.update_vehicle(vehicle_id, vehicle_data)
         
-        if vehicle_index is None:
+        if updated_vehicle is None:
             print(f"❌ Vehicle {vehicle_id} not found in database")
             return {
                 "error": "Vehicle not found",
                 "id": vehicle_id
             }
         
-        # Update the vehicle with new data
-        updated_vehicle = vehicles_db[vehicle_index].copy()
-        updated_vehicle.update(vehicle_data)
-        updated_vehicle['id'] = vehicle_id  # Ensure ID doesn't change
-        
-        # Update the vehicle in the database
-        vehicles_db[vehicle_index] = updated_vehicle
-        
         print(f"✅ Vehicle {vehicle_id} updated successfully")
-        print(f"📊 Final vehicles count: {len(vehicles_db)}")
+        publish_vehicle_update(vehicle_id, before, updated_vehicle.to_dict())
         
         return {
             "id": vehicle_id,
             "message": "Vehicle updated successfully",
-            "updated_vehicle": updated_vehicle
+            "updated_vehicle": updated_vehicle.to_dict()
         }
     except Exception as e:
         print(f"❌ Error updating vehicle {vehicle_id}: {e}")
@@ -726,44 +905,30 @@ async def update_vehicle(vehicle_id: int, vehicle_data: dict):
 @app.delete("/vehicles/{vehicle_id}")
 async def delete_vehicle(vehicle_id: int):
     """Delete a vehicle"""
-    global vehicles_db, photos_db
-    
     try:
         print(f"🗑️ Attempting to delete vehicle {vehicle_id}")
-        print(f"📊 Current vehicles count: {len(vehicles_db)}")
-        print(f"📸 Current photos count: {len(photos_db)}")
         
-        # Find and remove the vehicle
-        vehicle_index = None
-        for i, vehicle in enumerate(vehicles_db):
-            if vehicle.get('id') == vehicle_id:
-                vehicle_index = i
-                break
+        # Remove the vehicle and its photos (found through the vehicle's photo index)
+        deleted_vehicle, photos_removed = store.delete_vehicle(vehicle_id)
         
-        if vehicle_index is None:
+        if deleted_vehicle is None:
             print(f"❌ Vehicle {vehicle_id} not found in database")
             return {
                 "error": "Vehicle not found",
                 "id": vehicle_id
             }
         
-        # Remove the vehicle
-        deleted_vehicle = vehicles_db.pop(vehicle_index)
         print(f"✅ Vehicle {vehicle_id} deleted from database")
-        
-        # Remove associated photos
-        photos_before = len(photos_db)
-        photos_db = [photo for photo in photos_db if photo.get('vehicle_id') != vehicle_id]
-        photos_removed = photos_before - len(photos_db)
+        publish_event("vehicle.deleted", {"vehicle_id": vehicle_id})
         print(f"📸 Removed {photos_removed} photos for vehicle {vehicle_id}")
         
-        print(f"📊 Final vehicles count: {len(vehicles_db)}")
-        print(f"📸 Final photos count: {len(photos_db)}")
+        print(f"📊 Final vehicles count: {store.vehicle_count()}")
+        print(f"📸 Final photos count: {store.photo_count()}")
         
         return {
             "id": vehicle_id,
             "message": "Vehicle deleted successfully",
-            "deleted_vehicle": deleted_vehicle,
+            "deleted_vehicle": deleted_vehicle.to_dict(),
             "photos_removed": photos_removed
         }
     except Exception as e:
@@ -776,33 +941,27 @@ async def delete_vehicle(vehicle_id: int):
 @app.put("/photos/{photo_id}/set-primary")
 async def set_primary_photo(photo_id: int):
     """Set a photo as primary for its vehicle"""
-    global photos_db
-    
     try:
         print(f"⭐ Setting photo {photo_id} as primary")
         
         # Find the photo
-        photo = next((p for p in photos_db if p.get('id') == photo_id), None)
+        photo = store.get_photo(photo_id)
         if not photo:
             return {
                 "error": "Photo not found",
                 "id": photo_id
             }
         
-        vehicle_id = photo.get('vehicle_id')
+        vehicle_id = photo.vehicle_id
         if not vehicle_id:
             return {
                 "error": "Photo has no associated vehicle",
                 "id": photo_id
             }
         
-        # Remove primary status from all other photos of this vehicle
-        for p in photos_db:
-            if p.get('vehicle_id') == vehicle_id:
-                p['is_primary'] = False
-        
-        # Set this photo as primary
-        photo['is_primary'] = True
+        # Set this photo as primary (the previous primary is unmarked)
+        store.set_primary_photo(photo_id)
+        publish_event("photo.updated", {"photo_id": photo_id, "vehicle_id": vehicle_id, "changes": {"is_primary": True}})
         
         print(f"✅ Photo {photo_id} set as primary for vehicle {vehicle_id}")
         
@@ -821,29 +980,21 @@ async def set_primary_photo(photo_id: int):
 @app.delete("/photos/{photo_id}")
 async def delete_photo(photo_id: int):
     """Delete a photo"""
-    global photos_db
-    
     try:
         # Find and remove the photo
-        photo_index = None
-        for i, photo in enumerate(photos_db):
-            if photo.get('id') == photo_id:
-                photo_index = i
-                break
+        deleted_photo = store.delete_photo(photo_id)
         
-        if photo_index is None:
+        if deleted_photo is None:
             return {
                 "error": "Photo not found",
                 "id": photo_id
             }
-        
-        # Remove the photo
-        deleted_photo = photos_db.pop(photo_index)
+        publish_event("photo.deleted", {"photo_id": photo_id, "vehicle_id": deleted_photo.vehicle_id})
         
         return {
             "id": photo_id,
             "message": "Photo deleted successfully",
-            "deleted_photo": deleted_photo
+            "deleted_photo": deleted_photo.to_dict()
         }
     except Exception as e:
         return {
@@ -852,12 +1003,22 @@ async def delete_photo(photo_id: int):
         }
 
 @app.post("/photos/vehicle/{vehicle_id}/photos/{photo_id}/set-primary")
-async def set_primary_photo(vehicle_id: int, photo_id: int):
+async def set_vehicle_primary_photo(vehicle_id: int, photo_id: int):
     """Set primary photo"""
+    photo = store.get_photo(photo_id)
+    if not photo or photo.vehicle_id != vehicle_id:
+        return {
+            "error": "Photo not found for this vehicle",
+            "vehicle_id": vehicle_id,
+            "photo_id": photo_id
+        }
+
+    store.set_primary_photo(photo_id)
+    publish_event("photo.updated", {"photo_id": photo_id, "vehicle_id": vehicle_id, "changes": {"is_primary": True}})
     return {
         "vehicle_id": vehicle_id,
         "photo_id": photo_id,
-        "message": "Primary photo setting not implemented yet"
+        "message": "Photo set as primary successfully"
     }
 
 @app.post("/photos/sync/google-drive")
@@ -936,7 +1097,7 @@ async def post_vehicle_to_facebook(vehicle_id: int, account_id: int = 0):
         return {"error": "Account not found"}
     
     # Find the vehicle
-    vehicle = next((v for v in vehicles_db if v.get('id') == vehicle_id), None)
+    vehicle = store.get_vehicle(vehicle_id)
     if not vehicle:
         return {"error": "Vehicle not found"}
     
@@ -944,16 +1105,16 @@ async def post_vehicle_to_facebook(vehicle_id: int, account_id: int = 0):
     
     try:
         # Get primary photo
-        primary_photo = next((p for p in photos_db if p.get('vehicle_id') == vehicle_id and p.get('is_primary')), None)
+        primary_photo = store.primary_photo(vehicle_id, fallback_to_first=False)
         
         # Create post content
         post_content = f"""
-🚗 {vehicle['marca']} {vehicle['modelo']} {vehicle['año']}
+🚗 {vehicle.marca} {vehicle.modelo} {vehicle.año}
 
-💰 Precio: ${vehicle['precio']:,}
- Color: {vehicle['color']}
- Kilómetros: {vehicle['kilometraje']:,}
- Estado: {vehicle['estatus']}
+💰 Precio: ${vehicle.precio:,}
+ Color: {vehicle.color}
+ Kilómetros: {vehicle.kilometraje:,}
+ Estado: {vehicle.estatus}
 
 📞 Contacto: Autosell.mx
  Más información: https://autosell.mx/vehiculo/{vehicle_id}
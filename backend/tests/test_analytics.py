@@ -0,0 +1,95 @@
+"""
+Inventory analytics: listing time and results precomputed by the daily rollup
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models import DashboardSnapshot, StatusHistory, Vehicle
+from app.models.vehicle import VehicleStatus
+from app.services import rollup_service
+from app.services.analytics_service import inventory_analytics
+
+
+@pytest.fixture(autouse=True)
+def cold_cache():
+    inventory_analytics.invalidate()
+    yield
+    inventory_analytics.invalidate()
+
+
+def add_vehicle(db, days_ago, estatus=VehicleStatus.DISPONIBLE, modelo="Versa"):
+    vehicle = Vehicle(
+        marca="Nissan", modelo=modelo, año=2020, precio=Decimal("250000"), estatus=estatus,
+        created_at=datetime.now() - timedelta(days=days_ago)
+    )
+    db.add(vehicle)
+    db.flush()
+    return vehicle
+
+
+def test_vehicle_predating_history_is_listed_at_created_at(db):
+    # Created before status history existed; the only row is the sale itself
+    vehicle = add_vehicle(db, days_ago=60, estatus=VehicleStatus.VENDIDO)
+    db.add(StatusHistory(vehicle_id=vehicle.id, old_status="DISPONIBLE", new_status="VENDIDO",
+                         changed_at=datetime.now()))
+    db.commit()
+
+    result = inventory_analytics.get_time_to_sale(db, refresh=True)
+
+    assert result["vehicles_sold"] == 1
+    assert result["avg_days_to_sale"] == pytest.approx(60, abs=0.1)
+
+
+def test_creation_row_is_the_listing_time(db):
+    vehicle = add_vehicle(db, days_ago=90)
+    db.add_all([
+        StatusHistory(vehicle_id=vehicle.id, old_status=None, new_status="DISPONIBLE",
+                      changed_at=datetime.now() - timedelta(days=20)),
+        StatusHistory(vehicle_id=vehicle.id, old_status="DISPONIBLE", new_status="APARTADO",
+                      changed_at=datetime.now() - timedelta(days=5))
+    ])
+    db.commit()
+
+    result = inventory_analytics.get_aging(db, refresh=True)
+
+    assert result["vehicles_on_lot"] == 1
+    assert result["oldest"][0]["days_on_lot"] == pytest.approx(20, abs=0.1)
+
+
+def test_requests_serve_the_rollup_result(db, count_queries):
+    add_vehicle(db, days_ago=10)
+    add_vehicle(db, days_ago=40, modelo="Sentra")
+    db.commit()
+    rollup_service.take_snapshot(db)
+
+    stored = db.query(DashboardSnapshot).one()
+    assert stored.aging["vehicles_on_lot"] == 2
+
+    # One lookup of the stored result, then memory for the rest of the day
+    with count_queries() as queries:
+        aging = inventory_analytics.get_aging(db, limit=1)
+    assert queries.count == 1
+    assert aging["buckets"] == stored.aging["buckets"]
+    assert len(aging["by_model"]) == 1
+
+    with count_queries() as queries:
+        inventory_analytics.get_aging(db)
+        inventory_analytics.get_time_to_sale(db)
+    assert queries.count == 1
+
+
+def test_stale_snapshot_is_ignored(db):
+    add_vehicle(db, days_ago=10)
+    db.commit()
+    rollup_service.take_snapshot(db, snapshot_date=date.today() - timedelta(days=2))
+    stored = db.query(DashboardSnapshot).one()
+    stored.aging = {**stored.aging, "vehicles_on_lot": 99}
+    db.commit()
+    add_vehicle(db, days_ago=40, modelo="Sentra")
+    db.commit()
+
+    # The rollup stopped two days ago, so the counts come from the live tables
+    assert inventory_analytics.get_aging(db)["vehicles_on_lot"] == 2
@@ -0,0 +1,81 @@
+"""
+Query budget of the dashboard statistics
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from app.models import Photo, Vehicle
+from app.models.vehicle import VehicleStatus
+from app.services import rollup_service
+from app.services.inventory_counters import inventory_counters
+
+
+@pytest.fixture
+def inventory(db):
+    vehicles = [
+        Vehicle(marca="Nissan", modelo="Versa", año=2020, precio=Decimal("250000"), estatus=VehicleStatus.DISPONIBLE),
+        Vehicle(marca="Nissan", modelo="Sentra", año=2021, precio=Decimal("320000"), estatus=VehicleStatus.DISPONIBLE),
+        Vehicle(marca="Mazda", modelo="3", año=2019, precio=Decimal("280000"), estatus=VehicleStatus.VENDIDO),
+        Vehicle(marca="Kia", modelo="Rio", año=2022, precio=None, estatus=VehicleStatus.APARTADO)
+    ]
+    db.add_all(vehicles)
+    db.flush()
+    db.add_all([
+        Photo(vehicle_id=vehicles[0].id, filename="versa-1.jpg", is_primary=True),
+        Photo(vehicle_id=vehicles[0].id, filename="versa-2.jpg"),
+        Photo(vehicle_id=vehicles[2].id, filename="mazda-1.jpg")
+    ])
+    db.commit()
+    return vehicles
+
+
+@pytest.fixture(autouse=True)
+def cold_caches():
+    # The counters would answer from memory; these tests cover the SQL fallback
+    assert not inventory_counters.is_running
+    rollup_service._stats_cache.invalidate()
+    rollup_service._reference_cache.invalidate()
+    yield
+    rollup_service._stats_cache.invalidate()
+    rollup_service._reference_cache.invalidate()
+
+
+def test_inventory_stats_uses_two_queries(db, inventory, count_queries):
+    with count_queries() as queries:
+        stats = rollup_service.inventory_stats(db)
+
+    assert queries.count == 2
+    assert stats["total_vehicles"] == 4
+    assert stats["available_vehicles"] == 2
+    assert stats["sold_vehicles"] == 1
+    assert stats["reserved_vehicles"] == 1
+    assert stats["total_value"] == 570000.0
+    assert stats["average_price"] == 285000.0
+    assert stats["total_photos"] == 3
+    assert stats["vehicles_with_photos"] == 2
+    assert stats["primary_photos"] == 1
+
+
+def test_dashboard_stats_served_from_cache(db, inventory, count_queries):
+    with count_queries() as queries:
+        cold = rollup_service.dashboard_stats(db)
+    # Two statistics queries plus the reference snapshot lookup
+    assert queries.count == 3
+
+    with count_queries() as queries:
+        cached = rollup_service.dashboard_stats(db)
+    assert queries.count == 0
+    assert cached == cold
+    assert cold["status_breakdown"]["disponible"] == 2
+
+
+def test_stats_cache_expiry_recounts_with_two_queries(db, inventory, count_queries):
+    rollup_service.dashboard_stats(db)
+    rollup_service._stats_cache.invalidate()
+
+    # The reference snapshot stays cached for the day; only the live stats rerun
+    with count_queries() as queries:
+        rollup_service.dashboard_stats(db)
+    assert queries.count == 2
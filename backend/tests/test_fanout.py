@@ -0,0 +1,64 @@
+"""
+Fan-out executor: per-account and global concurrency limits
+"""
+
+import asyncio
+from collections import defaultdict
+
+from app.services.fanout_service import FanoutExecutor
+
+
+class FakePoster:
+    """Records how many posts run at once, overall and per account"""
+
+    def __init__(self, delay=0.01, fail_on=()):
+        self.delay = delay
+        self.fail_on = set(fail_on)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.account_in_flight = defaultdict(int)
+        self.max_account_in_flight = defaultdict(int)
+
+    async def post(self, item):
+        account, index = item
+        self.in_flight += 1
+        self.account_in_flight[account] += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.max_account_in_flight[account] = max(self.max_account_in_flight[account],
+                                                  self.account_in_flight[account])
+        try:
+            await asyncio.sleep(self.delay)
+            if item in self.fail_on:
+                raise RuntimeError(f"Graph error for {item}")
+            return "done"
+        finally:
+            self.in_flight -= 1
+            self.account_in_flight[account] -= 1
+
+
+def test_account_and_global_limits_hold():
+    executor = FanoutExecutor(account_concurrency=2, total_concurrency=10)
+    executor.set_account_limit("slow", 1)
+    poster = FakePoster()
+    items = [(account, index) for account in [f"acct{n}" for n in range(8)] + ["slow"] for index in range(5)]
+
+    summary = asyncio.run(executor.run(items, account_key=lambda item: item[0], handler=poster.post))
+
+    assert summary["total"] == summary["succeeded"] == 45
+    # Eight accounts at two each would be 16; the global cap keeps it at 10
+    assert poster.max_in_flight == 10
+    assert max(poster.max_account_in_flight.values()) == 2
+    assert poster.max_account_in_flight["slow"] == 1
+
+
+def test_failing_post_does_not_cancel_the_others():
+    executor = FanoutExecutor(account_concurrency=2, total_concurrency=10)
+    poster = FakePoster(fail_on={("a", 1)})
+    items = [(account, index) for account in ("a", "b") for index in range(3)]
+
+    summary = asyncio.run(executor.run(items, account_key=lambda item: item[0], handler=poster.post))
+
+    assert summary["succeeded"] == 5
+    assert summary["failed"] == 1
+    assert summary["by_account"] == {"a": {"done": 2, "error": 1}, "b": {"done": 3}}
+    assert summary["errors"] == ["Graph error for ('a', 1)"]
@@ -0,0 +1,136 @@
+"""
+Graph API client and FacebookService against a fake Graph server (httpx.MockTransport)
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services.facebook_service import FacebookService
+from app.services.graph_client import GraphHTTPClient
+
+
+class FakeGraph:
+    """Records requests and answers them with a handler"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.handler(request)
+
+
+def graph_error(status_code, message, code=100):
+    return httpx.Response(status_code, json={"error": {"message": message, "type": "OAuthException", "code": code}})
+
+
+@pytest.fixture
+def credentials(monkeypatch, request):
+    # A separate app id per test keeps rate limiter buckets independent
+    monkeypatch.setenv("FACEBOOK_ACCESS_TOKEN", "token")
+    monkeypatch.setenv("FACEBOOK_PAGE_ID", "page")
+    monkeypatch.setenv("FACEBOOK_USER_ID", "user")
+    monkeypatch.setenv("FACEBOOK_APP_ID", f"app-{request.node.name}")
+    monkeypatch.setenv("FACEBOOK_APP_SECRET", "secret")
+
+
+def make_service(handler):
+    fake = FakeGraph(handler)
+    client = GraphHTTPClient(transport=httpx.MockTransport(fake))
+    return FacebookService(http_client=client), client, fake
+
+
+def test_client_is_reused_across_calls(credentials):
+    service, client, fake = make_service(lambda request: httpx.Response(200, json={"name": "Lot"}))
+
+    async def run():
+        first = client.get_client()
+        for _ in range(3):
+            assert (await service.validate_credentials())["valid"]
+        same = client.get_client() is first
+        await client.aclose()
+        return same, client.get_client() is not first
+
+    reused, rebuilt_after_close = asyncio.run(run())
+    assert reused
+    assert rebuilt_after_close
+    assert len(fake.requests) == 3
+
+
+def test_client_is_rebuilt_for_a_new_event_loop(credentials):
+    service, client, fake = make_service(lambda request: httpx.Response(200, json={}))
+
+    async def current():
+        return client.get_client()
+
+    first = asyncio.run(current())
+    second = asyncio.run(current())
+    assert first is not second
+
+
+def test_default_timeouts_reach_the_transport(credentials):
+    service, client, fake = make_service(lambda request: httpx.Response(200, json={"data": []}))
+
+    asyncio.run(service.get_page_insights(use_cache=False))
+
+    timeout = fake.requests[0].extensions["timeout"]
+    assert timeout["connect"] == 5.0
+    assert timeout["read"] == 10.0
+
+
+def test_read_timeout_is_mapped_to_an_error(credentials):
+    def handler(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    service, client, fake = make_service(handler)
+
+    deleted = asyncio.run(service.delete_post("123_456"))
+    validated = asyncio.run(service.validate_credentials())
+
+    assert deleted["error"].startswith("Facebook API error")
+    assert "timed out" in deleted["error"]
+    assert validated["valid"] is False
+    assert validated["error"].startswith("API validation failed")
+
+
+def test_graph_error_response_is_mapped_to_an_error(credentials):
+    service, client, fake = make_service(lambda request: graph_error(400, "Invalid parameter"))
+    vehicle = SimpleNamespace(id=1, año=2020, marca="Nissan", modelo="Versa", precio=150000)
+
+    result = asyncio.run(service.post_to_marketplace(vehicle, "Disponible"))
+
+    assert "success" not in result
+    assert result["error"].startswith("Marketplace API error")
+    assert "400" in result["error"]
+    assert fake.requests[0].url.path.endswith("/user/marketplace_listings")
+
+
+def test_batch_delete_maps_each_sub_response(credentials):
+    def handler(request):
+        batch = json.loads(dict(httpx.QueryParams(request.content.decode()))["batch"])
+        codes = {"gone": 404, "ok": 200, "denied": 403}
+        return httpx.Response(200, json=[
+            {"code": codes[op["relative_url"]], "body": json.dumps({"success": True})} for op in batch
+        ])
+
+    service, client, fake = make_service(handler)
+
+    result = asyncio.run(service.delete_posts(["ok", "gone", "denied", "ok"]))
+
+    assert result == {"ok": True, "gone": True, "denied": False}
+    assert len(fake.requests) == 1
+
+
+def test_batch_transport_error_marks_every_post_failed(credentials):
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    service, client, fake = make_service(handler)
+
+    assert asyncio.run(service.delete_posts(["a", "b"])) == {"a": False, "b": False}
+    assert asyncio.run(service.get_posts_insights(["a"])) == {}
@@ -0,0 +1,92 @@
+"""
+Development backend store: photo indexes stay in step with the records
+"""
+
+import pytest
+
+from memory_store import InMemoryStore
+from records import PhotoRecord, VehicleRecord
+
+
+def assert_indexes_consistent(store):
+    by_vehicle = {}
+    for photo in store.photos.values():
+        if photo.vehicle_id is not None:
+            by_vehicle.setdefault(photo.vehicle_id, []).append(photo.id)
+    assert {vid: list(ids) for vid, ids in store.photos_by_vehicle.items()} == by_vehicle
+
+    primaries = {photo.vehicle_id: photo.id for photo in store.photos.values() if photo.is_primary}
+    assert store.primary_photos == primaries
+
+
+@pytest.fixture
+def store():
+    store = InMemoryStore()
+    for _ in range(2):
+        store.add_vehicle(VehicleRecord(id=store.allocate_vehicle_id()))
+    return store
+
+
+def add_photo(store, vehicle_id, is_primary=False):
+    return store.add_photo(PhotoRecord(id=store.allocate_photo_id(), vehicle_id=vehicle_id,
+                                       filename="photo.jpg", is_primary=is_primary))
+
+
+def test_add_photo_indexes_in_upload_order(store):
+    first = add_photo(store, 1)
+    second = add_photo(store, 1, is_primary=True)
+    add_photo(store, 2)
+
+    assert [photo.id for photo in store.vehicle_photos(1)] == [first.id, second.id]
+    assert store.primary_photo(1) is second
+    assert_indexes_consistent(store)
+
+
+def test_set_primary_unmarks_the_previous_one(store):
+    first = add_photo(store, 1, is_primary=True)
+    second = add_photo(store, 1)
+
+    store.set_primary_photo(second.id)
+
+    assert not store.get_photo(first.id).is_primary
+    assert store.primary_photo(1).id == second.id
+    assert store.primary_photo_count() == 1
+    assert_indexes_consistent(store)
+
+
+def test_delete_photo_drops_it_from_both_indexes(store):
+    only = add_photo(store, 1, is_primary=True)
+    kept = add_photo(store, 2)
+
+    store.delete_photo(only.id)
+
+    assert 1 not in store.photos_by_vehicle
+    assert store.primary_photo(1) is None
+    assert store.vehicles_with_photos() == 1
+    assert store.vehicle_photos(2) == [kept]
+    assert_indexes_consistent(store)
+
+
+def test_delete_vehicle_removes_only_its_photos(store):
+    add_photo(store, 1, is_primary=True)
+    add_photo(store, 1)
+    kept = add_photo(store, 2, is_primary=True)
+
+    vehicle, photos_removed = store.delete_vehicle(1)
+
+    assert vehicle.id == 1
+    assert photos_removed == 2
+    assert list(store.photos.values()) == [kept]
+    assert store.primary_photo(2) is kept
+    assert_indexes_consistent(store)
+
+
+def test_clear_vehicles_clears_photos_and_indexes(store):
+    add_photo(store, 1, is_primary=True)
+    add_photo(store, 2)
+
+    assert store.clear_vehicles() == 2
+
+    assert store.vehicle_count() == store.photo_count() == 0
+    assert store.vehicles_with_photos() == store.primary_photo_count() == 0
+    assert_indexes_consistent(store)
@@ -0,0 +1,98 @@
+"""
+Outbox workers: step-wise retries of post intents
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models import MarketplaceListing, PostOutbox, SocialPost, Vehicle
+from app.services.facebook_service import FacebookService
+from app.services.outbox_service import OutboxWorker, enqueue_post
+
+
+class FakeGraph:
+    """Stands in for the Page and Marketplace calls of FacebookService"""
+
+    def __init__(self, marketplace_results):
+        self.marketplace_results = list(marketplace_results)
+        self.posts = 0
+        self.listings = 0
+
+    async def post_to_facebook(self, service, vehicle, message):
+        self.posts += 1
+        return {"success": True, "post_id": f"page_{self.posts}"}
+
+    async def post_to_marketplace(self, service, vehicle, message):
+        self.listings += 1
+        return self.marketplace_results.pop(0)
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def fake_graph(monkeypatch):
+    def install(marketplace_results):
+        fake = FakeGraph(marketplace_results)
+        monkeypatch.setattr(FacebookService, "post_to_facebook",
+                            lambda self, vehicle, message: fake.post_to_facebook(self, vehicle, message))
+        monkeypatch.setattr(FacebookService, "post_to_marketplace",
+                            lambda self, vehicle, message: fake.post_to_marketplace(self, vehicle, message))
+        return fake
+    return install
+
+
+def test_failed_marketplace_step_is_retried_alone(db, session_factory, fake_graph):
+    fake = fake_graph([
+        {"error": "Marketplace API error: 500"},
+        {"success": True, "listing_id": "listing_1"}
+    ])
+    vehicle = Vehicle(marca="Nissan", modelo="Versa", año=2020, precio=150000)
+    db.add(vehicle)
+    db.commit()
+    outbox = enqueue_post(db, vehicle.id, "Disponible", include_marketplace=True)
+    db.commit()
+
+    worker = OutboxWorker("test-worker", session_factory)
+    asyncio.run(worker.run_once())
+
+    db.refresh(outbox)
+    assert outbox.status == PostOutbox.PENDING
+    assert outbox.external_post_id == "page_1"
+    assert outbox.external_listing_id is None
+    assert outbox.last_error.startswith("Marketplace:")
+    assert db.query(SocialPost).count() == 1
+
+    outbox.next_attempt_at = datetime.now(timezone.utc)
+    db.commit()
+    asyncio.run(worker.run_once())
+
+    db.refresh(outbox)
+    assert outbox.status == PostOutbox.DONE
+    assert outbox.external_listing_id == "listing_1"
+    assert fake.posts == 1
+    assert fake.listings == 2
+    assert db.query(SocialPost).count() == 1
+    assert [listing.external_listing_id for listing in db.query(MarketplaceListing)] == ["listing_1"]
+
+
+def test_intent_for_a_sold_vehicle_is_failed_without_posting(db, session_factory, fake_graph):
+    fake = fake_graph([])
+    vehicle = Vehicle(marca="Nissan", modelo="Versa", año=2020, estatus="DISPONIBLE")
+    db.add(vehicle)
+    db.commit()
+    outbox = enqueue_post(db, vehicle.id, "Disponible")
+    vehicle.estatus = "VENDIDO"
+    db.commit()
+
+    asyncio.run(OutboxWorker("test-worker", session_factory).run_once())
+
+    db.refresh(outbox)
+    assert outbox.status == PostOutbox.FAILED
+    assert outbox.last_error == "Vehicle is VENDIDO"
+    assert fake.posts == 0
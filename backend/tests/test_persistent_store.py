@@ -0,0 +1,192 @@
+"""
+Development backend persistence: WAL replay, snapshots and crash recovery
+"""
+
+import os
+import pickle
+import threading
+
+import pytest
+
+import persistent_store
+from persistent_store import PersistentStore
+from records import PhotoRecord, VehicleRecord
+
+
+def state(store):
+    return store.vehicles, store.photos, store.photos_by_vehicle, store.primary_photos
+
+
+def crash(store):
+    """Stop without the shutdown snapshot, as a killed process would"""
+    store.wait_for_snapshot()
+    store._wal.close()
+    store._wal = None
+
+
+def reopen(store):
+    restarted = PersistentStore(store.data_dir, snapshot_every=store.snapshot_every)
+    return restarted, restarted.open()
+
+
+def add_vehicle(store, **data):
+    return store.add_vehicle(VehicleRecord.from_payload(store.allocate_vehicle_id(), data))
+
+
+def add_photo(store, vehicle_id, is_primary=False):
+    return store.add_photo(PhotoRecord(id=store.allocate_photo_id(), vehicle_id=vehicle_id,
+                                       filename="photo.jpg", is_primary=is_primary))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PersistentStore(str(tmp_path / "store"), snapshot_every=1000)
+    store.open()
+    yield store
+    if store._wal is not None:
+        store.close(snapshot=False)
+
+
+def fill(store):
+    for marca in ("Nissan", "Toyota", "Mazda"):
+        add_vehicle(store, marca=marca, precio=200000)
+    add_photo(store, 1)
+    add_photo(store, 1, is_primary=True)
+    add_photo(store, 2, is_primary=True)
+    store.update_vehicle(2, {"estatus": "vendido"})
+    store.set_primary_photo(1)
+    store.delete_vehicle(3)
+
+
+def test_restart_after_crash_without_snapshot_replays_the_wal(store):
+    fill(store)
+    expected = state(store)
+    crash(store)
+
+    restarted, loaded = reopen(store)
+
+    assert loaded["snapshot_seq"] == 0
+    assert loaded["replayed"] > 0
+    assert state(restarted) == expected
+    restarted.close(snapshot=False)
+
+
+def test_torn_last_line_is_dropped_and_truncated(store):
+    fill(store)
+    expected = state(store)
+    crash(store)
+    with open(store.wal_path, "ab") as wal:
+        wal.write(b'{"seq": 999, "op": "put_veh')
+
+    restarted, _ = reopen(store)
+    assert state(restarted) == expected
+
+    # New records start on a clean line and survive the next restart
+    add_vehicle(restarted, marca="Kia")
+    crash(restarted)
+    again, _ = reopen(restarted)
+    assert again.get_vehicle(4).marca == "Kia"
+    again.close(snapshot=False)
+
+
+def test_crash_after_snapshot_rename_before_old_wal_removal(store, monkeypatch):
+    fill(store)
+    real_remove = os.remove
+
+    def crash_on_old_wal(path):
+        if path == store.old_wal_path:
+            raise OSError("killed")
+        real_remove(path)
+
+    monkeypatch.setattr(persistent_store.os, "remove", crash_on_old_wal)
+    store.snapshot()
+    assert isinstance(store.wait_for_snapshot(), OSError)
+    monkeypatch.setattr(persistent_store.os, "remove", real_remove)
+    add_photo(store, 2)
+    expected = state(store)
+    crash(store)
+
+    # The snapshot and the old WAL both hold the same records; replay skips them by seq
+    assert os.path.exists(store.snapshot_path) and os.path.exists(store.old_wal_path)
+    restarted, loaded = reopen(store)
+
+    assert loaded["replayed"] == 2
+    assert state(restarted) == expected
+    restarted.close(snapshot=False)
+
+
+def test_version_1_snapshot_is_upgraded(store):
+    store.close(snapshot=False)
+    with open(store.snapshot_path, "wb") as f:
+        pickle.dump({
+            "version": 1, "seq": 3,
+            "vehicles": {1: {"id": 1, "marca": "Nissan", "precio": 200000, "color_interior": "negro"}},
+            "photos": {1: {"id": 1, "vehicle_id": 1, "filename": "a.jpg", "is_primary": True}},
+            "photos_by_vehicle": {1: {1: None}}, "primary_photos": {1: 1},
+            "next_vehicle_id": 2, "next_photo_id": 2
+        }, f)
+
+    restarted, loaded = reopen(store)
+    vehicle = restarted.get_vehicle(1)
+    assert isinstance(vehicle, VehicleRecord)
+    assert vehicle.extra == {"color_interior": "negro"}
+    assert restarted.primary_photo(1).filename == "a.jpg"
+
+    add_vehicle(restarted, marca="Kia")
+    restarted.close()
+    with open(store.snapshot_path, "rb") as f:
+        upgraded = pickle.load(f)
+    assert upgraded["version"] == persistent_store.SNAPSHOT_VERSION
+    assert isinstance(upgraded["vehicles"][1], VehicleRecord)
+    assert upgraded["primary_photos"] == {1: 1}
+
+
+def test_ids_are_never_reused_after_restart(store):
+    fill(store)
+    # Handed out but never stored before the crash
+    allocated = store.allocate_vehicle_id()
+    photo_id = store.allocate_photo_id()
+    crash(store)
+
+    restarted, _ = reopen(store)
+    assert restarted.allocate_vehicle_id() > allocated
+    assert restarted.allocate_photo_id() > photo_id
+
+    # The deleted vehicle 3 was the highest stored id; still not handed out after a snapshot
+    restarted.close()
+    again, loaded = reopen(restarted)
+    assert loaded["replayed"] == 0
+    assert again.allocate_vehicle_id() > allocated + 1
+    again.close(snapshot=False)
+
+
+def test_snapshot_is_written_off_the_request_path(tmp_path, monkeypatch):
+    store = PersistentStore(str(tmp_path / "store"), snapshot_every=5)
+    store.open()
+    release = threading.Event()
+    write_snapshot = store._write_snapshot
+
+    def slow_write(captured):
+        release.wait(5)
+        write_snapshot(captured)
+
+    monkeypatch.setattr(store, "_write_snapshot", slow_write)
+    add_vehicle(store, marca="Nissan")
+    add_vehicle(store, marca="Toyota")
+    add_photo(store, 1, is_primary=True)
+
+    # The write that crossed the threshold returned while the snapshot is pending
+    assert store.snapshot_in_progress()
+    add_vehicle(store, marca="Mazda")
+    store.set_primary_photo(1)
+    expected = state(store)
+
+    release.set()
+    assert store.wait_for_snapshot() is None
+    assert not os.path.exists(store.old_wal_path)
+    crash(store)
+
+    restarted, loaded = reopen(store)
+    assert loaded["snapshot_seq"] == 5
+    assert state(restarted) == expected
+    restarted.close(snapshot=False)
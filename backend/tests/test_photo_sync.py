@@ -0,0 +1,77 @@
+"""
+Drive folder reconciliation against the photos table
+"""
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Photo, Vehicle
+from app.services.inventory_counters import inventory_counters, register_counter_events
+from app.services.photo_sync_service import reconcile_vehicle_photos
+from app.services.vehicle_events import INVENTORY_BULK_CHANGED, event_bus, register_session_events
+
+
+def drive_file(file_id):
+    return {
+        "drive_file_id": file_id,
+        "filename": f"{file_id}.jpg",
+        "drive_url": f"https://drive.google.com/file/d/{file_id}/view",
+        "file_size": 1024,
+        "mime_type": "image/jpeg"
+    }
+
+
+@pytest.fixture
+def vehicle(db):
+    vehicle = Vehicle(marca="Nissan", modelo="Versa", año=2020)
+    db.add(vehicle)
+    db.commit()
+    return vehicle
+
+
+def test_pending_drive_delete_is_retried_not_revived(db, vehicle):
+    kept = Photo(vehicle_id=vehicle.id, filename="a.jpg", drive_file_id="a",
+                 is_active=False, drive_delete_pending=True)
+    gone = Photo(vehicle_id=vehicle.id, filename="b.jpg", drive_file_id="b",
+                 is_active=False, drive_delete_pending=True)
+    db.add_all([kept, gone])
+    db.commit()
+
+    # "a" is still in Drive (its delete failed); "b" has since been removed
+    result = reconcile_vehicle_photos(db, vehicle.id, [drive_file("a"), drive_file("c")])
+    db.commit()
+
+    assert result["pending_delete_ids"] == [kept.id]
+    assert result["new_count"] == 1
+    rows = {photo.drive_file_id: photo for photo in db.query(Photo).all()}
+    assert set(rows) == {"a", "c"}
+    assert rows["a"].is_active is False
+    assert rows["c"].is_active is True
+
+
+def test_drive_sync_marks_counters_stale_and_publishes_a_bulk_event(db, engine, vehicle):
+    session_factory = sessionmaker(bind=engine)
+    register_counter_events(session_factory)
+    register_session_events(session_factory)
+    db.add(Photo(vehicle_id=vehicle.id, filename="old.jpg", drive_file_id="old"))
+    db.commit()
+
+    received = []
+    event_bus.subscribe(INVENTORY_BULK_CHANGED, received.append)
+    inventory_counters.seed(db)
+    try:
+        sync = session_factory()
+        reconcile_vehicle_photos(sync, vehicle.id, [drive_file("a"), drive_file("b")], prune=True)
+        assert inventory_counters.is_ready
+        sync.commit()
+        sync.close()
+
+        # The bulk insert and delete skipped the mapper hooks, so counters need a recount
+        assert not inventory_counters.is_ready
+        assert {tuple(e.payload.values()) for e in received} == {("photo", "created"), ("photo", "deleted")}
+
+        inventory_counters.seed(db)
+        assert inventory_counters.get_stats()["total_photos"] == 2
+    finally:
+        event_bus.unsubscribe(INVENTORY_BULK_CHANGED, received.append)
+        inventory_counters.reset()
@@ -0,0 +1,46 @@
+"""
+Price statistics per marca/modelo/año segment
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from app.models import Vehicle
+from app.services.price_stats_service import PriceStatistics
+
+
+@pytest.fixture
+def stats():
+    return PriceStatistics()
+
+
+def add_vehicles(db, modelo, prices, marca="Nissan"):
+    db.add_all([
+        Vehicle(marca=marca, modelo=modelo, año=2020, precio=Decimal(price)) for price in prices
+    ])
+    db.commit()
+
+
+def test_percentiles_match_hand_computed_values(db, stats):
+    add_vehicles(db, "Versa", [100000, 150000, 200000, 300000])
+
+    segment = stats.get_stats(db, marca="nissan", modelo="VERSA")["segments"][0]
+
+    # p25: position 0.75 between 100000 and 150000 -> 137500
+    # p50: position 1.5 between 150000 and 200000 -> 175000
+    # p90: position 2.7 between 200000 and 300000 -> 270000
+    assert segment["count"] == 4
+    assert segment["percentiles"]["p25"] == 137500
+    assert segment["percentiles"]["p50"] == 175000
+    assert segment["percentiles"]["p90"] == 270000
+    assert segment["mean"] == 187500
+
+
+def test_wildcards_in_filters_are_literal(db, stats):
+    add_vehicles(db, "Versa", [100000])
+    add_vehicles(db, "Sentra", [200000])
+
+    assert stats.get_stats(db, marca="%")["total"] == 0
+    assert stats.get_stats(db, marca="Nissan", modelo="_ersa")["total"] == 0
+    assert stats.get_stats(db, marca="Nissan", modelo="versa")["total"] == 1
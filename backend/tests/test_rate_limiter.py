@@ -0,0 +1,44 @@
+"""
+Per-account and per-app Graph API token buckets
+"""
+
+import asyncio
+import json
+
+import httpx
+
+from app.services.facebook_service import FacebookService
+from app.services.graph_client import GraphHTTPClient
+from app.services.rate_limiter import APP_BURST, APP_CALLS_PER_HOUR, FacebookRateLimiter, rate_limiter
+
+
+def test_account_config_does_not_change_the_app_bucket():
+    limiter = FacebookRateLimiter()
+    limiter.configure("1", "app", {"posts_per_hour": 10, "post_burst": 2})
+    limiter.configure("2", "app", {"posts_per_hour": 50, "app_calls_per_hour": 5000, "app_burst": 500})
+
+    app_bucket = limiter.app_buckets["app"].snapshot()
+    assert app_bucket["base_rate_per_hour"] == APP_CALLS_PER_HOUR
+    assert app_bucket["capacity"] == APP_BURST
+    assert limiter.account_buckets["1"].snapshot()["capacity"] == 2
+    assert limiter.account_buckets["2"].snapshot()["base_rate_per_hour"] == 50
+
+
+def test_batch_is_charged_per_sub_request(monkeypatch):
+    monkeypatch.setenv("FACEBOOK_ACCESS_TOKEN", "token")
+    monkeypatch.setenv("FACEBOOK_PAGE_ID", "page")
+    monkeypatch.setenv("FACEBOOK_APP_ID", "app-batch-charge")
+
+    def handler(request):
+        batch = json.loads(dict(httpx.QueryParams(request.content.decode()))["batch"])
+        return httpx.Response(200, json=[{"code": 200, "body": "{}"} for _ in batch])
+
+    client = GraphHTTPClient(transport=httpx.MockTransport(handler))
+    service = FacebookService(http_client=client)
+
+    before = rate_limiter.app_buckets["app-batch-charge"].tokens
+    asyncio.run(service.delete_posts(["a", "b", "c", "d"]))
+    after = rate_limiter.app_buckets["app-batch-charge"].tokens
+
+    # One request on the wire, four calls against the app quota (refill is negligible)
+    assert round(before - after) == 4
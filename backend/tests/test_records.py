@@ -0,0 +1,34 @@
+"""
+Development backend records built from create requests
+"""
+
+import pytest
+
+from records import VehicleRecord, parse_price
+
+
+def test_external_id_is_generated_only_when_absent():
+    assert VehicleRecord.from_payload(7, {"marca": "Nissan"}).external_id == "GS_7"
+    assert VehicleRecord.from_payload(7, {"external_id": None}).external_id is None
+    assert VehicleRecord.from_payload(7, {"external_id": "N8N_1"}).external_id == "N8N_1"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (250000, 250000),
+    (199999.5, 199999.5),
+    ("250000", 250000),
+    ("$250,000.00", 250000),
+    (" 189,900.50 ", 189900.5),
+    ("", 0),
+    (None, 0)
+])
+def test_price_is_stored_as_a_number(value, expected):
+    precio = VehicleRecord.from_payload(1, {"price": value}).precio
+    assert precio == expected
+    assert type(precio) is type(expected)
+
+
+@pytest.mark.parametrize("value", ["a consultar", "NaN", True])
+def test_unreadable_price_is_rejected(value):
+    with pytest.raises(ValueError):
+        parse_price(value)
@@ -0,0 +1,57 @@
+"""
+Sold vehicle remover: cancelling queued intents and retrying failed deletes
+"""
+
+import asyncio
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models import PostOutbox, SocialPost, Vehicle
+from app.services import removal_service
+from app.services.facebook_service import FacebookService
+from app.services.outbox_service import enqueue_post
+from app.services.removal_service import SoldVehicleRemover
+
+
+def test_failed_removal_is_retried_and_queued_intents_cancelled(db, engine, monkeypatch):
+    vehicle = Vehicle(marca="Nissan", modelo="Versa", año=2020, estatus="VENDIDO")
+    db.add(vehicle)
+    db.commit()
+    post = SocialPost(vehicle_id=vehicle.id, platform="facebook", status="posted", external_post_id="page_1")
+    db.add(post)
+    queued = enqueue_post(db, vehicle.id, "Disponible", idempotency_key="queued")
+    db.commit()
+
+    graph_results = [False, True]
+
+    async def delete_posts(self, post_ids):
+        deleted = graph_results.pop(0)
+        return {post_id: deleted for post_id in post_ids}
+
+    monkeypatch.setattr(FacebookService, "delete_posts", delete_posts)
+    monkeypatch.setattr(removal_service, "RETRY_BASE_SECONDS", 0.01)
+    remover = SoldVehicleRemover(session_factory=sessionmaker(bind=engine), batch_window=0)
+
+    # Restart recovery: the sold vehicle still has a live post
+    assert remover._find_unremoved(db) == [vehicle.id]
+
+    async def run():
+        remover._wakeup = asyncio.Event()
+        first = await remover.remove([vehicle.id])
+        await asyncio.sleep(0.05)
+        requeued = set(remover._pending)
+        second = await remover.remove(sorted(requeued))
+        return first, requeued, second
+
+    first, requeued, second = asyncio.run(run())
+
+    assert first["failed_vehicle_ids"] == [vehicle.id]
+    assert first["cancelled"] == 1
+    assert requeued == {vehicle.id}
+    assert second["removed"] == 1
+    assert remover.get_stats()["retrying"] == 0
+
+    db.expire_all()
+    assert db.get(SocialPost, post.id).status == "removed"
+    assert db.get(PostOutbox, queued.id).status == PostOutbox.FAILED
+    assert remover._find_unremoved(db) == []
@@ -0,0 +1,96 @@
+"""
+Repost scheduler: wakeup hook cadence and resyncing schedules saved elsewhere
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models import AutomationWorkflow, DashboardSnapshot
+from app.services import automation_service, rollup_service
+from app.services.automation_service import (
+    FACEBOOK_REPOSTING_JOB, AutomationService, RepostScheduler, on_scheduler_wakeup, repost_scheduler
+)
+from app.services.rollup_service import DASHBOARD_ROLLUP_JOB
+
+EVERY_DAY = [0, 1, 2, 3, 4, 5, 6]
+
+
+@pytest.fixture
+def leader(monkeypatch, engine):
+    monkeypatch.setattr(automation_service.scheduler_leader, "is_leader", True)
+    monkeypatch.setattr(repost_scheduler, "session_factory", sessionmaker(bind=engine))
+    yield
+    repost_scheduler.stop()
+
+
+def test_wakeup_hook_runs_every_interval():
+    scheduler = RepostScheduler()
+    calls = []
+
+    async def hook():
+        calls.append(datetime.now())
+
+    async def run():
+        scheduler.schedule("job", {"is_active": True, "days_of_week": EVERY_DAY, "time_of_day": "09:00"},
+                           handler=lambda config: asyncio.sleep(0),
+                           fire_at=datetime.now() + timedelta(hours=1))
+        scheduler.set_wakeup_hook(hook, interval=0.05)
+        await asyncio.sleep(0.3)
+        scheduler.stop()
+
+    asyncio.run(run())
+    # The job is an hour away; only the interval wakes the loop
+    assert len(calls) >= 4
+
+
+def test_schedule_moved_before_now_on_another_process_catches_up(db, leader):
+    now = datetime.now()
+    if now.hour == 0 and now.minute < 2:
+        pytest.skip("needs a window earlier today")
+    earlier = (now - timedelta(minutes=1)).strftime("%H:%M")
+    later = (now + timedelta(hours=1)).strftime("%H:%M") if now.hour < 23 else "23:59"
+
+    workflow = AutomationWorkflow(
+        name="Facebook Daily Reposting", workflow_type=FACEBOOK_REPOSTING_JOB, is_active=True,
+        config={"is_active": True, "days_of_week": EVERY_DAY, "time_of_day": later}
+    )
+    db.add(workflow)
+    db.commit()
+
+    async def run():
+        await automation_service.on_scheduler_elected()
+        scheduled = repost_scheduler.next_run(FACEBOOK_REPOSTING_JOB)
+
+        # Another process moves today's window to a minute ago
+        workflow.config = {"is_active": True, "days_of_week": EVERY_DAY, "time_of_day": earlier}
+        workflow.updated_at = datetime.now() + timedelta(seconds=1)
+        db.commit()
+
+        await on_scheduler_wakeup()
+        return scheduled, repost_scheduler.next_run(FACEBOOK_REPOSTING_JOB)
+
+    before, after = asyncio.run(run())
+
+    assert before.strftime("%H:%M") == later
+    # Nothing was posted since the new window, so it fires now rather than tomorrow
+    assert after <= datetime.now()
+    assert repost_scheduler.get_config(FACEBOOK_REPOSTING_JOB)["time_of_day"] == earlier
+
+
+def test_rollup_is_scheduled_when_the_schedule_sync_fails(db, engine, leader, monkeypatch):
+    def broken_sync(self):
+        raise RuntimeError("workflow table unavailable")
+
+    monkeypatch.setattr(AutomationService, "sync_facebook_schedule", broken_sync)
+    monkeypatch.setattr(rollup_service, "SessionLocal", sessionmaker(bind=engine))
+
+    async def run():
+        await automation_service.on_scheduler_elected()
+        return repost_scheduler.next_run(DASHBOARD_ROLLUP_JOB)
+
+    assert asyncio.run(run()) is not None
+    # Today's missing snapshot was stored (off the event loop) before scheduling
+    assert db.query(DashboardSnapshot).count() == 1
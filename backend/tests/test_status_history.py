@@ -0,0 +1,60 @@
+"""
+Vehicle status history rows written from session hooks
+"""
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import StatusHistory, Vehicle
+from app.models.vehicle import VehicleStatus
+from app.services.status_history_service import register_history_events
+
+
+def _enforce_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
+@pytest.fixture
+def history_db():
+    """Session with history hooks on a database that enforces foreign keys"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    event.listen(engine, "connect", _enforce_foreign_keys)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    register_history_events(session_factory)
+    session = session_factory()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_deleting_a_vehicle_cascades_to_its_history(history_db):
+    vehicle = Vehicle(marca="Nissan", modelo="Versa", año=2020, estatus=VehicleStatus.DISPONIBLE)
+    history_db.add(vehicle)
+    history_db.commit()
+    vehicle.update_status(VehicleStatus.VENDIDO, changed_by="ventas", reason="Vendido en lote")
+    history_db.commit()
+    assert history_db.query(StatusHistory).filter(StatusHistory.vehicle_id == vehicle.id).count() == 2
+
+    history_db.delete(vehicle)
+    history_db.commit()
+
+    assert history_db.query(StatusHistory).count() == 0
+
+
+def test_noop_status_update_does_not_leak_its_context(history_db):
+    vehicle = Vehicle(marca="Nissan", modelo="Versa", año=2020, estatus=VehicleStatus.DISPONIBLE)
+    history_db.add(vehicle)
+    history_db.commit()
+
+    vehicle.update_status(VehicleStatus.DISPONIBLE, changed_by="ventas", reason="Sin cambio")
+    history_db.commit()
+    vehicle.estatus = VehicleStatus.APARTADO
+    history_db.commit()
+
+    latest = history_db.query(StatusHistory).order_by(StatusHistory.id.desc()).first()
+    assert latest.new_status == "APARTADO"
+    assert latest.reason is None